@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import stat
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from typing import Optional
+from app.config import settings
+
+STATIC_DIR = "app/static"
+# Saída do build: cópias com hash no nome (+ .gz/.br) e o manifesto caminho original -> caminho com hash
+DIST = "dist"
+MANIFESTO = os.path.join(STATIC_DIR, DIST, "manifest.json")
+URL_STATIC = "/static"
+
+# Fotos de produtos já têm nome único (uuid) e não passam pelo build
+IGNORAR = {DIST, os.path.join("img", "produtos")}
+# Formatos de imagem já são comprimidos
+COMPRIMIR = {".css", ".js", ".svg", ".json", ".html", ".txt"}
+TAMANHO_MINIMO_COMPRESSAO = 512
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+# Arquivos sem hash: o navegador guarda, mas revalida (ETag) antes de usar
+CACHE_REVALIDAR = "no-cache"
+
+# Pré-compressão na ordem de preferência
+CODIFICACOES = (("br", ".br"), ("gzip", ".gz"))
+
+def _arquivos_origem(origem: str):
+    for raiz, pastas, arquivos in os.walk(origem):
+        relativo_raiz = os.path.relpath(raiz, origem)
+        pastas[:] = sorted(p for p in pastas
+                           if os.path.normpath(os.path.join(relativo_raiz, p)) not in IGNORAR)
+        for nome in sorted(arquivos):
+            yield os.path.normpath(os.path.join(relativo_raiz, nome))
+
+def _comprimir(caminho: str, conteudo: bytes):
+    with open(caminho + ".gz", "wb") as saida:
+        # mtime=0: mesmo conteúdo gera o mesmo .gz em todo build
+        with gzip.GzipFile(fileobj=saida, mode="wb", compresslevel=9, mtime=0) as gz:
+            gz.write(conteudo)
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(caminho + ".br", "wb") as saida:
+        saida.write(brotli.compress(conteudo, quality=11))
+
+def construir(origem: str = STATIC_DIR) -> dict[str, str]:
+    """Gerar static/dist: arquivos com hash do conteúdo no nome, pré-comprimidos, e o manifesto"""
+    destino = os.path.join(origem, DIST)
+    temporario = destino + ".tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+
+    manifesto = {}
+    for relativo in _arquivos_origem(origem):
+        with open(os.path.join(origem, relativo), "rb") as arquivo:
+            conteudo = arquivo.read()
+        base, extensao = os.path.splitext(relativo)
+        digest = hashlib.sha256(conteudo).hexdigest()[:12]
+        com_hash = f"{base}.{digest}{extensao}"
+
+        caminho = os.path.join(temporario, com_hash)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, "wb") as saida:
+            saida.write(conteudo)
+        if extensao.lower() in COMPRIMIR and len(conteudo) >= TAMANHO_MINIMO_COMPRESSAO:
+            _comprimir(caminho, conteudo)
+        manifesto[relativo.replace(os.sep, "/")] = com_hash.replace(os.sep, "/")
+
+    with open(os.path.join(temporario, "manifest.json"), "w") as saida:
+        json.dump(manifesto, saida, indent=2, sort_keys=True)
+
+    # Troca o diretório inteiro de uma vez
+    shutil.rmtree(destino, ignore_errors=True)
+    os.rename(temporario, destino)
+    _manifesto.cache_clear()
+    return manifesto
+
+class _Manifesto:
+    def __init__(self):
+        self._dados: Optional[dict[str, str]] = None
+
+    def obter(self) -> dict[str, str]:
+        if self._dados is None:
+            try:
+                with open(MANIFESTO) as arquivo:
+                    self._dados = json.load(arquivo)
+            except FileNotFoundError:
+                # Sem build (desenvolvimento): os arquivos originais são servidos
+                self._dados = {}
+        return self._dados
+
+    def cache_clear(self):
+        self._dados = None
+
+_manifesto = _Manifesto()
+
+def static_url(caminho: str) -> str:
+    """URL de um arquivo estático, com hash do conteúdo quando o build existir (helper do Jinja)"""
+    caminho = caminho.lstrip("/")
+    # Em modo debug os arquivos editados valem sem rodar o build de novo
+    com_hash = None if settings.debug else _manifesto.obter().get(caminho)
+    if com_hash is None:
+        return f"{URL_STATIC}/{caminho}"
+    return f"{URL_STATIC}/{DIST}/{com_hash}"
+
+def _aceitas(scope: Scope) -> set[str]:
+    aceitas = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        nome, _, parametros = item.partition(";")
+        parametros = parametros.replace(" ", "")
+        try:
+            q = float(parametros[2:]) if parametros.startswith("q=") else 1.0
+        except ValueError:
+            q = 1.0
+        if nome.strip() and q > 0:
+            aceitas.add(nome.strip().lower())
+    return aceitas
+
+class StaticComCache(StaticFiles):
+    """StaticFiles que serve as versões pré-comprimidas do build e define Cache-Control
+
+    Arquivos com hash no nome (dist/) e fotos de produtos nunca mudam de conteúdo: cache imutável.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        imutavel = path.startswith(DIST + "/") or path.startswith("img/produtos/")
+        response = None
+        if path.startswith(DIST + "/") and scope["method"] in ("GET", "HEAD"):
+            response = await self._pre_comprimido(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR
+            if path.startswith(DIST + "/"):
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _pre_comprimido(self, path: str, scope: Scope) -> Optional[Response]:
+        aceitas = _aceitas(scope)
+        for codificacao, extensao in CODIFICACOES:
+            if codificacao not in aceitas:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + extensao)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(
+                full_path, stat_result=stat_result, method=scope["method"],
+                media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                headers={"Content-Encoding": codificacao}
+            )
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
@@ -6,6 +6,31 @@ class Settings(BaseSettings):
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./donnatureza.db")
     
+    # Pool de conexões (PostgreSQL)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", 10))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    
+    # Sincronização do catálogo (/api/produtos/changes): folga aplicada à marca de tempo do token.
+    # Alterações gravadas por transações mais longas que a folga podem ficar fora do delta
+    sync_folga_segundos: int = int(os.getenv("SYNC_FOLGA_SEGUNDOS", 60))
+    
+    # Consultas acima deste tempo são registradas no log com a rota de origem
+    slow_query_ms: int = int(os.getenv("SLOW_QUERY_MS", 200))
+    
+    # SQLite
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_busy_timeout: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))  # bytes (256 MB)
+    sqlite_cache_size: int = int(os.getenv("SQLITE_CACHE_SIZE", -65536))  # negativo = KB (64 MB)
+    
+    # Esquema do banco: as migrações rodam no deploy (python manage.py migrate) e a
+    # inicialização só confere a versão; em desenvolvimento pode migrar ao iniciar
+    migrar_na_inicializacao: bool = os.getenv("MIGRAR_NA_INICIALIZACAO", "False").lower() == "true"
+    
     # FastAPI
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
     secret_key: str = os.getenv("SECRET_KEY", "seu-secret-key-super-seguro-donnatureza")
@@ -13,6 +38,17 @@ class Settings(BaseSettings):
     # Railway specific
     port: int = int(os.getenv("PORT", 8000))
     
+    # Threads para as rotas síncronas (acesso ao banco fora do event loop)
+    threadpool_size: int = int(os.getenv("THREADPOOL_SIZE", 40))
+    
+    # Fotos de produtos: processamentos simultâneos e tamanho máximo do upload
+    imagens_workers: int = int(os.getenv("IMAGENS_WORKERS", 2))
+    foto_max_mb: int = int(os.getenv("FOTO_MAX_MB", 15))
+    
+    # Compressão gzip das respostas dinâmicas (bytes mínimos e nível 1-9)
+    gzip_minimo_bytes: int = int(os.getenv("GZIP_MINIMO_BYTES", 1024))
+    gzip_nivel: int = int(os.getenv("GZIP_NIVEL", 6))
+    
     # NFC-e
     sefaz_ambiente: str = os.getenv("SEFAZ_AMBIENTE", "homologacao")
     certificado_path: str = os.getenv("CERTIFICADO_PATH", "certificados/certificado.pfx")
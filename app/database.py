@@ -1,12 +1,139 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.config import settings
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+logger = logging.getLogger("app.sql")
+
+def criar_engine(url: str, **pragmas):
+    """Engine com o perfil do Settings (pool, PRAGMAs do SQLite e BEGIN IMMEDIATE)
+
+    PRAGMAs passados aqui substituem os do Settings, ex.: criar_engine(url, journal_mode="DELETE").
+    """
+    url_banco = make_url(url)
+    opcoes = {}
+    # SQLite em memória usa SingletonThreadPool, que não aceita tamanho de pool nem timeout
+    if issubclass(url_banco.get_dialect().get_pool_class(url_banco), QueuePool):
+        opcoes.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
+    if url_banco.get_backend_name() == "sqlite":
+        opcoes["connect_args"] = {"check_same_thread": False}
+    else:
+        opcoes.update(pool_recycle=settings.db_pool_recycle, pool_pre_ping=settings.db_pool_pre_ping)
+    novo_engine = create_engine(url, **opcoes)
+    
+    if novo_engine.dialect.name == "sqlite":
+        pragmas = {
+            "journal_mode": settings.sqlite_journal_mode,
+            "synchronous": settings.sqlite_synchronous,
+            "busy_timeout": settings.sqlite_busy_timeout,
+            "mmap_size": settings.sqlite_mmap_size,
+            "cache_size": settings.sqlite_cache_size,
+            **pragmas
+        }
+        
+        @event.listens_for(novo_engine, "connect")
+        def _sqlite_connect(dbapi_connection, connection_record):
+            # Desativa o BEGIN implícito do pysqlite; o BEGIN é emitido no evento abaixo
+            dbapi_connection.isolation_level = None
+            
+            # WAL: leituras não esperam a gravação da venda em andamento
+            cursor = dbapi_connection.cursor()
+            for nome, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nome}={valor}")
+            cursor.close()
+        
+        @event.listens_for(novo_engine, "begin")
+        def _sqlite_begin(conn):
+            # Transações de escrita pedem BEGIN IMMEDIATE para reservar o lock de escrita
+            # já no início, evitando que dois caixas leiam o mesmo saldo antes de gravar
+            if conn.get_execution_options().get("sqlite_immediate"):
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            else:
+                conn.exec_driver_sql("BEGIN")
+    
+    return novo_engine
+
+engine = criar_engine(settings.database_url)
+
+@dataclass
+class EstatisticasSQL:
+    """Consultas e tempo de banco acumulados durante uma requisição"""
+    rota: str = ""
+    queries: int = 0
+    tempo_db: float = 0.0  # segundos
+
+_estatisticas: ContextVar[Optional[EstatisticasSQL]] = ContextVar("estatisticas_sql", default=None)
+# Contadores globais usados por limite_de_queries (vêem consultas de qualquer thread);
+# a lista e os contadores deles só mudam com o lock
+_observadores: list[EstatisticasSQL] = []
+_lock_observadores = threading.Lock()
+
+def iniciar_estatisticas(rota: str) -> EstatisticasSQL:
+    """Começar a contar as consultas do contexto atual (uma requisição, um teste)"""
+    estatisticas = EstatisticasSQL(rota=rota)
+    _estatisticas.set(estatisticas)
+    return estatisticas
+
+@event.listens_for(engine, "before_cursor_execute")
+def _antes_da_query(conn, cursor, statement, parameters, context, executemany):
+    # No contexto da execução: se a query falhar, o início é descartado junto com ele
+    context._inicio_query = time.perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def _depois_da_query(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - context._inicio_query
+    if statement.startswith("BEGIN"):
+        # BEGIN explícito do SQLite: não conta, para os limites valerem igual no Postgres
+        return
+    estatisticas = _estatisticas.get()
+    if estatisticas is not None:
+        estatisticas.queries += 1
+        estatisticas.tempo_db += duracao
+    if _observadores:
+        with _lock_observadores:
+            for e in _observadores:
+                e.queries += 1
+                e.tempo_db += duracao
+    if duracao * 1000 >= settings.slow_query_ms:
+        logger.warning(
+            "Query lenta (%.1f ms) em %s: %s",
+            duracao * 1000,
+            estatisticas.rota if estatisticas else "-",
+            statement
+        )
+
+@contextmanager
+def limite_de_queries(maximo: int):
+    """Para testes: falhar se o bloco executar mais de `maximo` consultas
+
+        with limite_de_queries(3):
+            client.get("/api/vendas")
+    """
+    estatisticas = EstatisticasSQL(rota="teste")
+    with _lock_observadores:
+        _observadores.append(estatisticas)
+    try:
+        yield estatisticas
+    finally:
+        with _lock_observadores:
+            _observadores.remove(estatisticas)
+    if estatisticas.queries > maximo:
+        raise AssertionError(
+            f"{estatisticas.queries} consultas executadas, limite era {maximo}"
+        )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,10 @@
+from fastapi.templating import Jinja2Templates
+from app.assets import static_url
+
+# Ambiente único para as páginas: cada template é compilado uma vez e fica em cache
+templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["static_url"] = static_url
+
+# O cupom sempre foi renderizado sem as linhas das tags de bloco (largura fixa da bobina);
+# overlay do mesmo ambiente, com cache próprio por causa das opções diferentes
+ambiente_cupom = templates.env.overlay(trim_blocks=True, lstrip_blocks=True)
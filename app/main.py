@@ -1,32 +1,92 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI, Request, Depends
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.config import settings
-from app.database import Base, engine, get_db
-from app.routers import produtos, vendas, relatorios, estoque
+from app.database import engine, get_db, SessionLocal, iniciar_estatisticas
+from app.migracoes import migrar, verificar_esquema
+from app.routers import produtos, vendas, relatorios, estoque, exportacao, eventos
+from app.services.indice_produtos import indice_codigos
+from app.services.catalogo_cache import cache_catalogo
+from app.services.busca_service import preparar_busca
+from app.services.eventos import hub_eventos
+from app.services.estoque_service import BancoOcupadoError
+from app.assets import StaticComCache
+from app.jinja import templates
+from app.respostas import GZipSeletivo
 
-# Criar tabelas
-Base.metadata.create_all(bind=engine)
+def preparar_banco():
+    # Esquema primeiro: os passos seguintes já consultam as tabelas
+    if settings.migrar_na_inicializacao:
+        migrar(engine)
+    verificar_esquema(engine)
+    preparar_busca(engine)
+    db = SessionLocal()
+    try:
+        # O conjunto de alertas fica gravado e é mantido a cada escrita; reconstruir é do
+        # `manage.py alertas --reconstruir` e da migração que o preenche
+        indice_codigos.carregar(db)
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """Inicialização da aplicação, na ordem: threadpool, hub de eventos, banco e índices"""
+    # As rotas que usam o banco são síncronas e rodam neste pool, sem bloquear o event loop
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    # Rotas no threadpool publicam no hub, que entrega os eventos neste loop
+    hub_eventos.iniciar(asyncio.get_running_loop())
+    await anyio.to_thread.run_sync(preparar_banco)
+    yield
 
 app = FastAPI(
     title="Sistema Donnatureza",
     description="Sistema de vendas com NFC-e para Donnatureza",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=ciclo_de_vida
 )
 
-# Static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Registrado antes do Server-Timing para ficar por dentro dele: o middleware de
+# instrumentação repassa o corpo em partes e o gzip não veria o tamanho total
+app.add_middleware(
+    GZipSeletivo,
+    minimum_size=settings.gzip_minimo_bytes,
+    compresslevel=settings.gzip_nivel,
+    ignorar=("/static/", "/api/eventos")
+)
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
+@app.middleware("http")
+async def instrumentar_sql(request: Request, call_next):
+    """Contar consultas e tempo de banco da requisição e publicar em Server-Timing"""
+    inicio = time.perf_counter()
+    estatisticas = iniciar_estatisticas(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    total = (time.perf_counter() - inicio) * 1000
+    response.headers["Server-Timing"] = (
+        f'db;dur={estatisticas.tempo_db * 1000:.1f};desc="{estatisticas.queries} queries", '
+        f'app;dur={total:.1f}'
+    )
+    return response
+
+@app.exception_handler(BancoOcupadoError)
+async def banco_ocupado(request: Request, exc: BancoOcupadoError):
+    # Lock de escrita com outro caixa: nada foi gravado e a operação pode ser repetida
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Static files
+app.mount("/static", StaticComCache(directory="app/static"), name="static")
 
 # Routers
 app.include_router(produtos.router)
 app.include_router(vendas.router)
 app.include_router(relatorios.router)
 app.include_router(estoque.router)
+app.include_router(exportacao.router)
+app.include_router(eventos.router)
 
 @app.get("/")
 async def home(request: Request):
@@ -50,21 +110,25 @@ async def inventario(request: Request):
     )
 
 @app.get("/api/simple-produtos")
-async def listar_produtos_simple(db: Session = Depends(get_db)):
+def listar_produtos_simple(request: Request, db: Session = Depends(get_db)):
     from app.models.produto import Produto
-    produtos = db.query(Produto).filter(Produto.ativo == True).all()
-    return [
-        {
-            "id": p.id,
-            "nome": p.nome,
-            "codigo_barras": p.codigo_barras,
-            "preco": float(p.preco),
-            "estoque": p.estoque,
-            "categoria": p.categoria,
-            "ativo": p.ativo
-        }
-        for p in produtos
-    ]
+    
+    def gerar():
+        produtos = db.query(Produto).filter(Produto.ativo == True).all()
+        return [
+            {
+                "id": p.id,
+                "nome": p.nome,
+                "codigo_barras": p.codigo_barras,
+                "preco": float(p.preco),
+                "estoque": p.estoque,
+                "categoria": p.categoria,
+                "ativo": p.ativo
+            }
+            for p in produtos
+        ], {}
+    
+    return cache_catalogo.responder(request, gerar)
 
 @app.get("/health")
 async def health_check():
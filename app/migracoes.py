@@ -0,0 +1,108 @@
+"""Migrações versionadas do esquema
+
+Rodam uma vez por deploy (`python manage.py migrate`). Ao iniciar, a aplicação só compara a
+versão gravada no banco com VERSAO_ESQUEMA, sem refletir as tabelas.
+
+Cada migração roda na própria transação e deve ser idempotente: bancos novos já recebem o
+esquema completo na primeira (create_all), e bancos criados antes das migrações têm só parte dele.
+"""
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, func
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from app.database import Base
+import app.models  # noqa: F401  (registra as tabelas)
+
+_metadata = MetaData()
+versao_esquema = Table(
+    "versao_esquema", _metadata,
+    Column("versao", Integer, primary_key=True, autoincrement=False),
+    Column("descricao", String(200), nullable=False),
+    Column("aplicada_em", DateTime, nullable=False)
+)
+
+class EsquemaDesatualizado(RuntimeError):
+    pass
+
+def _adicionar_coluna(conn: Connection, tabela: str, coluna: Column):
+    if coluna.name in {c["name"] for c in inspect(conn).get_columns(tabela)}:
+        return
+    tipo = coluna.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo}")
+
+def _m0001_tabelas(conn: Connection):
+    # Tabelas que faltarem: o banco inteiro quando novo, as tabelas mais recentes nos antigos
+    Base.metadata.create_all(conn)
+
+def _m0002_variantes_foto(conn: Connection):
+    for nome in ("foto_thumb_url", "foto_card_url"):
+        _adicionar_coluna(conn, "produtos", Column(nome, String(255)))
+
+def _m0003_indices(conn: Connection):
+    # Índices declarados nos modelos depois que as tabelas já existiam (create_all não os cria)
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(conn, checkfirst=True)
+
+def _m0004_indice_busca(conn: Connection):
+    from app.services.busca_service import criar_indice_busca
+    criar_indice_busca(conn)
+
+def _m0005_resumos_vendas(conn: Connection):
+    from app.services.resumo_service import ResumoVendasService
+    with Session(bind=conn) as db:
+        ResumoVendasService(db).reconstruir_se_vazio()
+
+def _m0006_alertas_estoque(conn: Connection):
+    from app.services.alerta_service import AlertaEstoqueService
+    with Session(bind=conn) as db:
+        AlertaEstoqueService(db).reconstruir()
+
+MIGRACOES: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Tabelas do sistema", _m0001_tabelas),
+    (2, "Variantes da foto do produto", _m0002_variantes_foto),
+    (3, "Índices criados depois das tabelas", _m0003_indices),
+    (4, "Índice de busca de produtos (FTS5/pg_trgm)", _m0004_indice_busca),
+    (5, "Resumos de vendas das vendas já existentes", _m0005_resumos_vendas),
+    (6, "Alertas de estoque dos produtos já existentes", _m0006_alertas_estoque),
+]
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
+
+def versao_atual(conn: Connection) -> int:
+    """Versão gravada no banco (0 se as migrações nunca rodaram)"""
+    try:
+        with conn.begin_nested():
+            return conn.execute(select(func.max(versao_esquema.c.versao))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+def migrar(engine: Engine, saida: Callable[[str], None] = print) -> list[int]:
+    """Aplicar as migrações pendentes, cada uma na sua transação; retorna as versões aplicadas"""
+    with engine.begin() as conn:
+        _metadata.create_all(conn)
+        atual = versao_atual(conn)
+
+    aplicadas = []
+    for versao, descricao, migracao in MIGRACOES:
+        if versao <= atual:
+            continue
+        saida(f"   • {versao:04d} {descricao}")
+        with engine.begin() as conn:
+            migracao(conn)
+            conn.execute(versao_esquema.insert().values(
+                versao=versao, descricao=descricao, aplicada_em=datetime.utcnow()
+            ))
+        aplicadas.append(versao)
+    return aplicadas
+
+def verificar_esquema(engine: Engine):
+    """Checagem da inicialização: uma consulta à versão, sem reflexão nem DDL"""
+    with engine.connect() as conn:
+        atual = versao_atual(conn)
+    if atual < VERSAO_ESQUEMA:
+        raise EsquemaDesatualizado(
+            f"Banco na versão {atual} do esquema, o código espera a {VERSAO_ESQUEMA}: "
+            f"rode `python manage.py migrate`"
+        )
@@ -1,5 +1,10 @@
 from .produto import Produto
-from .venda import Venda, ItemVenda
-from .movimento_estoque import MovimentoEstoque
+from .venda import Venda, ItemVenda, ChaveIdempotenciaVenda
+from .movimento_estoque import MovimentoEstoque, MovimentoEstoqueArquivo
+from .resumo_venda import ResumoVendaHora, ResumoVendaProduto
+from .saldo_estoque import SaldoEstoque
+from .alerta_estoque import AlertaEstoque, EventoAlertaEstoque
 
-__all__ = ["Produto", "Venda", "ItemVenda", "MovimentoEstoque"]
\ No newline at end of file
+__all__ = ["Produto", "Venda", "ItemVenda", "ChaveIdempotenciaVenda",
+           "MovimentoEstoque", "MovimentoEstoqueArquivo", "ResumoVendaHora", "ResumoVendaProduto", "SaldoEstoque",
+           "AlertaEstoque", "EventoAlertaEstoque"]
\ No newline at end of file
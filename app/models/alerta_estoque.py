@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AlertaEstoque(Base):
+    """Produtos atualmente com estoque baixo ou alto (mantido a cada movimentação)"""
+    __tablename__ = "alertas_estoque"
+    
+    produto_id = Column(Integer, ForeignKey("produtos.id"), primary_key=True)
+    situacao = Column(String(10), nullable=False)  # baixo, alto
+    desde = Column(DateTime, server_default=func.now())
+
+class EventoAlertaEstoque(Base):
+    """Registro de cada vez que um produto cruza o estoque mínimo ou máximo"""
+    __tablename__ = "eventos_alerta_estoque"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    situacao_anterior = Column(String(10), nullable=False)  # normal, baixo, alto
+    situacao_nova = Column(String(10), nullable=False)
+    estoque = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
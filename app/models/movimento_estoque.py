@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -22,4 +22,27 @@ class MovimentoEstoque(Base):
     # Relacionamentos
     produto = relationship("Produto", back_populates="movimentos")
     
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    
+    __table_args__ = (
+        # Saldo de um produto em uma data: último movimento até o instante pedido
+        Index("ix_movimentos_estoque_produto_created_at", "produto_id", "created_at"),
+    )
+
+class MovimentoEstoqueArquivo(Base):
+    """Movimentações antigas já cobertas por um saldo fechado, em formato compacto"""
+    __tablename__ = "movimentos_estoque_arquivo"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # mesmo id de movimentos_estoque
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    tipo_movimento = Column(String(20), nullable=False)
+    quantidade = Column(Integer, nullable=False)
+    quantidade_anterior = Column(Integer, nullable=False)
+    quantidade_nova = Column(Integer, nullable=False)
+    valor_total = Column(DECIMAL(10, 2))
+    documento = Column(String(100))
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_movimentos_estoque_arquivo_produto_created_at", "produto_id", "created_at"),
+    )
\ No newline at end of file
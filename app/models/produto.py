@@ -17,6 +17,9 @@ class Produto(Base):
     categoria = Column(String(50))
     descricao = Column(Text)
     foto_url = Column(String(255))
+    # Variantes reduzidas da foto (foto_url guarda a maior)
+    foto_thumb_url = Column(String(255))
+    foto_card_url = Column(String(255))
     
     # Campos fiscais obrigatórios
     ncm = Column(String(8), nullable=False, default="00000000")
@@ -34,7 +37,7 @@ class Produto(Base):
     
     ativo = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
     
     # Relacionamentos
     movimentos = relationship("MovimentoEstoque", back_populates="produto")
\ No newline at end of file
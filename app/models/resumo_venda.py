@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DECIMAL, Date, ForeignKey, UniqueConstraint
+from app.database import Base
+
+class ResumoVendaHora(Base):
+    """Totais de vendas por dia, hora, forma de pagamento e status"""
+    __tablename__ = "resumo_vendas_hora"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(Date, nullable=False)
+    hora = Column(Integer, nullable=False)
+    forma_pagamento = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)
+    quantidade_vendas = Column(Integer, nullable=False, default=0)
+    total = Column(DECIMAL(12, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("data", "hora", "forma_pagamento", "status", name="uq_resumo_vendas_hora"),
+    )
+
+class ResumoVendaProduto(Base):
+    """Quantidade e faturamento por dia, produto e status da venda"""
+    __tablename__ = "resumo_vendas_produto"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(Date, nullable=False)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    status = Column(String(20), nullable=False)
+    quantidade = Column(Integer, nullable=False, default=0)
+    faturamento = Column(DECIMAL(12, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("data", "produto_id", "status", name="uq_resumo_vendas_produto"),
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class SaldoEstoque(Base):
+    """Saldo de cada produto no fim de um dia (ponto de partida para consultas históricas)"""
+    __tablename__ = "saldos_estoque"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    data = Column(Date, nullable=False)
+    estoque = Column(Integer, nullable=False)
+    # Último movimento incluído no saldo; os seguintes formam o delta
+    movimento_id = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("produto_id", "data", name="uq_saldos_estoque_produto_data"),
+    )
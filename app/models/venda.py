@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -19,6 +19,14 @@ class Venda(Base):
     
     # Relacionamentos
     itens = relationship("ItemVenda", back_populates="venda")
+    
+    __table_args__ = (
+        # Relatórios filtram por status e intervalo de created_at
+        Index("ix_vendas_status_created_at", "status", "created_at"),
+    )
+    # created_at volta no próprio INSERT (RETURNING): os resumos usam a data da venda
+    # logo após o flush, sem um SELECT a mais por venda
+    __mapper_args__ = {"eager_defaults": True}
 
 class ItemVenda(Base):
     __tablename__ = "itens_venda"
@@ -35,4 +43,14 @@ class ItemVenda(Base):
     
     @property
     def subtotal(self):
-        return self.quantidade * self.preco_unitario
\ No newline at end of file
+        return self.quantidade * self.preco_unitario
+
+class ChaveIdempotenciaVenda(Base):
+    """Chave gerada no caixa para cada venda; reenvios recebem a venda já gravada"""
+    __tablename__ = "chaves_idempotencia_venda"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    chave = Column(String(64), unique=True, index=True, nullable=False)
+    venda_id = Column(Integer, ForeignKey("vendas.id"), nullable=False)
+    resposta = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
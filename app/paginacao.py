@@ -0,0 +1,34 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, Response
+
+# Cabeçalho com o cursor da próxima página (ausente na última página)
+CABECALHO_CURSOR = "X-Next-Cursor"
+
+def codificar_cursor(valores: dict) -> str:
+    """Gerar um cursor opaco a partir da posição da última linha da página"""
+    dados = json.dumps(valores, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> dict:
+    try:
+        dados = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(dados)
+        if not isinstance(valores, dict):
+            raise ValueError
+        return valores
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def proximo_cursor(itens: list, limit: int, chave) -> Optional[str]:
+    """Cursor da próxima página, ou None quando a página atual não veio cheia"""
+    if itens and len(itens) == limit:
+        return codificar_cursor(chave(itens[-1]))
+    return None
+
+def definir_proximo_cursor(response: Response, itens: list, limit: int, chave):
+    """Publicar o cursor da próxima página no cabeçalho da resposta"""
+    cursor = proximo_cursor(itens, limit, chave)
+    if cursor:
+        response.headers[CABECALHO_CURSOR] = cursor
@@ -0,0 +1,54 @@
+import json
+from decimal import Decimal
+from typing import Any
+from fastapi.responses import JSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # sem orjson: mesmo formato pelo json da biblioteca padrão
+    orjson = None
+
+def _padrao(valor: Any):
+    # Mesmo resultado do jsonable_encoder do FastAPI para os tipos usados nas rotas
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+def json_bytes(conteudo: Any) -> bytes:
+    """Serializar conteúdo compatível com JSON (aceita Decimal, datetime e date)"""
+    if orjson is not None:
+        return orjson.dumps(conteudo, default=_padrao, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":"), default=_padrao).encode("utf-8")
+
+class RespostaJSON(JSONResponse):
+    """Resposta JSON rápida para listas grandes
+
+    Devolver uma instância direto da rota pula o jsonable_encoder do FastAPI, que percorre
+    o conteúdo inteiro em Python antes de serializar.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return json_bytes(content)
+
+class GZipSeletivo(GZipMiddleware):
+    """GZip das respostas acima do tamanho mínimo, exceto nos prefixos ignorados
+
+    SSE precisa chegar sem buffer e /static já é servido pré-comprimido pelo build.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 6,
+                 ignorar: tuple[str, ...] = ()):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.ignorar = ignorar
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.ignorar):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import BigInteger, case, cast, func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from decimal import Decimal
+from datetime import date, datetime, time, timedelta
 
 from app.database import get_db
+from app.respostas import RespostaJSON
+from app.paginacao import codificar_cursor, decodificar_cursor, definir_proximo_cursor
 from app.models import Produto, MovimentoEstoque
+from app.schemas.estoque import InventarioCreate
 from app.services.estoque_service import EstoqueService
+from app.services.saldo_service import SaldoEstoqueService
+from app.services.alerta_service import AlertaEstoqueService
+from app.jinja import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/estoque")
 async def tela_estoque(request: Request):
@@ -20,40 +26,69 @@ async def tela_estoque(request: Request):
     )
 
 @router.get("/api/estoque/alertas")
-async def alertas_estoque(db: Session = Depends(get_db)):
-    """Obter alertas de estoque baixo e alto"""
-    estoque_service = EstoqueService(db)
-    
-    produtos_estoque_baixo = estoque_service.verificar_estoque_baixo()
-    produtos_estoque_alto = estoque_service.verificar_estoque_alto()
+def alertas_estoque(db: Session = Depends(get_db)):
+    """Obter alertas de estoque baixo e alto
+
+    `cursor` marca o último evento já refletido na lista; use-o em /api/estoque/alertas/eventos.
+    """
+    alerta_service = AlertaEstoqueService(db)
+    cursor = alerta_service.ultimo_evento_id()
+    alertas = alerta_service.alertas_atuais()
     
     return {
         "estoque_baixo": [
             {
-                "id": p.id,
-                "nome": p.nome,
-                "codigo_barras": p.codigo_barras,
-                "estoque_atual": p.estoque,
-                "estoque_minimo": p.estoque_minimo,
-                "categoria": p.categoria
+                "id": a.id,
+                "nome": a.nome,
+                "codigo_barras": a.codigo_barras,
+                "estoque_atual": a.estoque,
+                "estoque_minimo": a.estoque_minimo,
+                "categoria": a.categoria
             }
-            for p in produtos_estoque_baixo
+            for a in alertas if a.situacao == "baixo"
         ],
         "estoque_alto": [
             {
-                "id": p.id,
-                "nome": p.nome,
-                "codigo_barras": p.codigo_barras,
-                "estoque_atual": p.estoque,
-                "estoque_maximo": p.estoque_maximo,
-                "categoria": p.categoria
+                "id": a.id,
+                "nome": a.nome,
+                "codigo_barras": a.codigo_barras,
+                "estoque_atual": a.estoque,
+                "estoque_maximo": a.estoque_maximo,
+                "categoria": a.categoria
             }
-            for p in produtos_estoque_alto
-        ]
+            for a in alertas if a.situacao == "alto"
+        ],
+        "cursor": codificar_cursor({"id": cursor})
+    }
+
+@router.get("/api/estoque/alertas/eventos")
+def eventos_alertas_estoque(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Produtos que entraram ou saíram dos alertas depois do cursor"""
+    depois_de_id = decodificar_cursor(cursor).get("id", 0) if cursor else 0
+    eventos = AlertaEstoqueService(db).eventos(depois_de_id, limit)
+    
+    return {
+        "eventos": [
+            {
+                "id": e.id,
+                "produto_id": e.produto_id,
+                "situacao_anterior": e.situacao_anterior,
+                "situacao_nova": e.situacao_nova,
+                "estoque": e.estoque,
+                "created_at": e.created_at.isoformat()
+            }
+            for e in eventos
+        ],
+        "cursor": codificar_cursor({"id": eventos[-1].id if eventos else depois_de_id}),
+        "mais": len(eventos) == limit
     }
 
 @router.post("/api/estoque/entrada")
-async def entrada_estoque(
+def entrada_estoque(
     produto_id: int,
     quantidade: int,
     preco_unitario: Optional[float] = None,
@@ -86,7 +121,7 @@ async def entrada_estoque(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/api/estoque/ajuste")
-async def ajuste_estoque(
+def ajuste_estoque(
     produto_id: int,
     quantidade_nova: int,
     motivo: str = "Ajuste de estoque",
@@ -114,26 +149,39 @@ async def ajuste_estoque(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/api/estoque/inventario")
+def reconciliar_inventario(inventario: InventarioCreate, db: Session = Depends(get_db)):
+    """Aplicar a contagem física completa de uma vez e devolver o resumo das diferenças"""
+    # Produto contado em mais de um lugar: soma das contagens
+    contagem = {}
+    for item in inventario.itens:
+        contagem[item.produto_id] = contagem.get(item.produto_id, 0) + item.quantidade_contada
+    
+    estoque_service = EstoqueService(db)
+    return estoque_service.reconciliar_inventario(contagem, motivo=inventario.motivo)
+
 @router.get("/api/estoque/movimentos")
-async def listar_movimentos(
+def listar_movimentos(
     produto_id: Optional[int] = None,
     tipo_movimento: Optional[str] = None,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, le=500),
     db: Session = Depends(get_db)
 ):
-    """Listar movimentações de estoque"""
+    """Listar movimentações de estoque; a próxima página vem pelo cabeçalho X-Next-Cursor"""
     estoque_service = EstoqueService(db)
     movimentos = estoque_service.obter_movimentos(
         produto_id=produto_id,
         tipo_movimento=tipo_movimento,
-        limit=limit
+        limit=limit,
+        antes_de_id=decodificar_cursor(cursor).get("id") if cursor else None
     )
     
-    return [
+    response = RespostaJSON([
         {
             "id": m.id,
             "produto_id": m.produto_id,
-            "produto_nome": m.produto.nome,
+            "produto_nome": m.produto_nome,
             "tipo_movimento": m.tipo_movimento,
             "quantidade": m.quantidade,
             "quantidade_anterior": m.quantidade_anterior,
@@ -147,54 +195,142 @@ async def listar_movimentos(
             "created_at": m.created_at.isoformat()
         }
         for m in movimentos
+    ])
+    definir_proximo_cursor(response, movimentos, limit, lambda m: {"id": m.id})
+    return response
+
+@router.get("/api/estoque/saldos")
+def saldos_estoque(
+    response: Response,
+    data: date,
+    produto_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Estoque de cada produto no fim do dia informado (saldo fechado + movimentos seguintes)"""
+    momento = datetime.combine(data + timedelta(days=1), time.min)
+    query = db.query(Produto.id, Produto.nome, Produto.codigo_barras).filter(Produto.created_at < momento)
+    if produto_id:
+        query = query.filter(Produto.id == produto_id)
+    if cursor:
+        query = query.filter(Produto.id > decodificar_cursor(cursor).get("id", 0))
+    produtos = query.order_by(Produto.id).limit(limit).all()
+    definir_proximo_cursor(response, produtos, limit, lambda p: {"id": p.id})
+    
+    saldos = SaldoEstoqueService(db).saldos_em(momento, [p.id for p in produtos])
+    return [
+        {
+            "produto_id": p.id,
+            "nome": p.nome,
+            "codigo_barras": p.codigo_barras,
+            "estoque": saldos.get(p.id, 0)
+        }
+        for p in produtos
     ]
 
+@router.post("/api/estoque/saldos")
+def fechar_saldos(data: Optional[date] = None, db: Session = Depends(get_db)):
+    """Gravar o saldo fechado de todos os produtos no fim do dia (padrão: ontem)"""
+    data = data or date.today() - timedelta(days=1)
+    try:
+        produtos = SaldoEstoqueService(db).gerar_saldos(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"data": data.isoformat(), "produtos": produtos}
+
 @router.get("/api/estoque/relatorio")
-async def relatorio_estoque(db: Session = Depends(get_db)):
-    """Relatório geral de estoque"""
-    produtos = db.query(Produto).filter(Produto.ativo == True).all()
+def relatorio_estoque(
+    incluir_produtos: bool = False,
+    categoria: Optional[str] = None,
+    status: Optional[str] = None,
+    busca: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Relatório geral de estoque
+
+    Resumo e categorias saem de uma única consulta agregada. A lista de produtos é opcional
+    e paginada (próxima página pelo cabeçalho X-Next-Cursor), com os filtros da tela de estoque.
     
-    total_produtos = len(produtos)
-    total_valor_estoque = sum(float(p.preco) * p.estoque for p in produtos)
+    O valor é somado em centavos inteiros: no SQLite, preço vezes estoque é ponto flutuante
+    e a soma de muitos produtos perderia centavos.
+    """
+    baixo = Produto.estoque <= Produto.estoque_minimo
+    alto = Produto.estoque >= Produto.estoque_maximo
+    por_categoria = (db.query(
+                        Produto.categoria,
+                        func.count(Produto.id).label("produtos"),
+                        func.coalesce(func.sum(Produto.estoque), 0).label("quantidade"),
+                        func.coalesce(func.sum(cast(func.round(Produto.preco * 100), BigInteger) * Produto.estoque), 0).label("centavos"),
+                        func.sum(case((baixo, 1), else_=0)).label("estoque_baixo"),
+                        func.sum(case((alto, 1), else_=0)).label("estoque_alto"))
+                     .filter(Produto.ativo == True)
+                     .group_by(Produto.categoria)
+                     .all())
     
-    # Contar por categoria
     categorias = {}
-    for produto in produtos:
-        cat = produto.categoria or "Sem categoria"
-        if cat not in categorias:
-            categorias[cat] = {"quantidade": 0, "valor": 0}
-        categorias[cat]["quantidade"] += produto.estoque
-        categorias[cat]["valor"] += float(produto.preco) * produto.estoque
+    resumo = {
+        "total_produtos": 0,
+        "total_valor_estoque": Decimal("0.00"),
+        "produtos_estoque_baixo": 0,
+        "produtos_estoque_alto": 0
+    }
+    for linha in por_categoria:
+        valor = Decimal(int(linha.centavos)).scaleb(-2)
+        categorias[linha.categoria or "Sem categoria"] = {
+            "produtos": linha.produtos,
+            "quantidade": linha.quantidade,
+            "valor": valor
+        }
+        resumo["total_produtos"] += linha.produtos
+        resumo["total_valor_estoque"] += valor
+        resumo["produtos_estoque_baixo"] += linha.estoque_baixo
+        resumo["produtos_estoque_alto"] += linha.estoque_alto
     
-    # Produtos sem movimento
-    estoque_service = EstoqueService(db)
-    produtos_estoque_baixo = len(estoque_service.verificar_estoque_baixo())
-    produtos_estoque_alto = len(estoque_service.verificar_estoque_alto())
+    relatorio = {"resumo": resumo, "categorias": categorias}
+    if not incluir_produtos:
+        return RespostaJSON(relatorio)
     
-    return {
-        "resumo": {
-            "total_produtos": total_produtos,
-            "total_valor_estoque": total_valor_estoque,
-            "produtos_estoque_baixo": produtos_estoque_baixo,
-            "produtos_estoque_alto": produtos_estoque_alto
-        },
-        "categorias": categorias,
-        "produtos": [
-            {
-                "id": p.id,
-                "nome": p.nome,
-                "categoria": p.categoria,
-                "estoque_atual": p.estoque,
-                "estoque_minimo": p.estoque_minimo,
-                "estoque_maximo": p.estoque_maximo,
-                "preco": float(p.preco),
-                "valor_total": float(p.preco) * p.estoque,
-                "status": (
-                    "baixo" if p.estoque <= p.estoque_minimo else
-                    "alto" if p.estoque >= p.estoque_maximo else
-                    "normal"
-                )
-            }
-            for p in produtos
-        ]
-    }
\ No newline at end of file
+    query = db.query(
+        Produto.id, Produto.nome, Produto.codigo_barras, Produto.categoria, Produto.preco,
+        Produto.estoque, Produto.estoque_minimo, Produto.estoque_maximo
+    ).filter(Produto.ativo == True)
+    if categoria:
+        query = query.filter(Produto.categoria == categoria)
+    if status == "baixo":
+        query = query.filter(baixo)
+    elif status == "alto":
+        query = query.filter(alto, ~baixo)
+    elif status == "normal":
+        query = query.filter(~baixo, ~alto)
+    if busca:
+        query = query.filter(Produto.nome.contains(busca, autoescape=True) |
+                             Produto.codigo_barras.contains(busca, autoescape=True))
+    if cursor:
+        query = query.filter(Produto.id > decodificar_cursor(cursor).get("id", 0))
+    produtos = query.order_by(Produto.id).limit(limit).all()
+    
+    relatorio["produtos"] = [
+        {
+            "id": p.id,
+            "nome": p.nome,
+            "codigo_barras": p.codigo_barras,
+            "categoria": p.categoria,
+            "estoque_atual": p.estoque,
+            "estoque_minimo": p.estoque_minimo,
+            "estoque_maximo": p.estoque_maximo,
+            "preco": p.preco,
+            "valor_total": p.preco * p.estoque,
+            "status": (
+                "baixo" if p.estoque <= p.estoque_minimo else
+                "alto" if p.estoque >= p.estoque_maximo else
+                "normal"
+            )
+        }
+        for p in produtos
+    ]
+    response = RespostaJSON(relatorio)
+    definir_proximo_cursor(response, produtos, limit, lambda p: {"id": p.id})
+    return response
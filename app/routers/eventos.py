@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+
+from app.services.eventos import CANAIS, hub_eventos
+
+router = APIRouter()
+
+# Comentário enviado quando não há eventos, para proxies não fecharem a conexão
+INTERVALO_HEARTBEAT = 15
+RECONEXAO_MS = 3000
+
+@router.get("/api/eventos")
+async def fluxo_eventos(request: Request, canais: Optional[str] = None):
+    """Server-Sent Events com mudanças de estoque, vendas, produtos e alertas
+
+    `canais` filtra por tipo (ex.: estoque,alerta). Na reconexão o navegador envia
+    Last-Event-ID e recebe o que perdeu, se ainda estiver no histórico recente.
+    """
+    selecionados = [c.strip() for c in canais.split(",") if c.strip()] if canais else None
+    if selecionados and not set(selecionados) <= set(CANAIS):
+        raise HTTPException(status_code=400, detail=f"Canais válidos: {', '.join(CANAIS)}")
+    
+    ultimo_id = request.headers.get("last-event-id")
+    assinante = hub_eventos.assinar(
+        selecionados,
+        ultimo_id=int(ultimo_id) if ultimo_id and ultimo_id.isdigit() else None
+    )
+    
+    async def gerar():
+        try:
+            yield f"retry: {RECONEXAO_MS}\n\n"
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(assinante.fila.get(), timeout=INTERVALO_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if mensagem is None:  # descartado por não acompanhar o ritmo
+                    break
+                yield mensagem
+        finally:
+            hub_eventos.cancelar(assinante)
+    
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
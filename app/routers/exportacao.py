@@ -0,0 +1,163 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Iterator, Optional
+import csv
+import io
+import json
+
+from app.database import SessionLocal, get_db
+from app.models import Venda, ItemVenda, Produto, MovimentoEstoque, MovimentoEstoqueArquivo
+from app.services.saldo_service import SaldoEstoqueService, colunas_movimento
+
+router = APIRouter()
+
+# Linhas buscadas por vez no cursor do servidor e enviadas por bloco na resposta
+LOTE_EXPORTACAO = 1000
+
+# Colunas exportadas de cada movimentação, além do nome do produto
+COLUNAS_MOVIMENTO = ["id", "created_at", "produto_id", "tipo_movimento", "quantidade",
+                     "quantidade_anterior", "quantidade_nova", "preco_unitario", "valor_total",
+                     "motivo", "observacoes", "usuario", "documento"]
+
+FORMATOS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+def _valor(v):
+    if isinstance(v, Decimal):
+        return str(v)
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+def _filtrar_periodo(stmt, coluna, data_inicio: Optional[date], data_fim: Optional[date]):
+    if data_inicio:
+        stmt = stmt.where(coluna >= datetime.combine(data_inicio, time.min))
+    if data_fim:
+        stmt = stmt.where(coluna < datetime.combine(data_fim + timedelta(days=1), time.min))
+    return stmt
+
+def _gerar_linhas(stmt, formato: str) -> Iterator[str]:
+    """Percorrer a consulta com cursor do servidor, sem carregar o resultado inteiro em memória"""
+    # Sessão própria: o gerador continua rodando depois que a rota retorna
+    db = SessionLocal()
+    try:
+        resultado = db.execute(stmt.execution_options(yield_per=LOTE_EXPORTACAO))
+        colunas = list(resultado.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if formato == "csv":
+            writer.writerow(colunas)
+
+        for lote in resultado.partitions():
+            for linha in lote:
+                valores = [_valor(v) for v in linha]
+                if formato == "csv":
+                    writer.writerow(valores)
+                else:
+                    buffer.write(json.dumps(dict(zip(colunas, valores)), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+def _resposta(stmt, formato: str, nome: str) -> StreamingResponse:
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato deve ser csv ou ndjson")
+    return StreamingResponse(
+        _gerar_linhas(stmt, formato),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'}
+    )
+
+@router.get("/api/export/vendas")
+def exportar_vendas(
+    formato: str = "csv",
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    status: Optional[str] = None,
+    forma_pagamento: Optional[str] = None
+):
+    """Exportar vendas (CSV ou NDJSON) em streaming"""
+    stmt = select(
+        Venda.id, Venda.created_at, Venda.total, Venda.desconto, Venda.forma_pagamento,
+        Venda.cpf_cliente, Venda.status, Venda.nfce_numero, Venda.nfce_chave
+    )
+    stmt = _filtrar_periodo(stmt, Venda.created_at, data_inicio, data_fim)
+    if status:
+        stmt = stmt.where(Venda.status == status)
+    if forma_pagamento:
+        stmt = stmt.where(Venda.forma_pagamento == forma_pagamento)
+    return _resposta(stmt.order_by(Venda.id), formato, "vendas")
+
+@router.get("/api/export/itens-venda")
+def exportar_itens_venda(
+    formato: str = "csv",
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    status: Optional[str] = None,
+    produto_id: Optional[int] = None
+):
+    """Exportar itens vendidos (CSV ou NDJSON) em streaming"""
+    stmt = (select(
+                ItemVenda.id, ItemVenda.venda_id, Venda.created_at, Venda.status,
+                ItemVenda.produto_id, Produto.nome.label("produto_nome"), Produto.codigo_barras,
+                ItemVenda.quantidade, ItemVenda.preco_unitario,
+                (ItemVenda.quantidade * ItemVenda.preco_unitario).label("subtotal"))
+            .join(Venda, ItemVenda.venda_id == Venda.id)
+            .join(Produto, ItemVenda.produto_id == Produto.id))
+    stmt = _filtrar_periodo(stmt, Venda.created_at, data_inicio, data_fim)
+    if status:
+        stmt = stmt.where(Venda.status == status)
+    if produto_id:
+        stmt = stmt.where(ItemVenda.produto_id == produto_id)
+    return _resposta(stmt.order_by(ItemVenda.id), formato, "itens_venda")
+
+@router.get("/api/export/movimentos")
+def exportar_movimentos(
+    formato: str = "csv",
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    tipo_movimento: Optional[str] = None,
+    produto_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Exportar movimentações de estoque (CSV ou NDJSON) em streaming
+
+    Períodos que começam antes do arquivamento incluem as movimentações arquivadas
+    (sem preço unitário, motivo, observações e usuário, que o arquivo não guarda).
+    """
+    desde = datetime.combine(data_inicio, time.min) if data_inicio else None
+    modelos = [MovimentoEstoque]
+    if SaldoEstoqueService(db).inclui_arquivo(desde):
+        modelos.append(MovimentoEstoqueArquivo)
+
+    consultas = []
+    for modelo in modelos:
+        colunas = colunas_movimento(modelo, COLUNAS_MOVIMENTO)
+        stmt = (select(*colunas[:3], Produto.nome.label("produto_nome"), *colunas[3:])
+                .join(Produto, modelo.produto_id == Produto.id))
+        stmt = _filtrar_periodo(stmt, modelo.created_at, data_inicio, data_fim)
+        if tipo_movimento:
+            stmt = stmt.where(modelo.tipo_movimento == tipo_movimento)
+        if produto_id:
+            stmt = stmt.where(modelo.produto_id == produto_id)
+        consultas.append(stmt)
+
+    if len(consultas) == 1:
+        stmt = consultas[0].order_by(MovimentoEstoque.id)
+    else:
+        # Ativas e arquivadas têm os mesmos ids de origem: UNION ALL ordenado pelo id
+        uniao = union_all(*consultas).subquery()
+        stmt = select(uniao).order_by(uniao.c.id)
+    return _resposta(stmt, formato, "movimentos_estoque")
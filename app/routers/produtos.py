@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from sqlalchemy import func, or_, select
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
-import shutil
-from uuid import uuid4
+from datetime import datetime, timedelta
 
+from app.config import settings
 from app.database import get_db
+from app.respostas import RespostaJSON
+from app.paginacao import CABECALHO_CURSOR, codificar_cursor, decodificar_cursor, proximo_cursor
 from app.models.produto import Produto
+from app.models.movimento_estoque import MovimentoEstoque
 from app.schemas.produto import ProdutoCreate, ProdutoUpdate, ProdutoResponse
+from app.services.indice_produtos import indice_codigos
+from app.services.catalogo_cache import cache_catalogo
+from app.services.busca_service import BuscaService
+from app.services.alerta_service import AlertaEstoqueService
+from app.services.eventos import hub_eventos, publicar_alertas
+from app.services.importacao_service import ImportacaoProdutosService, ler_planilha
+from app.services.imagem_service import FotoProdutoService, ImagemInvalida
+from app.jinja import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
-# Diretório para upload de imagens
-UPLOAD_DIR = "app/static/img/produtos"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Validação e serialização da lista inteira em uma chamada (pydantic-core), sem passar item a item por Python
+lista_produtos = TypeAdapter(List[ProdutoResponse])
 
 @router.get("/produtos")
 async def tela_produtos(request: Request):
@@ -25,19 +34,92 @@ async def tela_produtos(request: Request):
     )
 
 @router.get("/api/produtos", response_model=List[ProdutoResponse])
-async def listar_produtos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    produtos = db.query(Produto).filter(Produto.ativo == True).offset(skip).limit(limit).all()
-    return produtos
+def listar_produtos(
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Produtos ativos por id; a próxima página vem pelo cabeçalho X-Next-Cursor"""
+    def gerar():
+        query = db.query(Produto).filter(Produto.ativo == True)
+        if cursor:
+            query = query.filter(Produto.id > decodificar_cursor(cursor).get("id", 0))
+        elif skip:
+            query = query.offset(skip)
+        
+        produtos = query.order_by(Produto.id).limit(limit).all()
+        proximo = proximo_cursor(produtos, limit, lambda p: {"id": p.id})
+        return (
+            lista_produtos.dump_json(lista_produtos.validate_python(produtos, from_attributes=True)),
+            {CABECALHO_CURSOR: proximo} if proximo else {}
+        )
+    
+    return cache_catalogo.responder(request, gerar)
+
+@router.get("/api/produtos/changes")
+def alteracoes_produtos(since: Optional[str] = None, db: Session = Depends(get_db)):
+    """Sincronização incremental: produtos alterados desde o token (ou o catálogo inteiro sem token)
+
+    O token guarda o horário do banco na sincronização anterior. Os horários gravados são os do
+    início de cada transação (now() no Postgres), então a consulta volta SYNC_FOLGA_SEGUNDOS antes
+    da marca: produtos podem se repetir entre sincronizações, e só uma transação mais longa que a
+    folga pode ter sua alteração perdida.
+    """
+    # Marca lida antes dos produtos: o que mudar durante a consulta volta na próxima
+    marca_atual = db.query(func.now()).scalar()
+    
+    query = db.query(Produto)
+    if since:
+        token = decodificar_cursor(since)
+        try:
+            marca = datetime.fromisoformat(token["t"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Token inválido")
+        desde = marca - timedelta(seconds=settings.sync_folga_segundos)
+        query = query.filter(or_(
+            Produto.updated_at >= desde,
+            Produto.id.in_(select(MovimentoEstoque.produto_id).where(MovimentoEstoque.created_at >= desde))
+        ))
+    else:
+        query = query.filter(Produto.ativo == True)
+    
+    alterados = []
+    removidos = []
+    for p in query.order_by(Produto.id).all():
+        if not p.ativo:
+            removidos.append(p.id)
+            continue
+        alterados.append({
+            "id": p.id,
+            "nome": p.nome,
+            "codigo_barras": p.codigo_barras,
+            "preco": float(p.preco),
+            "estoque": p.estoque,
+            "categoria": p.categoria,
+            "foto_url": p.foto_url,
+            "foto_card_url": p.foto_card_url,
+            "foto_thumb_url": p.foto_thumb_url,
+            "ativo": p.ativo
+        })
+    
+    return RespostaJSON({
+        "completo": since is None,
+        "alterados": alterados,
+        "removidos": removidos,
+        "token": codificar_cursor({"t": marca_atual.isoformat()})
+    })
 
 @router.get("/api/produtos/{produto_id}", response_model=ProdutoResponse)
-async def obter_produto(produto_id: int, db: Session = Depends(get_db)):
+def obter_produto(produto_id: int, db: Session = Depends(get_db)):
     produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if produto is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     return produto
 
 @router.post("/api/produtos", response_model=ProdutoResponse)
-async def criar_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
+def criar_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
     # Verificar se código de barras já existe
     if produto.codigo_barras:
         produto_existente = db.query(Produto).filter(Produto.codigo_barras == produto.codigo_barras).first()
@@ -46,12 +128,18 @@ async def criar_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
     
     db_produto = Produto(**produto.dict())
     db.add(db_produto)
+    db.flush()
+    alertas = AlertaEstoqueService(db).sincronizar([db_produto.id])
     db.commit()
     db.refresh(db_produto)
+    indice_codigos.atualizar(db_produto)
+    cache_catalogo.invalidar()
+    hub_eventos.publicar("produto", {"id": db_produto.id, "acao": "criado"})
+    publicar_alertas(alertas)
     return db_produto
 
 @router.put("/api/produtos/{produto_id}", response_model=ProdutoResponse)
-async def atualizar_produto(produto_id: int, produto: ProdutoUpdate, db: Session = Depends(get_db)):
+def atualizar_produto(produto_id: int, produto: ProdutoUpdate, db: Session = Depends(get_db)):
     db_produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if db_produto is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -60,64 +148,81 @@ async def atualizar_produto(produto_id: int, produto: ProdutoUpdate, db: Session
     for field, value in update_data.items():
         setattr(db_produto, field, value)
     
+    alertas = AlertaEstoqueService(db).sincronizar([produto_id])
     db.commit()
     db.refresh(db_produto)
+    indice_codigos.atualizar(db_produto)
+    cache_catalogo.invalidar()
+    hub_eventos.publicar("produto", {"id": produto_id, "acao": "alterado"})
+    publicar_alertas(alertas)
     return db_produto
 
 @router.delete("/api/produtos/{produto_id}")
-async def excluir_produto(produto_id: int, db: Session = Depends(get_db)):
+def excluir_produto(produto_id: int, db: Session = Depends(get_db)):
     db_produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if db_produto is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
     # Soft delete
     db_produto.ativo = False
+    alertas = AlertaEstoqueService(db).sincronizar([produto_id])
     db.commit()
+    indice_codigos.remover(produto_id)
+    cache_catalogo.invalidar()
+    hub_eventos.publicar("produto", {"id": produto_id, "acao": "removido"})
+    publicar_alertas(alertas)
     return {"message": "Produto excluído com sucesso"}
 
 @router.post("/api/produtos/upload-foto/{produto_id}")
-async def upload_foto_produto(produto_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload de foto do produto"""
+def upload_foto_produto(produto_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Upload de foto do produto: gera miniatura, card e foto grande sem metadados EXIF"""
     produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
     # Validar tipo de arquivo
-    if not file.content_type.startswith('image/'):
+    if not (file.content_type or "").startswith('image/'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser uma imagem")
     
-    # Gerar nome único para o arquivo
-    file_extension = file.filename.split('.')[-1]
-    unique_filename = f"{uuid4()}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Salvar arquivo
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Remover foto anterior se existir
-        if produto.foto_url:
-            old_path = os.path.join("app/static", produto.foto_url.lstrip('/static/'))
-            if os.path.exists(old_path):
-                os.remove(old_path)
-        
-        # Atualizar URL da foto no banco
-        produto.foto_url = f"/static/img/produtos/{unique_filename}"
-        db.commit()
-        db.refresh(produto)
-        
-        return {"foto_url": produto.foto_url, "message": "Foto enviada com sucesso"}
-        
+        FotoProdutoService(db).atualizar(produto, file.file)
+    except ImagemInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivo: {str(e)}")
+    
+    indice_codigos.atualizar(produto)
+    cache_catalogo.invalidar()
+    hub_eventos.publicar("produto", {"id": produto_id, "acao": "alterado"})
+    
+    return {
+        "foto_url": produto.foto_url,
+        "foto_card_url": produto.foto_card_url,
+        "foto_thumb_url": produto.foto_thumb_url,
+        "message": "Foto enviada com sucesso"
+    }
+
+@router.post("/api/produtos/importar")
+def importar_produtos(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Importar produtos de uma planilha CSV ou XLSX (cria novos e atualiza pelo código de barras)"""
+    try:
+        linhas = ler_planilha(file.file, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ImportacaoProdutosService(db).importar(linhas)
 
 @router.get("/api/produtos/buscar/{termo}")
-async def buscar_produtos(termo: str, db: Session = Depends(get_db)):
-    produtos = db.query(Produto).filter(
-        Produto.ativo == True,
-        (Produto.nome.contains(termo) | 
-         Produto.codigo_barras.contains(termo) |
-         Produto.categoria.contains(termo))
-    ).limit(20).all()
-    return produtos
\ No newline at end of file
+def buscar_produtos(termo: str, db: Session = Depends(get_db)):
+    return BuscaService(db).buscar(termo, limit=20)
+
+@router.get("/api/produtos/codigo/{codigo_barras}")
+async def buscar_por_codigo_barras(codigo_barras: str):
+    """Leitura do scanner: busca exata pelo código de barras no índice em memória"""
+    produto = indice_codigos.buscar(codigo_barras)
+    if produto is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    return produto
+
+@router.get("/api/produtos/indice/estatisticas")
+async def estatisticas_indice():
+    return indice_codigos.estatisticas()
@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, Request
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func, text
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from typing import Optional
 
 from app.database import get_db
-from app.models.venda import Venda, ItemVenda
+from app.models.venda import Venda
 from app.models.produto import Produto
+from app.models.resumo_venda import ResumoVendaHora, ResumoVendaProduto
+from app.jinja import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/relatorios")
 async def tela_relatorios(request: Request):
@@ -19,47 +19,86 @@ async def tela_relatorios(request: Request):
         {"request": request}
     )
 
+def _resumo_vendas(db: Session, inicio: Optional[date], fim: Optional[date]) -> dict:
+    """Totais de vendas autorizadas entre os dias [inicio, fim), lidos da tabela de resumo"""
+    query = db.query(
+        func.coalesce(func.sum(ResumoVendaHora.total), 0).label('total'),
+        func.coalesce(func.sum(ResumoVendaHora.quantidade_vendas), 0).label('quantidade')
+    ).filter(ResumoVendaHora.status == "autorizada")
+    
+    if inicio:
+        query = query.filter(ResumoVendaHora.data >= inicio)
+    if fim:
+        query = query.filter(ResumoVendaHora.data < fim)
+    
+    resultado = query.one()
+    total = float(resultado.total)
+    return {
+        "total_vendas": total,
+        "quantidade_vendas": resultado.quantidade,
+        "ticket_medio": total / resultado.quantidade if resultado.quantidade > 0 else 0
+    }
+
+def _listar_vendas(
+    db: Session,
+    inicio: Optional[datetime],
+    fim: Optional[datetime],
+    skip: int,
+    limit: int
+) -> list[dict]:
+    query = db.query(Venda).filter(Venda.status == "autorizada")
+    if inicio:
+        query = query.filter(Venda.created_at >= inicio)
+    if fim:
+        query = query.filter(Venda.created_at < fim)
+    
+    vendas = query.order_by(Venda.created_at.desc(), Venda.id.desc()).offset(skip).limit(limit).all()
+    return [
+        {
+            "id": v.id,
+            "total": float(v.total),
+            "desconto": float(v.desconto) if v.desconto is not None else 0,
+            "cpf_cliente": v.cpf_cliente,
+            "forma_pagamento": v.forma_pagamento,
+            "status": v.status,
+            "created_at": v.created_at.isoformat()
+        }
+        for v in vendas
+    ]
+
+def _inicio_do_dia(dia: Optional[date]) -> Optional[datetime]:
+    return datetime.combine(dia, time.min) if dia else None
+
 @router.get("/api/relatorios/vendas-periodo")
-async def vendas_por_periodo(
+def vendas_por_periodo(
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
+    incluir_vendas: bool = False,
+    skip: int = 0,
+    limit: int = Query(50, le=500),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Venda).filter(Venda.status == "autorizada")
-    
-    if data_inicio:
-        query = query.filter(func.date(Venda.created_at) >= data_inicio)
-    if data_fim:
-        query = query.filter(func.date(Venda.created_at) <= data_fim)
-    
-    vendas = query.all()
-    
-    total_vendas = sum(venda.total for venda in vendas)
-    quantidade_vendas = len(vendas)
+    fim = data_fim + timedelta(days=1) if data_fim else None
     
-    return {
-        "vendas": vendas,
-        "total_vendas": float(total_vendas),
-        "quantidade_vendas": quantidade_vendas,
-        "ticket_medio": float(total_vendas / quantidade_vendas) if quantidade_vendas > 0 else 0
-    }
+    resposta = _resumo_vendas(db, data_inicio, fim)
+    if incluir_vendas:
+        resposta["vendas"] = _listar_vendas(db, _inicio_do_dia(data_inicio), _inicio_do_dia(fim), skip, limit)
+    return resposta
 
 @router.get("/api/relatorios/produtos-mais-vendidos")
-async def produtos_mais_vendidos(limit: int = 10, db: Session = Depends(get_db)):
+def produtos_mais_vendidos(limit: int = 10, db: Session = Depends(get_db)):
     resultado = db.query(
         Produto.nome,
-        func.sum(ItemVenda.quantidade).label('total_vendido'),
-        func.sum(ItemVenda.quantidade * ItemVenda.preco_unitario).label('total_faturado')
-    ).join(
-        ItemVenda, Produto.id == ItemVenda.produto_id
+        func.sum(ResumoVendaProduto.quantidade).label('total_vendido'),
+        func.sum(ResumoVendaProduto.faturamento).label('total_faturado')
     ).join(
-        Venda, ItemVenda.venda_id == Venda.id
+        ResumoVendaProduto, Produto.id == ResumoVendaProduto.produto_id
     ).filter(
-        Venda.status == "autorizada"
+        ResumoVendaProduto.status == "autorizada"
     ).group_by(
         Produto.id, Produto.nome
     ).order_by(
-        func.sum(ItemVenda.quantidade).desc()
+        func.sum(ResumoVendaProduto.quantidade).desc()
     ).limit(limit).all()
     
     return [
@@ -72,34 +111,35 @@ async def produtos_mais_vendidos(limit: int = 10, db: Session = Depends(get_db))
     ]
 
 @router.get("/api/relatorios/vendas-hoje")
-async def vendas_hoje(db: Session = Depends(get_db)):
+def vendas_hoje(
+    incluir_vendas: bool = False,
+    skip: int = 0,
+    limit: int = Query(50, le=500),
+    db: Session = Depends(get_db)
+):
     hoje = date.today()
+    amanha = hoje + timedelta(days=1)
     
-    vendas = db.query(Venda).filter(
-        func.date(Venda.created_at) == hoje,
-        Venda.status == "autorizada"
-    ).all()
-    
-    total_hoje = sum(venda.total for venda in vendas)
-    quantidade_hoje = len(vendas)
-    
-    return {
+    resumo = _resumo_vendas(db, hoje, amanha)
+    resposta = {
         "data": hoje.strftime('%d/%m/%Y'),
-        "total_vendas": float(total_hoje),
-        "quantidade_vendas": quantidade_hoje,
-        "vendas": vendas
+        "total_vendas": resumo["total_vendas"],
+        "quantidade_vendas": resumo["quantidade_vendas"]
     }
+    if incluir_vendas:
+        resposta["vendas"] = _listar_vendas(db, _inicio_do_dia(hoje), _inicio_do_dia(amanha), skip, limit)
+    return resposta
 
 @router.get("/api/relatorios/formas-pagamento")
-async def relatorio_formas_pagamento(db: Session = Depends(get_db)):
+def relatorio_formas_pagamento(db: Session = Depends(get_db)):
     resultado = db.query(
-        Venda.forma_pagamento,
-        func.count(Venda.id).label('quantidade'),
-        func.sum(Venda.total).label('total')
+        ResumoVendaHora.forma_pagamento,
+        func.sum(ResumoVendaHora.quantidade_vendas).label('quantidade'),
+        func.sum(ResumoVendaHora.total).label('total')
     ).filter(
-        Venda.status == "autorizada"
+        ResumoVendaHora.status == "autorizada"
     ).group_by(
-        Venda.forma_pagamento
+        ResumoVendaHora.forma_pagamento
     ).all()
     
     return [
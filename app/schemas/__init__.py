@@ -1,7 +1,9 @@
 from .produto import ProdutoCreate, ProdutoUpdate, ProdutoResponse
-from .venda import VendaCreate, VendaResponse, ItemVendaCreate
+from .venda import VendaCreate, VendaResponse, ItemVendaCreate, VendaOffline, LoteVendasOffline
+from .estoque import InventarioCreate, ItemContagem
 
 __all__ = [
     "ProdutoCreate", "ProdutoUpdate", "ProdutoResponse",
-    "VendaCreate", "VendaResponse", "ItemVendaCreate"
+    "VendaCreate", "VendaResponse", "ItemVendaCreate", "VendaOffline", "LoteVendasOffline",
+    "InventarioCreate", "ItemContagem"
 ]
\ No newline at end of file
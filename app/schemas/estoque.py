@@ -0,0 +1,16 @@
+from pydantic import BaseModel, validator
+from typing import List
+
+class ItemContagem(BaseModel):
+    produto_id: int
+    quantidade_contada: int
+    
+    @validator('quantidade_contada')
+    def quantidade_nao_negativa(cls, v):
+        if v < 0:
+            raise ValueError('Quantidade contada não pode ser negativa')
+        return v
+
+class InventarioCreate(BaseModel):
+    itens: List[ItemContagem]
+    motivo: str = "Inventário físico"
@@ -68,6 +68,8 @@ class ProdutoUpdate(BaseModel):
 
 class ProdutoResponse(ProdutoBase):
     id: int
+    foto_thumb_url: Optional[str] = None
+    foto_card_url: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -29,6 +29,7 @@ class VendaCreate(BaseModel):
     cpf_cliente: Optional[str] = None
     desconto: Decimal = 0
     forma_pagamento: str = "dinheiro"
+    chave_idempotencia: Optional[str] = None  # gerada no caixa; reenvio com a mesma chave não duplica
     
     @validator('cpf_cliente')
     def validar_cpf(cls, v):
@@ -42,6 +43,28 @@ class VendaCreate(BaseModel):
         if v not in formas_validas:
             raise ValueError('Forma de pagamento inválida')
         return v
+    
+    @validator('chave_idempotencia')
+    def validar_chave(cls, v):
+        if v is None:
+            return v
+        v = v.strip()
+        if not 8 <= len(v) <= 64:
+            raise ValueError('Chave de idempotência deve ter entre 8 e 64 caracteres')
+        return v
+
+class VendaOffline(VendaCreate):
+    chave_idempotencia: str
+    registrada_em: Optional[datetime] = None  # horário do caixa quando a venda foi feita
+
+class LoteVendasOffline(BaseModel):
+    vendas: List[VendaOffline]
+    
+    @validator('vendas')
+    def limitar_lote(cls, v):
+        if len(v) > 5000:
+            raise ValueError('Envie no máximo 5000 vendas por requisição')
+        return v
 
 class VendaResponse(BaseModel):
     id: int
@@ -0,0 +1,101 @@
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+from app.models import Produto, AlertaEstoque, EventoAlertaEstoque
+from typing import Iterable
+
+NORMAL = "normal"
+
+def situacao_estoque(estoque: int, minimo: int, maximo: int, ativo: bool = True) -> str:
+    """Mesma regra dos antigos verificar_estoque_baixo/alto: baixo tem prioridade"""
+    if not ativo:
+        return NORMAL
+    if estoque <= minimo:
+        return "baixo"
+    if estoque >= maximo:
+        return "alto"
+    return NORMAL
+
+class AlertaEstoqueService:
+    """Conjunto de produtos em alerta, atualizado só quando um limite é cruzado"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def sincronizar(self, produto_ids: Iterable[int]) -> list[dict]:
+        """Reavaliar os produtos informados dentro da transação atual (antes do commit)
+
+        Retorna os eventos gravados, um por produto que mudou de situação.
+        """
+        ids = set(produto_ids)
+        if not ids:
+            return []
+        self.db.flush()
+        produtos = (self.db.query(Produto.id, Produto.estoque, Produto.estoque_minimo,
+                                  Produto.estoque_maximo, Produto.ativo)
+                    .filter(Produto.id.in_(ids))
+                    .all())
+        atuais = dict(
+            self.db.query(AlertaEstoque.produto_id, AlertaEstoque.situacao)
+            .filter(AlertaEstoque.produto_id.in_(ids))
+            .all()
+        )
+        return self._aplicar(produtos, atuais)
+
+    def reconstruir(self) -> list[dict]:
+        """Recalcular o conjunto inteiro (inicialização, edição direta no banco)"""
+        produtos = self.db.query(Produto.id, Produto.estoque, Produto.estoque_minimo,
+                                 Produto.estoque_maximo, Produto.ativo).all()
+        atuais = dict(self.db.query(AlertaEstoque.produto_id, AlertaEstoque.situacao).all())
+        eventos = self._aplicar(produtos, atuais)
+        self.db.commit()
+        return eventos
+
+    def _aplicar(self, produtos, atuais: dict[int, str]) -> list[dict]:
+        eventos = []
+        for p in produtos:
+            nova = situacao_estoque(p.estoque or 0, p.estoque_minimo or 0, p.estoque_maximo or 0, p.ativo)
+            anterior = atuais.get(p.id, NORMAL)
+            if nova != anterior:
+                eventos.append({
+                    "produto_id": p.id,
+                    "situacao_anterior": anterior,
+                    "situacao_nova": nova,
+                    "estoque": p.estoque or 0
+                })
+        if not eventos:
+            return eventos
+
+        entrando = [{"produto_id": e["produto_id"], "situacao": e["situacao_nova"]}
+                    for e in eventos if e["situacao_anterior"] == NORMAL]
+        mudando = [{"produto_id": e["produto_id"], "situacao": e["situacao_nova"]}
+                   for e in eventos if NORMAL not in (e["situacao_anterior"], e["situacao_nova"])]
+        saindo = [e["produto_id"] for e in eventos if e["situacao_nova"] == NORMAL]
+
+        if entrando:
+            self.db.execute(insert(AlertaEstoque), entrando)
+        if mudando:
+            self.db.execute(update(AlertaEstoque), mudando)
+        if saindo:
+            self.db.execute(delete(AlertaEstoque).where(AlertaEstoque.produto_id.in_(saindo)))
+        self.db.execute(insert(EventoAlertaEstoque), eventos)
+        return eventos
+
+    def alertas_atuais(self) -> list:
+        """Produtos do conjunto com os dados exibidos nas telas"""
+        return (self.db.query(AlertaEstoque.situacao, Produto.id, Produto.nome, Produto.codigo_barras,
+                              Produto.estoque, Produto.estoque_minimo, Produto.estoque_maximo,
+                              Produto.categoria)
+                .join(Produto, AlertaEstoque.produto_id == Produto.id)
+                .order_by(Produto.nome)
+                .all())
+
+    def eventos(self, depois_de_id: int = 0, limit: int = 100) -> list[EventoAlertaEstoque]:
+        return (self.db.query(EventoAlertaEstoque)
+                .filter(EventoAlertaEstoque.id > depois_de_id)
+                .order_by(EventoAlertaEstoque.id)
+                .limit(limit)
+                .all())
+
+    def ultimo_evento_id(self) -> int:
+        evento = self.db.query(EventoAlertaEstoque.id).order_by(EventoAlertaEstoque.id.desc()).first()
+        return evento.id if evento else 0
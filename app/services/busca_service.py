@@ -0,0 +1,176 @@
+import logging
+import math
+import re
+from sqlalchemy import func, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from app.models import Produto, ItemVenda
+
+# Peso da frequência de vendas na ordenação final (somado à relevância textual)
+PESO_VENDAS = 0.5
+# Candidatos trazidos do índice antes da reordenação por vendas
+LIMITE_CANDIDATOS = 100
+
+logger = logging.getLogger("app.busca")
+
+_modo_busca = "like"
+
+_SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+        nome, codigo_barras, categoria,
+        content='produtos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS produtos_fts_ai AFTER INSERT ON produtos BEGIN
+        INSERT INTO produtos_fts(rowid, nome, codigo_barras, categoria)
+        VALUES (new.id, new.nome, new.codigo_barras, new.categoria);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS produtos_fts_ad AFTER DELETE ON produtos BEGIN
+        INSERT INTO produtos_fts(produtos_fts, rowid, nome, codigo_barras, categoria)
+        VALUES ('delete', old.id, old.nome, old.codigo_barras, old.categoria);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS produtos_fts_au AFTER UPDATE OF nome, codigo_barras, categoria ON produtos BEGIN
+        INSERT INTO produtos_fts(produtos_fts, rowid, nome, codigo_barras, categoria)
+        VALUES ('delete', old.id, old.nome, old.codigo_barras, old.categoria);
+        INSERT INTO produtos_fts(rowid, nome, codigo_barras, categoria)
+        VALUES (new.id, new.nome, new.codigo_barras, new.categoria);
+    END""",
+]
+
+_POSTGRES_TRGM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() não é IMMUTABLE, o que impede seu uso em índices; o wrapper resolve isso
+    """CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS
+        $$ SELECT public.unaccent('public.unaccent', $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT""",
+    """CREATE INDEX IF NOT EXISTS ix_produtos_busca_trgm ON produtos USING gin (
+        f_unaccent(lower(nome || ' ' || coalesce(categoria, '') || ' ' || coalesce(codigo_barras, '')))
+        gin_trgm_ops
+    )""",
+]
+
+_DOCUMENTO_PG = "f_unaccent(lower(nome || ' ' || coalesce(categoria, '') || ' ' || coalesce(codigo_barras, '')))"
+
+def criar_indice_busca(conn: Connection):
+    """Criar o índice de busca do banco (FTS5 no SQLite, pg_trgm no Postgres); usado pelas migrações"""
+    try:
+        # Savepoint: no Postgres um erro de DDL invalidaria o resto da migração
+        with conn.begin_nested():
+            if conn.dialect.name == "sqlite":
+                existia = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'produtos_fts'"
+                )).first()
+                for ddl in _SQLITE_FTS:
+                    conn.exec_driver_sql(ddl)
+                if not existia:
+                    # Índice novo: indexar os produtos já cadastrados
+                    conn.exec_driver_sql("INSERT INTO produtos_fts(produtos_fts) VALUES ('rebuild')")
+            elif conn.dialect.name == "postgresql":
+                for ddl in _POSTGRES_TRGM:
+                    conn.exec_driver_sql(ddl)
+    except (OperationalError, ProgrammingError) as e:
+        # Sem FTS5/extensões (permissão, build do SQLite): a busca continua por LIKE
+        logger.warning("Índice de busca indisponível, usando LIKE: %s", e)
+
+def preparar_busca(engine: Engine):
+    """Escolher o modo de busca conforme o índice criado pelas migrações (só consulta, sem DDL)"""
+    global _modo_busca
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            existe = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'produtos_fts'"
+            )).first()
+            _modo_busca = "fts5" if existe else "like"
+        elif engine.dialect.name == "postgresql":
+            existe = conn.execute(text(
+                "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_produtos_busca_trgm'"
+            )).first()
+            _modo_busca = "trgm" if existe else "like"
+        else:
+            _modo_busca = "like"
+
+def _tokens(termo: str) -> list[str]:
+    return re.findall(r"\w+", termo.lower())
+
+def _escapar_like(valor: str) -> str:
+    # "_" faz parte de \w e seria curinga no LIKE
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class BuscaService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def buscar(self, termo: str, limit: int = 20) -> list[Produto]:
+        """Buscar produtos ativos por nome, código de barras ou categoria, ordenados por relevância"""
+        tokens = _tokens(termo)
+        if not tokens:
+            return []
+
+        if _modo_busca == "fts5":
+            relevancia = self._candidatos_fts5(tokens)
+        elif _modo_busca == "trgm":
+            relevancia = self._candidatos_trgm(tokens, termo)
+        else:
+            return self._buscar_like(termo, limit)
+
+        if not relevancia:
+            return []
+
+        # Desempate pela frequência de vendas: produtos que mais saem aparecem primeiro
+        vendidos = dict(
+            self.db.query(ItemVenda.produto_id, func.sum(ItemVenda.quantidade))
+            .filter(ItemVenda.produto_id.in_(relevancia.keys()))
+            .group_by(ItemVenda.produto_id)
+            .all()
+        )
+        ordem = sorted(
+            relevancia,
+            key=lambda pid: relevancia[pid] + PESO_VENDAS * math.log1p(vendidos.get(pid) or 0),
+            reverse=True
+        )[:limit]
+
+        produtos = {
+            p.id: p
+            for p in self.db.query(Produto).filter(Produto.id.in_(ordem)).all()
+        }
+        return [produtos[pid] for pid in ordem if pid in produtos]
+
+    def _candidatos_fts5(self, tokens: list[str]) -> dict[int, float]:
+        # Cada palavra vira um prefixo ("ole" encontra "Óleo"); acentos são removidos pelo tokenizador
+        consulta = " ".join(f'"{t}"*' for t in tokens)
+        linhas = self.db.execute(text("""
+            SELECT p.id, bm25(produtos_fts) AS rank
+            FROM produtos_fts
+            JOIN produtos p ON p.id = produtos_fts.rowid
+            WHERE produtos_fts MATCH :consulta AND p.ativo = 1
+            ORDER BY rank
+            LIMIT :limite
+        """), {"consulta": consulta, "limite": LIMITE_CANDIDATOS}).all()
+        # bm25 é menor quanto mais relevante
+        return {linha.id: -linha.rank for linha in linhas}
+
+    def _candidatos_trgm(self, tokens: list[str], termo: str) -> dict[int, float]:
+        filtros = " AND ".join(
+            f"{_DOCUMENTO_PG} LIKE '%' || f_unaccent(:t{i}) || '%' ESCAPE '\\'" for i in range(len(tokens))
+        )
+        parametros = {f"t{i}": _escapar_like(t) for i, t in enumerate(tokens)}
+        parametros.update({"termo": termo.lower(), "limite": LIMITE_CANDIDATOS})
+        linhas = self.db.execute(text(f"""
+            SELECT id, word_similarity(f_unaccent(:termo), f_unaccent(lower(nome))) AS rank
+            FROM produtos
+            WHERE ativo = true AND {filtros}
+            ORDER BY rank DESC
+            LIMIT :limite
+        """), parametros).all()
+        return {linha.id: linha.rank * 10 for linha in linhas}
+
+    def _buscar_like(self, termo: str, limit: int) -> list[Produto]:
+        return self.db.query(Produto).filter(
+            Produto.ativo == True,
+            (Produto.nome.contains(termo, autoescape=True) |
+             Produto.codigo_barras.contains(termo, autoescape=True) |
+             Produto.categoria.contains(termo, autoescape=True))
+        ).limit(limit).all()
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from fastapi import Request, Response
+from typing import Any, Callable, Optional
+from app.respostas import json_bytes
+
+# Combinações de rota + parâmetros guardadas por versão do catálogo
+MAX_ENTRADAS = 64
+
+@dataclass
+class _Entrada:
+    versao: int
+    etag: str
+    corpo: bytes
+    cabecalhos: dict
+
+def _corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return etag in candidatos or "*" in candidatos
+
+class CacheCatalogo:
+    """Respostas do catálogo serializadas uma vez por versão, com ETag forte"""
+
+    def __init__(self):
+        self.versao = 0
+        self._respostas: dict[str, _Entrada] = {}
+        self._lock = threading.Lock()
+
+    def invalidar(self):
+        """Chamar sempre que um produto ou seu estoque mudar"""
+        with self._lock:
+            self.versao += 1
+            self._respostas.clear()
+
+    def responder(self, request: Request, gerar: Callable[[], tuple[Any, dict]]) -> Response:
+        """Servir do cache (ou 304) quando possível; senão gerar, serializar e guardar
+
+        `gerar` devolve o conteúdo (compatível com JSON ou já serializado em bytes) e cabeçalhos extras.
+        """
+        chave = f"{request.url.path}?{request.url.query}"
+        entrada = self._respostas.get(chave)
+
+        if entrada is None or entrada.versao != self.versao:
+            # Versão lida antes de consultar o banco: se mudar no meio, a entrada já nasce vencida
+            versao = self.versao
+            conteudo, cabecalhos = gerar()
+            corpo = conteudo if isinstance(conteudo, bytes) else json_bytes(conteudo)
+            etag = f'"{hashlib.sha256(corpo).hexdigest()[:32]}"'
+            entrada = _Entrada(versao, etag, corpo, cabecalhos)
+            with self._lock:
+                if len(self._respostas) >= MAX_ENTRADAS:
+                    self._respostas.pop(next(iter(self._respostas)))
+                self._respostas[chave] = entrada
+
+        cabecalhos = {**entrada.cabecalhos, "ETag": entrada.etag, "Cache-Control": "no-cache"}
+        if _corresponde(request.headers.get("if-none-match"), entrada.etag):
+            return Response(status_code=304, headers=cabecalhos)
+        return Response(content=entrada.corpo, media_type="application/json", headers=cabecalhos)
+
+cache_catalogo = CacheCatalogo()
@@ -0,0 +1,151 @@
+import textwrap
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional
+from app.models import Venda, ItemVenda
+from app.jinja import ambiente_cupom
+
+LOJA = {
+    "nome": "DONNATUREZA",
+    "endereco": "Av Senador Dinarte Mariz, 4077 Lj 01"
+}
+
+# Cupons renderizados guardados por id da venda (venda finalizada não muda)
+MAX_CUPONS = 512
+
+# Bobina de 58 mm: 32 colunas na fonte padrão
+COLUNAS_58MM = 32
+
+# Comandos ESC/POS
+ESC = b"\x1b"
+GS = b"\x1d"
+INICIAR = ESC + b"@"
+PAGINA_CODIGO_860 = ESC + b"t\x03"  # PC860 (português)
+ALINHAR_ESQUERDA = ESC + b"a\x00"
+ALINHAR_CENTRO = ESC + b"a\x01"
+NEGRITO_LIGA = ESC + b"E\x01"
+NEGRITO_DESLIGA = ESC + b"E\x00"
+ALTURA_DUPLA = GS + b"!\x01"
+TAMANHO_NORMAL = GS + b"!\x00"
+AVANCAR_E_CORTAR = ESC + b"d\x04" + GS + b"V\x42\x00"
+
+@dataclass
+class Cupom:
+    html: str
+    escpos: bytes
+
+def _moeda(valor: Decimal) -> str:
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _forma_pagamento(forma: str) -> str:
+    return forma.replace('_', ' ').title()
+
+def _dados_cupom(venda: Venda) -> dict:
+    return {
+        "id": venda.id,
+        "data": venda.created_at.strftime('%d/%m/%Y %H:%M'),
+        "itens": [
+            {
+                "nome": item.produto.nome,
+                "quantidade": item.quantidade,
+                "preco_unitario": item.preco_unitario,
+                "subtotal": item.quantidade * item.preco_unitario
+            }
+            for item in venda.itens
+        ],
+        "desconto": venda.desconto or Decimal("0"),
+        "total": venda.total,
+        "forma_pagamento": _forma_pagamento(venda.forma_pagamento)
+    }
+
+def _colunas(esquerda: str, direita: str, largura: int = COLUNAS_58MM) -> str:
+    espaco = max(1, largura - len(esquerda) - len(direita))
+    return f"{esquerda}{' ' * espaco}{direita}"[:largura]
+
+def gerar_escpos(dados: dict, largura: int = COLUNAS_58MM) -> bytes:
+    """Cupom como sequência de bytes ESC/POS para impressora térmica (sem layout no navegador)"""
+    def texto(linha: str = "") -> bytes:
+        return linha.encode("cp860", errors="replace") + b"\n"
+
+    separador = texto("-" * largura)
+    saida = [
+        INICIAR, PAGINA_CODIGO_860,
+        ALINHAR_CENTRO, NEGRITO_LIGA, ALTURA_DUPLA, texto(LOJA["nome"]), TAMANHO_NORMAL, NEGRITO_DESLIGA,
+        *(texto(linha) for linha in textwrap.wrap(LOJA["endereco"], largura)),
+        ALINHAR_ESQUERDA, separador,
+        texto(f"Venda: #{dados['id']}"),
+        texto(f"Data: {dados['data']}"),
+        separador
+    ]
+    for item in dados["itens"]:
+        saida.append(texto(item["nome"][:largura]))
+        saida.append(texto(_colunas(
+            f"  {item['quantidade']} x {_moeda(item['preco_unitario'])}", _moeda(item["subtotal"]), largura
+        )))
+    saida.append(separador)
+    if dados["desconto"]:
+        saida.append(texto(_colunas("Desconto", "-" + _moeda(dados["desconto"]), largura)))
+    saida += [
+        NEGRITO_LIGA, texto(_colunas("TOTAL", _moeda(dados["total"]), largura)), NEGRITO_DESLIGA,
+        texto(f"Pagamento: {dados['forma_pagamento']}"),
+        ALINHAR_CENTRO, texto(), texto("Obrigado pela preferência!"),
+        AVANCAR_E_CORTAR
+    ]
+    return b"".join(saida)
+
+class CacheCupons:
+    """Cupons já renderizados (HTML e ESC/POS); reimpressão não consulta o banco"""
+
+    def __init__(self, maximo: int = MAX_CUPONS):
+        self.maximo = maximo
+        self._cupons: OrderedDict[int, Cupom] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, venda_id: int) -> Optional[Cupom]:
+        with self._lock:
+            cupom = self._cupons.get(venda_id)
+            if cupom is not None:
+                self._cupons.move_to_end(venda_id)
+            return cupom
+
+    def guardar(self, venda_id: int, cupom: Cupom):
+        with self._lock:
+            self._cupons[venda_id] = cupom
+            self._cupons.move_to_end(venda_id)
+            while len(self._cupons) > self.maximo:
+                self._cupons.popitem(last=False)
+
+    def invalidar(self, venda_id: int):
+        """Chamar se uma venda vier a ser alterada (ex.: cancelamento)"""
+        with self._lock:
+            self._cupons.pop(venda_id, None)
+
+cache_cupons = CacheCupons()
+
+class CupomService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def obter_cupom(self, venda_id: int) -> Optional[Cupom]:
+        """Cupom da venda: do cache ou renderizado a partir de uma única consulta"""
+        cupom = cache_cupons.obter(venda_id)
+        if cupom is not None:
+            return cupom
+
+        venda = (self.db.query(Venda)
+                 .options(joinedload(Venda.itens).joinedload(ItemVenda.produto))
+                 .filter(Venda.id == venda_id)
+                 .first())
+        if venda is None:
+            return None
+
+        dados = _dados_cupom(venda)
+        cupom = Cupom(
+            html=ambiente_cupom.get_template("cupom.html").render(loja=LOJA, venda=dados),
+            escpos=gerar_escpos(dados)
+        )
+        cache_cupons.guardar(venda_id, cupom)
+        return cupom
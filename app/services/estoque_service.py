@@ -1,12 +1,75 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from app.models import Produto, MovimentoEstoque, Venda, ItemVenda
+from app.models import Produto, MovimentoEstoque, MovimentoEstoqueArquivo
+from app.services.indice_produtos import indice_codigos
+from app.services.catalogo_cache import cache_catalogo
+from app.services.alerta_service import AlertaEstoqueService
+from app.services.eventos import publicar_estoque
+from app.services.saldo_service import colunas_movimento
 from typing import Optional
 from decimal import Decimal
 
+TIPOS_ENTRADA = ['entrada', 'compra', 'ajuste_positivo']
+TIPOS_SAIDA = ['saida', 'venda', 'perda', 'ajuste_negativo']
+
+# Tentativas de obter o lock de escrita; cada uma espera até o busy_timeout do SQLite
+TENTATIVAS_LOCK_ESCRITA = 3
+
+# Colunas do histórico de movimentações, além do nome do produto
+COLUNAS_HISTORICO = ["id", "produto_id", "tipo_movimento", "quantidade", "quantidade_anterior",
+                     "quantidade_nova", "preco_unitario", "valor_total", "motivo", "observacoes",
+                     "usuario", "documento", "created_at"]
+
+class EstoqueInsuficienteError(ValueError):
+    """Um ou mais produtos sem saldo suficiente para a saída solicitada"""
+    def __init__(self, falhas: list[dict]):
+        self.falhas = falhas
+        super().__init__("; ".join(
+            f"Estoque insuficiente para {f['nome']}. Atual: {f['estoque_atual']}, Solicitado: {f['solicitado']}"
+            for f in falhas
+        ))
+
+class BancoOcupadoError(RuntimeError):
+    """Lock de escrita não obtido depois das tentativas (a API responde 503)"""
+    def __init__(self):
+        super().__init__("Banco de dados ocupado com outras gravações. Tente novamente em instantes.")
+
+def _lock_esgotado(erro: OperationalError) -> bool:
+    # SQLite: busy_timeout esgotado; Postgres: lock_timeout (LockNotAvailable)
+    return "database is locked" in str(erro.orig) or getattr(erro.orig, "pgcode", None) == "55P03"
+
 class EstoqueService:
     def __init__(self, db: Session):
         self.db = db
     
+    def iniciar_transacao_escrita(self):
+        """Abrir a transação reservando o lock de escrita (BEGIN IMMEDIATE no SQLite)
+
+        Se o lock continuar com outro caixa depois de todas as tentativas, levanta BancoOcupadoError.
+        """
+        if self.db.in_transaction():
+            return
+        for _ in range(TENTATIVAS_LOCK_ESCRITA):
+            try:
+                self.db.connection(execution_options={"sqlite_immediate": True})
+                return
+            except OperationalError as e:
+                self.db.rollback()
+                if not _lock_esgotado(e):
+                    raise
+        raise BancoOcupadoError()
+    
+    def alterar_saldo(self, produto_id: int, delta: int) -> Optional[int]:
+        """Somar delta ao estoque de forma atômica; retorna o novo saldo ou None se não houver saldo"""
+        stmt = update(Produto).where(Produto.id == produto_id)
+        if delta < 0:
+            stmt = stmt.where(Produto.estoque >= -delta)
+        stmt = (stmt.values(estoque=Produto.estoque + delta)
+                .returning(Produto.estoque)
+                .execution_options(synchronize_session=False))
+        return self.db.execute(stmt).scalar_one_or_none()
+    
     def criar_movimento(
         self,
         produto_id: int,
@@ -19,22 +82,33 @@ class EstoqueService:
         documento: Optional[str] = None
     ) -> MovimentoEstoque:
         """Criar um movimento de estoque"""
-        produto = self.db.query(Produto).filter(Produto.id == produto_id).first()
-        if not produto:
-            raise ValueError(f"Produto {produto_id} não encontrado")
-        
-        quantidade_anterior = produto.estoque
-        
-        # Calcular nova quantidade baseada no tipo de movimento
-        if tipo_movimento in ['entrada', 'compra', 'ajuste_positivo']:
-            quantidade_nova = quantidade_anterior + quantidade
-        elif tipo_movimento in ['saida', 'venda', 'perda', 'ajuste_negativo']:
-            quantidade_nova = quantidade_anterior - quantidade
-            if quantidade_nova < 0:
-                raise ValueError(f"Estoque insuficiente. Atual: {quantidade_anterior}, Solicitado: {quantidade}")
+        if tipo_movimento in TIPOS_ENTRADA:
+            delta = quantidade
+        elif tipo_movimento in TIPOS_SAIDA:
+            delta = -quantidade
         else:
             raise ValueError(f"Tipo de movimento inválido: {tipo_movimento}")
         
+        self.iniciar_transacao_escrita()
+        
+        # Atualização condicional: o saldo é lido e gravado pelo banco no mesmo comando
+        quantidade_nova = self.alterar_saldo(produto_id, delta)
+        if quantidade_nova is None:
+            produto = self.db.query(Produto).filter(Produto.id == produto_id).first()
+            if not produto:
+                self.db.rollback()
+                raise ValueError(f"Produto {produto_id} não encontrado")
+            falha = {
+                "produto_id": produto_id,
+                "nome": produto.nome,
+                "estoque_atual": produto.estoque,
+                "solicitado": quantidade
+            }
+            self.db.rollback()
+            raise EstoqueInsuficienteError([falha])
+        
+        quantidade_anterior = quantidade_nova - delta
+        
         # Criar movimento
         movimento = MovimentoEstoque(
             produto_id=produto_id,
@@ -50,33 +124,16 @@ class EstoqueService:
             documento=documento
         )
         
-        # Atualizar estoque do produto
-        produto.estoque = quantidade_nova
-        
         self.db.add(movimento)
+        alertas = AlertaEstoqueService(self.db).sincronizar([produto_id])
         self.db.commit()
         self.db.refresh(movimento)
+        indice_codigos.atualizar_estoque({produto_id: quantidade_nova}, {produto_id: movimento.id})
+        cache_catalogo.invalidar()
+        publicar_estoque({produto_id: quantidade_nova}, tipo_movimento, alertas)
         
         return movimento
     
-    def processar_venda(self, venda: Venda) -> list[MovimentoEstoque]:
-        """Processar saída de estoque para uma venda"""
-        movimentos = []
-        
-        for item in venda.itens:
-            movimento = self.criar_movimento(
-                produto_id=item.produto_id,
-                tipo_movimento='venda',
-                quantidade=item.quantidade,
-                preco_unitario=item.preco_unitario,
-                motivo=f"Venda #{venda.id}",
-                usuario="vendedor",
-                documento=f"VENDA-{venda.id}"
-            )
-            movimentos.append(movimento)
-        
-        return movimentos
-    
     def entrada_estoque(
         self,
         produto_id: int,
@@ -102,12 +159,18 @@ class EstoqueService:
         motivo: str = "Ajuste de estoque"
     ) -> MovimentoEstoque:
         """Ajustar estoque para uma quantidade específica"""
-        produto = self.db.query(Produto).filter(Produto.id == produto_id).first()
+        self.iniciar_transacao_escrita()
+        produto = (self.db.query(Produto)
+                   .filter(Produto.id == produto_id)
+                   .with_for_update()
+                   .first())
         if not produto:
+            self.db.rollback()
             raise ValueError(f"Produto {produto_id} não encontrado")
         
         diferenca = quantidade_nova - produto.estoque
         if diferenca == 0:
+            self.db.rollback()
             raise ValueError("Quantidade já está correta")
         
         tipo_movimento = 'ajuste_positivo' if diferenca > 0 else 'ajuste_negativo'
@@ -119,33 +182,116 @@ class EstoqueService:
             motivo=motivo
         )
     
-    def verificar_estoque_baixo(self) -> list[Produto]:
-        """Retornar produtos com estoque abaixo do mínimo"""
-        return (self.db.query(Produto)
-                .filter(Produto.estoque <= Produto.estoque_minimo)
-                .filter(Produto.ativo == True)
-                .all())
-    
-    def verificar_estoque_alto(self) -> list[Produto]:
-        """Retornar produtos com estoque acima do máximo"""
-        return (self.db.query(Produto)
-                .filter(Produto.estoque >= Produto.estoque_maximo)
-                .filter(Produto.ativo == True)
-                .all())
+    def reconciliar_inventario(
+        self,
+        contagem: dict[int, int],
+        motivo: str = "Inventário físico"
+    ) -> dict:
+        """Ajustar o estoque de vários produtos para a contagem física em uma única transação"""
+        self.iniciar_transacao_escrita()
+        
+        produtos = (self.db.query(Produto.id, Produto.nome, Produto.estoque, Produto.preco)
+                    .filter(Produto.id.in_(contagem.keys()))
+                    .with_for_update()
+                    .all())
+        
+        ajustes = []
+        sem_alteracao = 0
+        for p in produtos:
+            diferenca = contagem[p.id] - (p.estoque or 0)
+            if diferenca == 0:
+                sem_alteracao += 1
+                continue
+            ajustes.append({
+                "produto_id": p.id,
+                "nome": p.nome,
+                "estoque_anterior": p.estoque or 0,
+                "contado": contagem[p.id],
+                "diferenca": diferenca,
+                "valor_diferenca": p.preco * diferenca
+            })
+        
+        if ajustes:
+            self.db.execute(update(Produto), [
+                {"id": a["produto_id"], "estoque": a["contado"]} for a in ajustes
+            ])
+            movimentos = self.db.execute(insert(MovimentoEstoque).returning(
+                MovimentoEstoque.produto_id, MovimentoEstoque.id
+            ), [
+                {
+                    "produto_id": a["produto_id"],
+                    "tipo_movimento": 'ajuste_positivo' if a["diferenca"] > 0 else 'ajuste_negativo',
+                    "quantidade": abs(a["diferenca"]),
+                    "quantidade_anterior": a["estoque_anterior"],
+                    "quantidade_nova": a["contado"],
+                    "motivo": motivo,
+                    "usuario": "inventario"
+                }
+                for a in ajustes
+            ]).all()
+            alertas = AlertaEstoqueService(self.db).sincronizar(a["produto_id"] for a in ajustes)
+        self.db.commit()
+        
+        if ajustes:
+            saldos = {a["produto_id"]: a["contado"] for a in ajustes}
+            indice_codigos.atualizar_estoque(saldos, dict(movimentos))
+            cache_catalogo.invalidar()
+            publicar_estoque(saldos, "inventario", alertas)
+        
+        encontrados = {p.id for p in produtos}
+        sobras = [a for a in ajustes if a["diferenca"] > 0]
+        faltas = [a for a in ajustes if a["diferenca"] < 0]
+        return {
+            "itens_contados": len(contagem),
+            "sem_alteracao": sem_alteracao,
+            "ajustados": len(ajustes),
+            "nao_encontrados": [pid for pid in contagem if pid not in encontrados],
+            "sobras": {
+                "produtos": len(sobras),
+                "unidades": sum(a["diferenca"] for a in sobras),
+                "valor": float(sum((a["valor_diferenca"] for a in sobras), Decimal("0")))
+            },
+            "faltas": {
+                "produtos": len(faltas),
+                "unidades": -sum(a["diferenca"] for a in faltas),
+                "valor": float(-sum((a["valor_diferenca"] for a in faltas), Decimal("0")))
+            },
+            "ajustes": [
+                {**a, "valor_diferenca": float(a["valor_diferenca"])} for a in ajustes
+            ]
+        }
     
     def obter_movimentos(
         self,
         produto_id: Optional[int] = None,
         tipo_movimento: Optional[str] = None,
-        limit: int = 100
-    ) -> list[MovimentoEstoque]:
-        """Obter histórico de movimentações"""
-        query = self.db.query(MovimentoEstoque)
+        limit: int = 100,
+        antes_de_id: Optional[int] = None
+    ) -> list:
+        """Obter histórico de movimentações (mais recentes primeiro)
+
+        Quando as ativas acabam, a página continua nas arquivadas, que têm ids anteriores.
+        """
+        movimentos = self._pagina_movimentos(MovimentoEstoque, produto_id, tipo_movimento,
+                                             limit, antes_de_id)
+        if len(movimentos) < limit:
+            antes = movimentos[-1].id if movimentos else antes_de_id
+            movimentos += self._pagina_movimentos(MovimentoEstoqueArquivo, produto_id, tipo_movimento,
+                                                  limit - len(movimentos), antes)
+        return movimentos
+    
+    def _pagina_movimentos(self, modelo, produto_id: Optional[int], tipo_movimento: Optional[str],
+                           limit: int, antes_de_id: Optional[int]) -> list:
+        stmt = (select(*colunas_movimento(modelo, COLUNAS_HISTORICO), Produto.nome.label("produto_nome"))
+                .join(Produto, modelo.produto_id == Produto.id))
+        
+        if antes_de_id:
+            stmt = stmt.where(modelo.id < antes_de_id)
         
         if produto_id:
-            query = query.filter(MovimentoEstoque.produto_id == produto_id)
+            stmt = stmt.where(modelo.produto_id == produto_id)
         
         if tipo_movimento:
-            query = query.filter(MovimentoEstoque.tipo_movimento == tipo_movimento)
+            stmt = stmt.where(modelo.tipo_movimento == tipo_movimento)
         
-        return query.order_by(MovimentoEstoque.created_at.desc()).limit(limit).all()
\ No newline at end of file
+        return self.db.execute(stmt.order_by(modelo.id.desc()).limit(limit)).all()
\ No newline at end of file
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+# Mensagens pendentes por cliente; quem encher a fila é desconectado
+TAMANHO_FILA = 256
+# Eventos guardados para reenviar a quem reconecta com Last-Event-ID
+TAMANHO_HISTORICO = 512
+
+CANAIS = ("estoque", "venda", "produto", "alerta")
+
+@dataclass(eq=False)
+class Assinante:
+    fila: asyncio.Queue
+    canais: Optional[frozenset] = None
+    descartado: bool = False
+
+class HubEventos:
+    """Publicação em memória para os clientes SSE deste processo
+
+    `publicar` pode ser chamado de qualquer thread (as rotas síncronas rodam no threadpool);
+    a distribuição acontece sempre no loop de eventos. Cada mensagem é serializada uma vez
+    e a mesma string vai para todas as filas.
+    """
+
+    def __init__(self, tamanho_fila: int = TAMANHO_FILA):
+        self.tamanho_fila = tamanho_fila
+        self._assinantes: set[Assinante] = set()
+        self._historico: deque = deque(maxlen=TAMANHO_HISTORICO)
+        self._sequencia = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.descartados = 0
+
+    def iniciar(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def assinar(self, canais: Optional[Iterable[str]] = None, ultimo_id: Optional[int] = None) -> Assinante:
+        """Registrar um cliente (chamar no loop de eventos)"""
+        assinante = Assinante(asyncio.Queue(maxsize=self.tamanho_fila),
+                              frozenset(canais) if canais else None)
+        if ultimo_id is not None:
+            for evento_id, canal, mensagem in list(self._historico):
+                if evento_id > ultimo_id and self._interessa(assinante, canal):
+                    self._entregar(assinante, mensagem)
+        self._assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante):
+        self._assinantes.discard(assinante)
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._assinantes)
+
+    def publicar(self, canal: str, dados: dict):
+        """Enviar um evento a todos os assinantes do canal; sem loop ativo (scripts, CLI) não faz nada"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        dados_json = json.dumps(dados, ensure_ascii=False, default=str)
+        try:
+            if asyncio.get_running_loop() is loop:
+                self._distribuir(canal, dados_json)
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(self._distribuir, canal, dados_json)
+
+    @staticmethod
+    def _interessa(assinante: Assinante, canal: str) -> bool:
+        return assinante.canais is None or canal in assinante.canais
+
+    def _distribuir(self, canal: str, dados_json: str):
+        # Ids atribuídos no loop, na mesma ordem em que os clientes recebem
+        evento_id = next(self._sequencia)
+        mensagem = f"id: {evento_id}\nevent: {canal}\ndata: {dados_json}\n\n"
+        self._historico.append((evento_id, canal, mensagem))
+        for assinante in list(self._assinantes):
+            if self._interessa(assinante, canal):
+                self._entregar(assinante, mensagem)
+
+    def _entregar(self, assinante: Assinante, mensagem: str):
+        try:
+            assinante.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            # Cliente lento: descarta o que estava na fila e encerra; o navegador reconecta
+            self._assinantes.discard(assinante)
+            assinante.descartado = True
+            self.descartados += 1
+            while not assinante.fila.empty():
+                assinante.fila.get_nowait()
+            assinante.fila.put_nowait(None)
+
+hub_eventos = HubEventos()
+
+def publicar_estoque(saldos: dict[int, int], origem: str, alertas: list[dict] = ()):
+    """Novos saldos (depois do commit) e os cruzamentos de limite que eles causaram"""
+    hub_eventos.publicar("estoque", {
+        "origem": origem,
+        "saldos": [{"produto_id": pid, "estoque": estoque} for pid, estoque in saldos.items()]
+    })
+    publicar_alertas(alertas)
+
+def publicar_alertas(alertas: list[dict]):
+    if alertas:
+        hub_eventos.publicar("alerta", {"eventos": list(alertas)})
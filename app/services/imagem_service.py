@@ -0,0 +1,209 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, Optional
+from uuid import uuid4
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Produto
+
+# Diretório das fotos de produtos (servido em /static/img/produtos)
+UPLOAD_DIR = "app/static/img/produtos"
+URL_BASE = "/static/img/produtos"
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# Leitura do upload em blocos, sem carregar o arquivo inteiro na memória
+TAMANHO_BLOCO = 1024 * 1024
+
+# Maior lado de cada variante, em pixels (coluna do Produto que guarda a URL)
+VARIANTES = {
+    "thumb": (160, "foto_thumb_url"),
+    "card": (480, "foto_card_url"),
+    "full": (1600, "foto_url")
+}
+QUALIDADE = {"thumb": 70, "card": 78, "full": 82}
+
+# Fotos de celular passam de 12 MP com folga; acima disso é recusado
+MAX_PIXELS = 60_000_000
+
+# Pillow libera o GIL ao decodificar, redimensionar e codificar; o pool limita quantas fotos
+# são processadas ao mesmo tempo para não tomar a CPU das vendas
+pool_imagens = ThreadPoolExecutor(max_workers=settings.imagens_workers, thread_name_prefix="imagens")
+
+class ImagemInvalida(ValueError):
+    pass
+
+@lru_cache(maxsize=1)
+def _formato() -> tuple[str, str]:
+    """WebP quando o Pillow tiver suporte; JPEG progressivo caso contrário"""
+    # Pillow só é importado no primeiro processamento, fora da inicialização da aplicação
+    from PIL import Image, features
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    return ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+def caminho_da_url(url: Optional[str]) -> Optional[str]:
+    """Arquivo local de uma URL /static/img/produtos/..."""
+    if not url or not url.startswith(URL_BASE + "/"):
+        return None
+    return os.path.join(UPLOAD_DIR, os.path.basename(url))
+
+def salvar_upload(arquivo: BinaryIO, limite_bytes: int) -> str:
+    """Copiar o upload em blocos para um arquivo temporário, parando ao passar do limite"""
+    descritor, caminho = tempfile.mkstemp(prefix="upload-")
+    total = 0
+    try:
+        with os.fdopen(descritor, "wb") as destino:
+            while bloco := arquivo.read(TAMANHO_BLOCO):
+                total += len(bloco)
+                if total > limite_bytes:
+                    raise ImagemInvalida(f"Imagem maior que {limite_bytes // (1024 * 1024)} MB")
+                destino.write(bloco)
+    except BaseException:
+        os.remove(caminho)
+        raise
+    return caminho
+
+def _preparar(imagem, formato: str):
+    from PIL import Image, ImageOps
+
+    # Aplica a rotação do EXIF antes de descartá-lo; as variantes são salvas sem metadados
+    imagem = ImageOps.exif_transpose(imagem)
+    transparente = imagem.mode in ("RGBA", "LA", "PA") or "transparency" in imagem.info
+    if not transparente:
+        return imagem.convert("RGB")
+    imagem = imagem.convert("RGBA")
+    if formato == "JPEG":
+        fundo = Image.new("RGB", imagem.size, (255, 255, 255))
+        fundo.paste(imagem, mask=imagem.getchannel("A"))
+        return fundo
+    return imagem
+
+def _abrir(origem: str):
+    """Abrir e decodificar a imagem; só falhas de leitura viram ImagemInvalida"""
+    from PIL import Image
+
+    try:
+        imagem = Image.open(origem)
+    except Image.DecompressionBombError:
+        raise ImagemInvalida("Imagem com resolução grande demais")
+    except (Image.UnidentifiedImageError, OSError) as e:
+        raise ImagemInvalida(f"Não foi possível ler a imagem: {e}")
+    try:
+        maior = VARIANTES["full"][0]
+        # JPEG: decodifica já reduzido (escala 1/2, 1/4, 1/8) quando a foto é muito maior que a variante
+        imagem.draft("RGB", (maior, maior))
+        imagem.load()
+    except OSError as e:
+        imagem.close()
+        raise ImagemInvalida(f"Não foi possível ler a imagem: {e}")
+    return imagem
+
+def gerar_variantes(origem: str) -> dict[str, str]:
+    """Gerar as variantes (thumb, card, full) de uma imagem; retorna {coluna: url}
+
+    Roda no pool de imagens. O arquivo de origem não é alterado. Erros ao gravar
+    as variantes (disco cheio, permissão) não são da imagem e sobem como estão.
+    """
+    from PIL import Image
+
+    formato, extensao = _formato()
+    nome_base = uuid4().hex
+    criados = []
+    with _abrir(origem) as imagem:
+        imagem = _preparar(imagem, formato)
+        urls = {}
+        try:
+            # Da maior para a menor: cada variante é reduzida a partir da anterior
+            for variante, (lado, coluna) in sorted(VARIANTES.items(), key=lambda v: -v[1][0]):
+                imagem.thumbnail((lado, lado), Image.LANCZOS)
+                nome = f"{nome_base}-{variante}.{extensao}"
+                caminho = os.path.join(UPLOAD_DIR, nome)
+                opcoes = {"quality": QUALIDADE[variante]}
+                if formato == "JPEG":
+                    opcoes.update(optimize=True, progressive=True)
+                else:
+                    opcoes["method"] = 4
+                criados.append(caminho)
+                imagem.save(caminho, formato, **opcoes)
+                urls[coluna] = f"{URL_BASE}/{nome}"
+        except BaseException:
+            _remover(criados)
+            raise
+    return urls
+
+def processar(origem: str) -> dict[str, str]:
+    """Gerar as variantes no pool de imagens e esperar o resultado"""
+    return pool_imagens.submit(gerar_variantes, origem).result()
+
+def remover_fotos(*urls: Optional[str]):
+    _remover(filter(None, (caminho_da_url(url) for url in urls)))
+
+def _remover(caminhos):
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+def urls_do_produto(produto: Produto) -> list[Optional[str]]:
+    return [getattr(produto, coluna) for _, coluna in VARIANTES.values()]
+
+class FotoProdutoService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def atualizar(self, produto: Produto, arquivo: BinaryIO) -> Produto:
+        """Gravar o upload, gerar as variantes e trocar as fotos do produto (apaga as anteriores)"""
+        temporario = salvar_upload(arquivo, settings.foto_max_mb * 1024 * 1024)
+        try:
+            urls = processar(temporario)
+        finally:
+            _remover([temporario])
+
+        anteriores = urls_do_produto(produto)
+        try:
+            for coluna, url in urls.items():
+                setattr(produto, coluna, url)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            remover_fotos(*urls.values())
+            raise
+        remover_fotos(*anteriores)
+        return produto
+
+    def reprocessar_existentes(self, lote: int = 50) -> dict:
+        """Gerar variantes das fotos enviadas antes do pipeline (sem miniatura gravada)
+
+        As fotos originais são substituídas pelas variantes e apagadas.
+        """
+        pendentes = (self.db.query(Produto.id, Produto.foto_url)
+                     .filter(Produto.foto_url.isnot(None), Produto.foto_thumb_url.is_(None))
+                     .order_by(Produto.id)
+                     .all())
+        relatorio = {"pendentes": len(pendentes), "processados": 0, "erros": []}
+        for inicio in range(0, len(pendentes), lote):
+            parte = pendentes[inicio:inicio + lote]
+            futuros = {}
+            for produto_id, url in parte:
+                caminho = caminho_da_url(url)
+                if caminho is None or not os.path.exists(caminho):
+                    relatorio["erros"].append({"produto_id": produto_id, "erro": f"Arquivo não encontrado: {url}"})
+                    continue
+                futuros[produto_id] = (caminho, pool_imagens.submit(gerar_variantes, caminho))
+
+            alterados = []
+            for produto_id, (caminho, futuro) in futuros.items():
+                try:
+                    alterados.append({"id": produto_id, **futuro.result()})
+                except ImagemInvalida as e:
+                    relatorio["erros"].append({"produto_id": produto_id, "erro": str(e)})
+            if alterados:
+                # UPDATE em lote pela chave primária
+                self.db.execute(update(Produto), alterados)
+                self.db.commit()
+                _remover(futuros[a["id"]][0] for a in alterados)
+            relatorio["processados"] += len(alterados)
+        return relatorio
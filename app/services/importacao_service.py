@@ -0,0 +1,185 @@
+import csv
+import io
+import logging
+from itertools import islice
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import Produto
+from app.schemas.produto import ProdutoCreate
+from app.services.indice_produtos import indice_codigos
+from app.services.catalogo_cache import cache_catalogo
+from app.services.alerta_service import AlertaEstoqueService
+from app.services.estoque_service import EstoqueService
+from app.services.eventos import hub_eventos, publicar_alertas
+from typing import BinaryIO, Iterable, Iterator
+
+logger = logging.getLogger("app.importacao")
+
+# Linhas por transação; com os gatilhos do índice de busca, um INSERT de 500 linhas
+# fica abaixo do limite de query lenta
+TAMANHO_LOTE = 500
+# Erros devolvidos no relatório (o total continua sendo contado)
+MAX_ERROS_RELATORIO = 1000
+
+CAMPOS_PRODUTO = set(ProdutoCreate.model_fields)
+CAMPOS_DECIMAIS = {"preco", "aliquota_icms", "aliquota_pis", "aliquota_cofins", "aliquota_ipi"}
+# Estoque de produto existente só muda por movimentação, para não quebrar o histórico
+CAMPOS_SO_NA_CRIACAO = {"estoque", "estoque_inicial"}
+
+def ler_csv(arquivo: BinaryIO) -> Iterator[dict]:
+    """Ler um CSV (separado por vírgula ou ponto e vírgula) linha a linha"""
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+    yield from csv.DictReader(texto, dialect=dialeto)
+
+def ler_xlsx(arquivo: BinaryIO) -> Iterator[dict]:
+    """Ler a primeira planilha de um XLSX em modo streaming (primeira linha = cabeçalho)"""
+    from openpyxl import load_workbook
+
+    planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+    linhas = planilha.iter_rows(values_only=True)
+    cabecalho = [str(c).strip() if c is not None else "" for c in next(linhas, [])]
+    for valores in linhas:
+        yield dict(zip(cabecalho, valores))
+
+def ler_planilha(arquivo: BinaryIO, nome_arquivo: str) -> Iterator[dict]:
+    if nome_arquivo.lower().endswith((".xlsx", ".xlsm")):
+        return ler_xlsx(arquivo)
+    if nome_arquivo.lower().endswith((".csv", ".txt")):
+        return ler_csv(arquivo)
+    raise ValueError("Formato não suportado: envie um arquivo .csv ou .xlsx")
+
+def _normalizar(linha: dict) -> dict:
+    """Cabeçalhos em minúsculas, vazios removidos e decimais no formato brasileiro aceitos"""
+    dados = {}
+    for chave, valor in linha.items():
+        if chave is None:
+            continue
+        campo = str(chave).strip().lower()
+        if campo not in CAMPOS_PRODUTO or valor is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip()
+            if valor == "":
+                continue
+            if campo in CAMPOS_DECIMAIS and "," in valor:
+                valor = valor.replace(".", "").replace(",", ".")
+        elif campo == "codigo_barras" and isinstance(valor, (int, float)):
+            # Excel guarda EAN como número
+            valor = str(int(valor))
+        dados[campo] = valor
+    return dados
+
+class ImportacaoProdutosService:
+    def __init__(self, db: Session, tamanho_lote: int = TAMANHO_LOTE):
+        self.db = db
+        self.tamanho_lote = tamanho_lote
+
+    def importar(self, linhas: Iterable[dict]) -> dict:
+        """Validar e gravar produtos em lotes: insere os novos e atualiza os existentes pelo código de barras
+
+        Índice de códigos e alertas são atualizados só para os produtos de cada lote gravado.
+        Banco ocupado (BancoOcupadoError) interrompe a importação; os lotes anteriores ficam gravados.
+        """
+        relatorio = {"linhas": 0, "inseridos": 0, "atualizados": 0, "total_erros": 0, "erros": []}
+        alertas = []
+        try:
+            self._importar_lotes(linhas, relatorio, alertas)
+        finally:
+            if relatorio["inseridos"] or relatorio["atualizados"]:
+                cache_catalogo.invalidar()
+                hub_eventos.publicar("produto", {"acao": "importacao"})
+                publicar_alertas(alertas)
+        return relatorio
+
+    def _importar_lotes(self, linhas: Iterable[dict], relatorio: dict, alertas: list):
+        codigos_vistos = {}
+
+        # Linha 1 é o cabeçalho
+        numeradas = enumerate(linhas, start=2)
+        while True:
+            lote = list(islice(numeradas, self.tamanho_lote))
+            if not lote:
+                break
+            relatorio["linhas"] += len(lote)
+
+            validos = []
+            for numero, linha in lote:
+                dados = _normalizar(linha)
+                if not dados:
+                    relatorio["linhas"] -= 1  # linha em branco
+                    continue
+                try:
+                    produto = ProdutoCreate(**dados)
+                except ValidationError as e:
+                    self._erro(relatorio, numero, "; ".join(
+                        f"{'.'.join(str(p) for p in erro['loc'])}: {erro['msg']}" for erro in e.errors()
+                    ))
+                    continue
+                codigo = produto.codigo_barras
+                if codigo:
+                    if codigo in codigos_vistos:
+                        self._erro(relatorio, numero, f"Código de barras {codigo} repetido (linha {codigos_vistos[codigo]})")
+                        continue
+                    codigos_vistos[codigo] = numero
+                validos.append((numero, produto))
+
+            if not validos:
+                continue
+            try:
+                alertas.extend(self._gravar_lote(validos, relatorio))
+            except SQLAlchemyError:
+                # Detalhes (SQL, caminhos) só no log; o relatório diz apenas que o lote falhou
+                self.db.rollback()
+                logger.exception("Lote da importação não gravado (linhas %d a %d)", validos[0][0], validos[-1][0])
+                for numero, _ in validos:
+                    self._erro(relatorio, numero, "Lote não gravado por erro no banco de dados; importe a linha novamente")
+
+    def _gravar_lote(self, validos: list, relatorio: dict) -> list[dict]:
+        """Gravar um lote em uma transação; retorna os eventos de alerta dos produtos do lote"""
+        EstoqueService(self.db).iniciar_transacao_escrita()
+        # Uma consulta por lote para descobrir quais códigos já existem
+        codigos = [p.codigo_barras for _, p in validos if p.codigo_barras]
+        existentes = dict(
+            self.db.query(Produto.codigo_barras, Produto.id)
+            .filter(Produto.codigo_barras.in_(codigos))
+            .all()
+        ) if codigos else {}
+
+        novos = []
+        alterados = []
+        for _, produto in validos:
+            produto_id = existentes.get(produto.codigo_barras)
+            if produto_id is None:
+                novos.append(produto.model_dump())
+            else:
+                campos = produto.model_fields_set - CAMPOS_SO_NA_CRIACAO
+                alterados.append({"id": produto_id, **produto.model_dump(include=campos)})
+
+        produto_ids = [a["id"] for a in alterados]
+        if novos:
+            # INSERT da tabela (Core): as linhas já vêm validadas e o bulk do ORM só somaria custo
+            produto_ids += self.db.scalars(insert(Produto.__table__).returning(Produto.id), novos).all()
+        if alterados:
+            # UPDATE em lote pela chave primária
+            self.db.execute(update(Produto), alterados)
+        alertas = AlertaEstoqueService(self.db).sincronizar(produto_ids)
+        self.db.commit()
+
+        indice_codigos.recarregar_produtos(self.db, produto_ids)
+        relatorio["inseridos"] += len(novos)
+        relatorio["atualizados"] += len(alterados)
+        return alertas
+
+    @staticmethod
+    def _erro(relatorio: dict, linha: int, mensagem: str):
+        relatorio["total_erros"] += 1
+        if len(relatorio["erros"]) < MAX_ERROS_RELATORIO:
+            relatorio["erros"].append({"linha": linha, "erro": mensagem})
@@ -0,0 +1,117 @@
+import threading
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import MovimentoEstoque, Produto
+from typing import Optional
+
+# Colunas guardadas no índice (carregadas sem montar objetos Produto)
+COLUNAS_INDICE = (Produto.id, Produto.nome, Produto.codigo_barras, Produto.preco, Produto.estoque,
+                  Produto.categoria, Produto.foto_url, Produto.foto_thumb_url)
+CHAVES_INDICE = tuple(coluna.key for coluna in COLUNAS_INDICE)
+
+class IndiceCodigoBarras:
+    """Índice em memória dos produtos ativos por código de barras, usado na leitura do scanner"""
+
+    def __init__(self):
+        self._por_codigo: dict[str, dict] = {}
+        self._codigo_por_id: dict[int, str] = {}
+        # Último movimento aplicado por produto: saldo de um movimento mais antigo é descartado
+        self._movimento_por_id: dict[int, int] = {}
+        self._movimento_base = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.carregado = False
+
+    @staticmethod
+    def _entrada(produto: Produto) -> dict:
+        return {
+            "id": produto.id,
+            "nome": produto.nome,
+            "codigo_barras": produto.codigo_barras,
+            "preco": float(produto.preco),
+            "estoque": produto.estoque,
+            "categoria": produto.categoria,
+            "foto_url": produto.foto_url,
+            "foto_thumb_url": produto.foto_thumb_url
+        }
+
+    def carregar(self, db: Session):
+        """Reconstruir o índice a partir do banco"""
+        # Lido antes dos produtos: movimentos até aqui já estão nos saldos carregados
+        movimento_base = db.query(func.coalesce(func.max(MovimentoEstoque.id), 0)).scalar()
+        produtos = (db.query(*COLUNAS_INDICE)
+                    .filter(Produto.ativo == True, Produto.codigo_barras.isnot(None))
+                    .all())
+        # Linhas montadas pela posição: acessar cada coluna pelo nome custava a maior parte da carga
+        por_codigo = {}
+        for linha in produtos:
+            entrada = dict(zip(CHAVES_INDICE, linha))
+            entrada["preco"] = float(entrada["preco"])
+            por_codigo[entrada["codigo_barras"]] = entrada
+        with self._lock:
+            self._por_codigo = por_codigo
+            self._codigo_por_id = {e["id"]: codigo for codigo, e in por_codigo.items()}
+            self._movimento_por_id = {}
+            self._movimento_base = movimento_base
+            self.carregado = True
+
+    def buscar(self, codigo_barras: str) -> Optional[dict]:
+        with self._lock:
+            entrada = self._por_codigo.get(codigo_barras)
+            if entrada is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entrada
+
+    def atualizar(self, produto: Produto):
+        """Refletir criação/edição de um produto (produtos inativos saem do índice)"""
+        with self._lock:
+            codigo_antigo = self._codigo_por_id.pop(produto.id, None)
+            if codigo_antigo is not None:
+                self._por_codigo.pop(codigo_antigo, None)
+            if produto.ativo and produto.codigo_barras:
+                self._por_codigo[produto.codigo_barras] = self._entrada(produto)
+                self._codigo_por_id[produto.id] = produto.codigo_barras
+
+    def recarregar_produtos(self, db: Session, produto_ids: list[int]):
+        """Reler do banco só os produtos informados (ex.: um lote da importação)"""
+        if not produto_ids:
+            return
+        for produto in db.query(*COLUNAS_INDICE, Produto.ativo).filter(Produto.id.in_(produto_ids)):
+            self.atualizar(produto)
+
+    def remover(self, produto_id: int):
+        with self._lock:
+            codigo = self._codigo_por_id.pop(produto_id, None)
+            if codigo is not None:
+                self._por_codigo.pop(codigo, None)
+
+    def atualizar_estoque(self, saldos: dict[int, int], movimentos: dict[int, int]):
+        """Aplicar novos saldos de estoque após o commit das movimentações
+
+        `saldos` é produto_id -> estoque e `movimentos` é produto_id -> id do movimento que gerou
+        o saldo. Duas vendas do mesmo produto podem chegar aqui fora de ordem; o saldo só é
+        aplicado se vier de um movimento mais novo que o já aplicado.
+        """
+        with self._lock:
+            for produto_id, estoque in saldos.items():
+                movimento_id = movimentos[produto_id]
+                if movimento_id <= self._movimento_por_id.get(produto_id, self._movimento_base):
+                    continue
+                self._movimento_por_id[produto_id] = movimento_id
+                codigo = self._codigo_por_id.get(produto_id)
+                if codigo is not None:
+                    self._por_codigo[codigo] = {**self._por_codigo[codigo], "estoque": estoque}
+
+    def estatisticas(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "produtos_indexados": len(self._por_codigo),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": self.hits / consultas if consultas else 0
+        }
+
+indice_codigos = IndiceCodigoBarras()
@@ -0,0 +1,135 @@
+from sqlalchemy import extract, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models import Venda, ItemVenda, ResumoVendaHora, ResumoVendaProduto
+from decimal import Decimal
+
+def _centavos(valor) -> Decimal:
+    return Decimal(str(valor or 0)).quantize(Decimal("0.01"))
+
+class ResumoVendasService:
+    """Manutenção das tabelas de resumo usadas pelos relatórios"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _upsert(self, modelo, chaves: list[str], linhas: list[dict], acumular: list[str]):
+        """INSERT ... ON CONFLICT DO UPDATE somando os contadores"""
+        if self.db.bind.dialect.name == "postgresql":
+            stmt = pg_insert(modelo)
+        else:
+            stmt = sqlite_insert(modelo)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=chaves,
+            set_={campo: getattr(modelo, campo) + getattr(stmt.excluded, campo) for campo in acumular}
+        )
+        self.db.execute(stmt, linhas)
+
+    def registrar_venda(self, venda: Venda, itens: list[dict]):
+        """Somar uma venda recém-criada aos resumos (dentro da transação da venda)"""
+        data = venda.created_at.date()
+        self._upsert(ResumoVendaHora, ["data", "hora", "forma_pagamento", "status"], [{
+            "data": data,
+            "hora": venda.created_at.hour,
+            "forma_pagamento": venda.forma_pagamento,
+            "status": venda.status,
+            "quantidade_vendas": 1,
+            "total": venda.total
+        }], ["quantidade_vendas", "total"])
+
+        por_produto = {}
+        for item in itens:
+            linha = por_produto.setdefault(item["produto_id"], {
+                "data": data,
+                "produto_id": item["produto_id"],
+                "status": venda.status,
+                "quantidade": 0,
+                "faturamento": Decimal("0.00")
+            })
+            linha["quantidade"] += item["quantidade"]
+            linha["faturamento"] += item["quantidade"] * item["preco_unitario"]
+        self._upsert(ResumoVendaProduto, ["data", "produto_id", "status"],
+                     list(por_produto.values()), ["quantidade", "faturamento"])
+
+    def _agregado_hora(self):
+        return (select(
+                    func.date(Venda.created_at).label("data"),
+                    extract("hour", Venda.created_at).label("hora"),
+                    Venda.forma_pagamento,
+                    Venda.status,
+                    func.count(Venda.id).label("quantidade_vendas"),
+                    func.sum(Venda.total).label("total"))
+                .group_by(func.date(Venda.created_at), extract("hour", Venda.created_at),
+                          Venda.forma_pagamento, Venda.status))
+
+    def _agregado_produto(self):
+        return (select(
+                    func.date(Venda.created_at).label("data"),
+                    ItemVenda.produto_id,
+                    Venda.status,
+                    func.sum(ItemVenda.quantidade).label("quantidade"),
+                    func.sum(ItemVenda.quantidade * ItemVenda.preco_unitario).label("faturamento"))
+                .join(Venda, ItemVenda.venda_id == Venda.id)
+                .group_by(func.date(Venda.created_at), ItemVenda.produto_id, Venda.status))
+
+    def reconstruir(self):
+        """Recalcular os resumos a partir de todo o histórico de vendas"""
+        self.db.query(ResumoVendaHora).delete()
+        self.db.query(ResumoVendaProduto).delete()
+        self.db.execute(insert(ResumoVendaHora).from_select(
+            ["data", "hora", "forma_pagamento", "status", "quantidade_vendas", "total"],
+            self._agregado_hora()
+        ))
+        self.db.execute(insert(ResumoVendaProduto).from_select(
+            ["data", "produto_id", "status", "quantidade", "faturamento"],
+            self._agregado_produto()
+        ))
+        self.db.commit()
+
+    def reconstruir_se_vazio(self) -> bool:
+        """Preencher os resumos na primeira execução com vendas já existentes"""
+        if self.db.query(ResumoVendaHora.id).first() or not self.db.query(Venda.id).first():
+            return False
+        self.reconstruir()
+        return True
+
+    def verificar(self) -> list[dict]:
+        """Comparar os resumos com os dados brutos; retorna as divergências encontradas"""
+        divergencias = []
+
+        esperado = {
+            (str(r.data), int(r.hora), r.forma_pagamento, r.status): (r.quantidade_vendas, _centavos(r.total))
+            for r in self.db.execute(self._agregado_hora())
+        }
+        atual = {
+            (str(r.data), r.hora, r.forma_pagamento, r.status): (r.quantidade_vendas, _centavos(r.total))
+            for r in self.db.query(ResumoVendaHora).all()
+        }
+        for chave in esperado.keys() | atual.keys():
+            if esperado.get(chave) != atual.get(chave):
+                divergencias.append({
+                    "tabela": ResumoVendaHora.__tablename__,
+                    "chave": chave,
+                    "esperado": esperado.get(chave),
+                    "atual": atual.get(chave)
+                })
+
+        esperado = {
+            (str(r.data), r.produto_id, r.status): (r.quantidade, _centavos(r.faturamento))
+            for r in self.db.execute(self._agregado_produto())
+        }
+        atual = {
+            (str(r.data), r.produto_id, r.status): (r.quantidade, _centavos(r.faturamento))
+            for r in self.db.query(ResumoVendaProduto).all()
+        }
+        for chave in esperado.keys() | atual.keys():
+            if esperado.get(chave) != atual.get(chave):
+                divergencias.append({
+                    "tabela": ResumoVendaProduto.__tablename__,
+                    "chave": chave,
+                    "esperado": esperado.get(chave),
+                    "atual": atual.get(chave)
+                })
+
+        return divergencias
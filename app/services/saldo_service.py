@@ -0,0 +1,198 @@
+from sqlalchemy import cast, func, insert, null, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models import Produto, MovimentoEstoque, MovimentoEstoqueArquivo, SaldoEstoque
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+# Tamanho das listas IN e dos lotes de arquivamento
+LOTE_PRODUTOS = 500
+LOTE_ARQUIVO = 10000
+
+# Movimentações ativas e arquivadas têm as colunas usadas nas consultas de saldo
+MODELOS_MOVIMENTO = (MovimentoEstoque, MovimentoEstoqueArquivo)
+COLUNAS_ARQUIVO = ["id", "produto_id", "tipo_movimento", "quantidade", "quantidade_anterior",
+                   "quantidade_nova", "valor_total", "documento", "created_at"]
+
+def colunas_movimento(modelo, nomes: list[str]) -> list:
+    """Colunas de uma das tabelas de movimentação; as que o arquivo não guarda saem como NULL
+
+    Permite ler ativas e arquivadas na mesma consulta (UNION ALL) ou em sequência.
+    """
+    return [getattr(modelo, nome) if nome in modelo.__table__.c
+            else cast(null(), MovimentoEstoque.__table__.c[nome].type).label(nome)
+            for nome in nomes]
+
+def _fim_do_dia(data: date) -> datetime:
+    return datetime.combine(data + timedelta(days=1), time.min)
+
+def _em_lotes(ids: list[int], tamanho: int = LOTE_PRODUTOS) -> Iterable[list[int]]:
+    for i in range(0, len(ids), tamanho):
+        yield ids[i:i + tamanho]
+
+class SaldoEstoqueService:
+    """Saldos fechados por dia e consulta do estoque em qualquer instante
+
+    Cada movimento guarda a quantidade resultante, então o estoque em um instante é a
+    `quantidade_nova` do último movimento anterior a ele. Os saldos fechados limitam a
+    busca a esse intervalo, sem percorrer o histórico inteiro.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _ultimos_saldos(self, momento: datetime, produto_ids: list[int]) -> dict[int, SaldoEstoque]:
+        """Saldo fechado mais recente de cada produto que ainda é anterior ao instante"""
+        saldos = {}
+        for lote in _em_lotes(produto_ids):
+            ultimo = (select(SaldoEstoque.produto_id, func.max(SaldoEstoque.data).label("data"))
+                      .where(SaldoEstoque.data < momento.date(), SaldoEstoque.produto_id.in_(lote))
+                      .group_by(SaldoEstoque.produto_id)
+                      .subquery())
+            for saldo in self.db.scalars(
+                select(SaldoEstoque).join(ultimo, (SaldoEstoque.produto_id == ultimo.c.produto_id)
+                                          & (SaldoEstoque.data == ultimo.c.data))
+            ):
+                saldos[saldo.produto_id] = saldo
+        return saldos
+
+    def _movimentos_extremos(self, produto_ids: list[int], momento: datetime,
+                             desde: Optional[datetime] = None, depois: bool = False) -> dict[int, tuple]:
+        """Último movimento antes do instante (ou o primeiro a partir dele, com `depois`) por produto
+
+        Consulta as movimentações ativas e as arquivadas; retorna {produto_id: (id, anterior, nova)}.
+        """
+        extremos = {}
+        agregado = func.min if depois else func.max
+        for modelo in MODELOS_MOVIMENTO:
+            for lote in _em_lotes(produto_ids):
+                filtro = [modelo.produto_id.in_(lote)]
+                filtro.append(modelo.created_at >= momento if depois else modelo.created_at < momento)
+                if desde is not None:
+                    filtro.append(modelo.created_at >= desde)
+                ids = (select(agregado(modelo.id).label("id"))
+                       .where(*filtro)
+                       .group_by(modelo.produto_id)
+                       .subquery())
+                for m in self.db.execute(
+                    select(modelo.produto_id, modelo.id, modelo.quantidade_anterior, modelo.quantidade_nova)
+                    .join(ids, modelo.id == ids.c.id)
+                ):
+                    atual = extremos.get(m.produto_id)
+                    if atual is None or (m.id < atual[0] if depois else m.id > atual[0]):
+                        extremos[m.produto_id] = (m.id, m.quantidade_anterior, m.quantidade_nova)
+        return extremos
+
+    def saldos_em(self, momento: datetime, produto_ids: Optional[list[int]] = None) -> dict[int, int]:
+        """Estoque de cada produto imediatamente antes do instante informado"""
+        query = self.db.query(Produto.id, Produto.estoque).filter(Produto.created_at < momento)
+        if produto_ids is not None:
+            query = query.filter(Produto.id.in_(produto_ids))
+        atuais = dict(query.all())
+        ids = sorted(atuais)
+
+        saldos_fechados = self._ultimos_saldos(momento, ids)
+        resultado = {pid: s.estoque for pid, s in saldos_fechados.items()}
+
+        # Delta: só os movimentos posteriores ao saldo fechado mais antigo envolvido
+        desde = None
+        if saldos_fechados:
+            desde = _fim_do_dia(min(s.data for s in saldos_fechados.values()))
+        for pid, (mov_id, _, nova) in self._movimentos_extremos(ids, momento, desde).items():
+            saldo = saldos_fechados.get(pid)
+            if saldo is None or mov_id > saldo.movimento_id:
+                resultado[pid] = nova
+
+        # Sem saldo fechado e sem movimento no intervalo: o histórico antigo do produto pelo índice
+        sem_base = [pid for pid in ids if pid not in resultado]
+        if sem_base and desde is not None:
+            for pid, (_, _, nova) in self._movimentos_extremos(sem_base, momento).items():
+                resultado[pid] = nova
+            sem_base = [pid for pid in sem_base if pid not in resultado]
+
+        # Nenhum movimento antes do instante: o saldo de então é o anterior ao primeiro movimento seguinte
+        if sem_base:
+            for pid, (_, anterior, _) in self._movimentos_extremos(sem_base, momento, depois=True).items():
+                resultado[pid] = anterior
+            for pid in sem_base:
+                resultado.setdefault(pid, atuais[pid] or 0)
+
+        return resultado
+
+    def saldo_em(self, produto_id: int, momento: datetime) -> Optional[int]:
+        """Estoque de um produto imediatamente antes do instante (None se ainda não existia)"""
+        return self.saldos_em(momento, [produto_id]).get(produto_id)
+
+    def _agora(self) -> datetime:
+        return self.db.query(func.now()).scalar()
+
+    def gerar_saldos(self, data: date) -> int:
+        """Fechar o saldo de todos os produtos no fim do dia informado"""
+        momento = _fim_do_dia(data)
+        if momento > self._agora():
+            raise ValueError("Só é possível fechar saldos de dias já encerrados")
+
+        # Maior id já gravado antes do fim do dia: os movimentos seguintes formam o delta
+        movimento_id = max(
+            self.db.query(func.max(modelo.id)).filter(modelo.created_at < momento).scalar() or 0
+            for modelo in MODELOS_MOVIMENTO
+        )
+        linhas = [
+            {"produto_id": pid, "data": data, "estoque": estoque, "movimento_id": movimento_id}
+            for pid, estoque in self.saldos_em(momento).items()
+        ]
+        if linhas:
+            if self.db.bind.dialect.name == "postgresql":
+                stmt = pg_insert(SaldoEstoque)
+            else:
+                stmt = sqlite_insert(SaldoEstoque)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["produto_id", "data"],
+                set_={"estoque": stmt.excluded.estoque, "movimento_id": stmt.excluded.movimento_id}
+            )
+            self.db.execute(stmt, linhas)
+        self.db.commit()
+        return len(linhas)
+
+    def inclui_arquivo(self, desde: Optional[datetime] = None) -> bool:
+        """Se uma consulta a partir do instante precisa das movimentações arquivadas
+
+        Tudo o que é anterior ao movimento ativo mais antigo já foi arquivado.
+        """
+        if self.db.query(MovimentoEstoqueArquivo.id).first() is None:
+            return False
+        if desde is None:
+            return True
+        primeiro_ativo = self.db.query(func.min(MovimentoEstoque.created_at)).scalar()
+        return primeiro_ativo is None or desde < primeiro_ativo
+
+    def arquivar(self, antes_de: date, lote: int = LOTE_ARQUIVO) -> int:
+        """Mover para o arquivo as movimentações anteriores à data, em transações curtas
+
+        Exige o saldo fechado do dia anterior, para que consultas a partir da data não
+        precisem mais das movimentações arquivadas.
+        """
+        dia_anterior = antes_de - timedelta(days=1)
+        if not self.db.query(SaldoEstoque.id).filter(SaldoEstoque.data == dia_anterior).first():
+            raise ValueError(f"Feche os saldos de {dia_anterior.isoformat()} antes de arquivar")
+
+        corte = datetime.combine(antes_de, time.min)
+        primeiro, ultimo = self.db.query(
+            func.min(MovimentoEstoque.id), func.max(MovimentoEstoque.id)
+        ).filter(MovimentoEstoque.created_at < corte).one()
+        if ultimo is None:
+            return 0
+
+        total = 0
+        colunas = [getattr(MovimentoEstoque, c) for c in COLUNAS_ARQUIVO]
+        for inicio in range(primeiro, ultimo + 1, lote):
+            fim = min(inicio + lote - 1, ultimo)
+            faixa = (MovimentoEstoque.id >= inicio, MovimentoEstoque.id <= fim,
+                     MovimentoEstoque.created_at < corte)
+            self.db.execute(insert(MovimentoEstoqueArquivo).from_select(
+                COLUNAS_ARQUIVO, select(*colunas).where(*faixa)
+            ))
+            total += self.db.query(MovimentoEstoque).filter(*faixa).delete(synchronize_session=False)
+            self.db.commit()
+        return total
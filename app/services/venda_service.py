@@ -0,0 +1,302 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import Produto, MovimentoEstoque, Venda, ItemVenda, ChaveIdempotenciaVenda
+from app.schemas.venda import VendaCreate, VendaOffline
+from app.services.estoque_service import EstoqueService, EstoqueInsuficienteError, BancoOcupadoError
+from app.services.indice_produtos import indice_codigos
+from app.services.catalogo_cache import cache_catalogo
+from app.services.resumo_service import ResumoVendasService
+from app.services.alerta_service import AlertaEstoqueService
+from app.services.eventos import hub_eventos, publicar_estoque
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+import json
+import logging
+
+logger = logging.getLogger("app.vendas")
+
+# Vendas offline gravadas por transação (um commit por lote)
+TAMANHO_LOTE_OFFLINE = 100
+
+class VendaService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def finalizar_venda(self, venda: VendaCreate) -> Venda:
+        """Registrar venda, itens e baixa de estoque em uma única transação
+
+        Com chave de idempotência, o reenvio da mesma venda devolve a que já foi gravada.
+        """
+        chave = venda.chave_idempotencia
+        EstoqueService(self.db).iniciar_transacao_escrita()
+        try:
+            existente = self._venda_da_chave(chave) if chave else None
+            if existente is not None:
+                self.db.rollback()
+                return existente
+            db_venda, saldos, movimentos, alertas = self._gravar_venda(venda)
+            if chave:
+                self._registrar_chave(chave, db_venda)
+                self.db.flush()
+        except ValueError:
+            self.db.rollback()
+            raise
+        except IntegrityError:
+            # Mesma chave gravada por outra requisição ao mesmo tempo
+            self.db.rollback()
+            existente = self._venda_da_chave(chave) if chave else None
+            if existente is None:
+                raise
+            return existente
+
+        self.db.commit()
+        self.db.refresh(db_venda)
+        self._depois_do_commit([_evento_venda(db_venda)], saldos, movimentos, alertas)
+
+        return db_venda
+
+    def _gravar_venda(self, venda: VendaCreate, created_at: Optional[datetime] = None):
+        """Gravar a venda na transação atual, sem commit
+
+        Retorna (venda, saldos finais, último movimento por produto, alertas).
+        """
+        # Quantidade total por produto (o mesmo produto pode aparecer em mais de uma linha)
+        quantidades = {}
+        for item in venda.itens:
+            quantidades[item.produto_id] = quantidades.get(item.produto_id, 0) + item.quantidade
+
+        estoque_service = EstoqueService(self.db)
+
+        # Carregar todos os produtos do carrinho com uma única consulta
+        produtos = {
+            p.id: p
+            for p in self.db.query(Produto).filter(Produto.id.in_(quantidades.keys())).all()
+        }
+
+        for produto_id in quantidades:
+            if produto_id not in produtos:
+                raise ValueError(f"Produto {produto_id} não encontrado")
+
+        # Baixa atômica por produto, em ordem de id para não gerar deadlock entre caixas.
+        # Cada UPDATE só é aplicado se ainda houver saldo no momento da gravação.
+        saldos = {}
+        falhas = []
+        for produto_id in sorted(quantidades):
+            quantidade = quantidades[produto_id]
+            quantidade_nova = estoque_service.alterar_saldo(produto_id, -quantidade)
+            if quantidade_nova is None:
+                falhas.append({
+                    "produto_id": produto_id,
+                    "nome": produtos[produto_id].nome,
+                    "estoque_atual": produtos[produto_id].estoque,
+                    "solicitado": quantidade
+                })
+            else:
+                saldos[produto_id] = quantidade_nova + quantidade
+
+        if falhas:
+            raise EstoqueInsuficienteError(falhas)
+
+        total = sum((item.quantidade * item.preco_unitario for item in venda.itens), Decimal("0.00"))
+        total -= venda.desconto
+
+        db_venda = Venda(
+            total=total,
+            desconto=venda.desconto,
+            cpf_cliente=venda.cpf_cliente,
+            forma_pagamento=venda.forma_pagamento
+        )
+        if created_at is not None:
+            db_venda.created_at = created_at
+        self.db.add(db_venda)
+        self.db.flush()  # Para obter o ID da venda
+
+        # Itens da venda em lote
+        itens = [
+            {
+                "venda_id": db_venda.id,
+                "produto_id": item.produto_id,
+                "quantidade": item.quantidade,
+                "preco_unitario": item.preco_unitario
+            }
+            for item in venda.itens
+        ]
+        self.db.execute(insert(ItemVenda), itens)
+
+        # Movimentos de estoque em lote, encadeando o saldo quando o produto se repete
+        movimentos = []
+        for item in venda.itens:
+            quantidade_anterior = saldos[item.produto_id]
+            saldos[item.produto_id] = quantidade_anterior - item.quantidade
+            movimentos.append({
+                "produto_id": item.produto_id,
+                "tipo_movimento": "venda",
+                "quantidade": item.quantidade,
+                "quantidade_anterior": quantidade_anterior,
+                "quantidade_nova": saldos[item.produto_id],
+                "preco_unitario": item.preco_unitario,
+                "valor_total": item.preco_unitario * item.quantidade,
+                "motivo": f"Venda #{db_venda.id}",
+                "usuario": "vendedor",
+                "documento": f"VENDA-{db_venda.id}"
+            })
+        ultimos_movimentos = {}
+        for produto_id, movimento_id in self.db.execute(
+            insert(MovimentoEstoque).returning(MovimentoEstoque.produto_id, MovimentoEstoque.id), movimentos
+        ):
+            ultimos_movimentos[produto_id] = max(movimento_id, ultimos_movimentos.get(produto_id, 0))
+
+        ResumoVendasService(self.db).registrar_venda(db_venda, itens)
+        alertas = AlertaEstoqueService(self.db).sincronizar(saldos)
+
+        return db_venda, saldos, ultimos_movimentos, alertas
+
+    def _venda_da_chave(self, chave: str) -> Optional[Venda]:
+        return (self.db.query(Venda)
+                .join(ChaveIdempotenciaVenda, ChaveIdempotenciaVenda.venda_id == Venda.id)
+                .filter(ChaveIdempotenciaVenda.chave == chave)
+                .first())
+
+    def _registrar_chave(self, chave: str, db_venda: Venda) -> dict:
+        """Guardar a chave com a resposta devolvida aos reenvios; retorna a resposta"""
+        resposta = {
+            "venda_id": db_venda.id,
+            "total": float(db_venda.total),
+            "created_at": db_venda.created_at.isoformat()
+        }
+        self.db.add(ChaveIdempotenciaVenda(chave=chave, venda_id=db_venda.id, resposta=json.dumps(resposta)))
+        return resposta
+
+    def _depois_do_commit(self, vendas: list[dict], saldos: dict[int, int], movimentos: dict[int, int],
+                          alertas: list[dict]):
+        indice_codigos.atualizar_estoque(saldos, movimentos)
+        cache_catalogo.invalidar()
+        for evento in vendas:
+            hub_eventos.publicar("venda", evento)
+        publicar_estoque(saldos, "venda", alertas)
+
+    def importar_offline(self, vendas: list[VendaOffline], tamanho_lote: int = TAMANHO_LOTE_OFFLINE) -> dict:
+        """Gravar vendas feitas sem conexão, uma transação por lote
+
+        Cada venda traz uma chave gerada no caixa. Chave já gravada não cria outra venda:
+        a resposta é a guardada na primeira vez. Venda com erro (ex.: sem estoque) não
+        interrompe as demais do lote, e um lote que falha inteiro (banco ocupado, commit)
+        não interrompe os seguintes; em ambos os casos a venda volta como erro e pode ser
+        reenviada depois.
+        """
+        resultados = []
+        respostas = {}  # chave -> resposta já conhecida (banco ou esta mesma requisição)
+
+        for inicio in range(0, len(vendas), tamanho_lote):
+            lote = vendas[inicio:inicio + tamanho_lote]
+            resultados_lote = []
+            chaves_criadas = []
+            try:
+                pendentes = self._gravar_lote_offline(lote, respostas, resultados_lote, chaves_criadas)
+                self.db.commit()
+            except (BancoOcupadoError, SQLAlchemyError) as e:
+                # Nada do lote foi gravado: as vendas criadas nele voltam como erro
+                self.db.rollback()
+                logger.warning("Lote de %d venda(s) offline não gravado: %s", len(lote), e)
+                erro = str(e) if isinstance(e, BancoOcupadoError) else "Falha ao gravar o lote; reenvie a venda"
+                for chave in chaves_criadas:
+                    respostas.pop(chave, None)
+                resultados_lote = [
+                    {"chave": v.chave_idempotencia, "status": "duplicada", **respostas[v.chave_idempotencia]}
+                    if v.chave_idempotencia in respostas else
+                    {"chave": v.chave_idempotencia, "status": "erro", "erro": erro}
+                    for v in lote
+                ]
+                pendentes = None
+
+            resultados.extend(resultados_lote)
+            if pendentes:
+                self._depois_do_commit(*pendentes)
+
+        return {
+            "total": len(resultados),
+            "criadas": sum(1 for r in resultados if r["status"] == "criada"),
+            "duplicadas": sum(1 for r in resultados if r["status"] == "duplicada"),
+            "erros": sum(1 for r in resultados if r["status"] == "erro"),
+            "resultados": resultados
+        }
+
+    def _gravar_lote_offline(self, lote: list[VendaOffline], respostas: dict, resultados: list,
+                             chaves_criadas: list):
+        """Gravar um lote na transação atual, sem commit
+
+        Preenche `resultados` e `chaves_criadas`; retorna os argumentos de _depois_do_commit
+        (None se nenhuma venda foi criada).
+        """
+        EstoqueService(self.db).iniciar_transacao_escrita()
+
+        chaves = [v.chave_idempotencia for v in lote if v.chave_idempotencia not in respostas]
+        for registro in (self.db.query(ChaveIdempotenciaVenda)
+                         .filter(ChaveIdempotenciaVenda.chave.in_(chaves)).all()):
+            respostas[registro.chave] = json.loads(registro.resposta)
+
+        criadas = []
+        saldos_lote = {}
+        movimentos_lote = {}
+        alertas_lote = []
+        for venda in lote:
+            chave = venda.chave_idempotencia
+            if chave in respostas:
+                resultados.append({"chave": chave, "status": "duplicada", **respostas[chave]})
+                continue
+            try:
+                # Savepoint: a falha de uma venda desfaz só ela
+                with self.db.begin_nested():
+                    db_venda, saldos, movimentos, alertas = self._gravar_venda(venda, _registrada_em(venda))
+                    resposta = self._registrar_chave(chave, db_venda)
+                    self.db.flush()
+                    evento = _evento_venda(db_venda)
+            except EstoqueInsuficienteError as e:
+                resultados.append({"chave": chave, "status": "erro", "erro": str(e), "falhas": e.falhas})
+                continue
+            except ValueError as e:
+                resultados.append({"chave": chave, "status": "erro", "erro": str(e)})
+                continue
+            except IntegrityError:
+                # Mesma chave gravada por outra requisição ao mesmo tempo
+                registro = (self.db.query(ChaveIdempotenciaVenda)
+                            .filter(ChaveIdempotenciaVenda.chave == chave).first())
+                if registro is None:
+                    raise
+                respostas[chave] = json.loads(registro.resposta)
+                resultados.append({"chave": chave, "status": "duplicada", **respostas[chave]})
+                continue
+
+            respostas[chave] = resposta
+            chaves_criadas.append(chave)
+            resultados.append({"chave": chave, "status": "criada", **resposta})
+            criadas.append(evento)
+            saldos_lote.update(saldos)
+            movimentos_lote.update(movimentos)
+            alertas_lote.extend(alertas)
+
+        if not criadas:
+            return None
+        return criadas, saldos_lote, movimentos_lote, alertas_lote
+
+def _evento_venda(db_venda: Venda) -> dict:
+    return {
+        "id": db_venda.id,
+        "total": float(db_venda.total),
+        "forma_pagamento": db_venda.forma_pagamento,
+        "status": db_venda.status,
+        "created_at": db_venda.created_at.isoformat()
+    }
+
+def _registrada_em(venda: VendaOffline) -> Optional[datetime]:
+    """Horário do caixa em UTC sem fuso (como o banco grava); horário no futuro é ignorado"""
+    momento = venda.registrada_em
+    if momento is None:
+        return None
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    if momento > datetime.utcnow():
+        return None
+    return momento
@@ -80,6 +80,69 @@ function debounce(func, wait) {
     };
 }
 
+// Live updates via Server-Sent Events: handlers = { canal: função(dados) }
+// O navegador reconecta sozinho e recupera o que perdeu pelo Last-Event-ID
+function assinarEventos(handlers) {
+    if (!window.EventSource) return null;
+    const canais = Object.keys(handlers).join(',');
+    const fonte = new EventSource(`/api/eventos?canais=${canais}`);
+    Object.entries(handlers).forEach(([canal, handler]) => {
+        fonte.addEventListener(canal, (event) => handler(JSON.parse(event.data)));
+    });
+    return fonte;
+}
+
+// Impressora térmica (58mm) via Web Serial: o cupom vai em bytes ESC/POS, sem layout HTML.
+// Sem impressora autorizada (ou sem suporte no navegador) cai no cupom HTML.
+const IMPRESSORA_BAUD_RATE = 9600;
+
+async function configurarImpressora() {
+    if (!navigator.serial) {
+        showNotification('Este navegador não permite acesso à impressora serial/USB', 'warning');
+        return;
+    }
+    try {
+        await navigator.serial.requestPort();
+        showNotification('Impressora térmica configurada', 'success');
+    } catch (error) {
+        console.warn('Nenhuma impressora selecionada:', error);
+    }
+}
+
+async function imprimirCupomEscPos(vendaId) {
+    const portas = navigator.serial ? await navigator.serial.getPorts() : [];
+    if (portas.length === 0) return false;
+    
+    const response = await fetch(`/api/vendas/${vendaId}/cupom.escpos`);
+    if (!response.ok) throw new Error('Erro ao gerar cupom');
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    
+    const porta = portas[0];
+    await porta.open({ baudRate: IMPRESSORA_BAUD_RATE });
+    try {
+        const writer = porta.writable.getWriter();
+        await writer.write(bytes);
+        writer.releaseLock();
+    } finally {
+        await porta.close();
+    }
+    return true;
+}
+
+async function imprimirCupom(vendaId) {
+    try {
+        if (await imprimirCupomEscPos(vendaId)) return;
+    } catch (error) {
+        console.warn('Falha na impressora térmica, usando cupom HTML:', error);
+    }
+    
+    const response = await apiRequest(`/api/vendas/${vendaId}/cupom`);
+    const printWindow = window.open('', '_blank');
+    printWindow.document.write(response.cupom_html);
+    printWindow.document.close();
+    printWindow.print();
+}
+
 // Add loading state to element
 function setLoading(element, loading = true) {
     if (loading) {
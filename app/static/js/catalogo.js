@@ -26,18 +26,53 @@ document.addEventListener('DOMContentLoaded', function() {
     let viewMode = 'grid'; // 'grid' or 'touch'
     let selectedProducts = [];
 
+    // Local copy of the catalog, kept up to date with small deltas from the server.
+    // Stored in localStorage rather than IndexedDB: it is a single JSON value of a few
+    // hundred KB, read once on page load, so the synchronous API costs nothing noticeable.
+    const CATALOG_CACHE_KEY = 'donnatureza_catalogo';
+
+    async function syncProducts() {
+        let cache = null;
+        try {
+            cache = JSON.parse(localStorage.getItem(CATALOG_CACHE_KEY));
+        } catch (e) {
+            cache = null;
+        }
+
+        const params = cache ? `?since=${encodeURIComponent(cache.token)}` : '';
+        const response = await fetch(`/api/produtos/changes${params}`);
+        if (response.status === 400 && cache) {
+            // Invalid token: drop the local copy and download everything again
+            localStorage.removeItem(CATALOG_CACHE_KEY);
+            return syncProducts();
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        const delta = await response.json();
+
+        const byId = new Map(delta.completo || !cache ? [] : cache.produtos.map(p => [p.id, p]));
+        delta.alterados.forEach(p => byId.set(p.id, p));
+        delta.removidos.forEach(id => byId.delete(id));
+        const produtos = [...byId.values()];
+
+        try {
+            localStorage.setItem(CATALOG_CACHE_KEY, JSON.stringify({ token: delta.token, produtos }));
+        } catch (e) {
+            console.warn('Não foi possível salvar o catálogo local:', e);
+        }
+        console.log(`🔄 Catalog synced: ${delta.alterados.length} changed, ${delta.removidos.length} removed`);
+        return produtos;
+    }
+
     // Load products
     async function loadProducts() {
         try {
             console.log('📦 Starting to load products...');
             showLoading();
             
-            console.log('🌐 Making API request to /api/simple-produtos...');
-            const response = await fetch('/api/simple-produtos');
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-            }
-            const data = await response.json();
+            console.log('🌐 Syncing products with /api/produtos/changes...');
+            const data = await syncProducts();
             console.log('✅ API response received:', data);
             
             products = data.filter(p => p.ativo);
@@ -82,6 +117,10 @@ document.addEventListener('DOMContentLoaded', function() {
         // Simple version for testing
         const simpleHTML = filteredProducts.map(product => `
             <div class="product-card" data-product-id="${product.id}">
+                ${product.foto_url ? `
+                <div class="product-image">
+                    <img src="${product.foto_card_url || product.foto_url}" alt="${product.nome}" loading="lazy" decoding="async">
+                </div>` : ''}
                 <div class="product-info">
                     <h3>${product.nome}</h3>
                     <p>R$ ${product.preco.toFixed(2)}</p>
@@ -1,7 +1,7 @@
 // Inventory control functionality
 document.addEventListener('DOMContentLoaded', function() {
     let produtos = [];
-    let produtosFiltrados = [];
+    let proximoCursor = null;
     let movimentacoes = [];
     let currentAjusteProduto = null;
 
@@ -10,12 +10,32 @@ document.addEventListener('DOMContentLoaded', function() {
     loadRelatorio();
     loadMovimentacoes();
 
+    // Atualização ao vivo: saldos aplicados na tabela, listas recarregadas só quando necessário
+    const recarregarMovimentacoes = debounce(loadMovimentacoes, 1000);
+    assinarEventos({
+        estoque: (dados) => {
+            dados.saldos.forEach(({ produto_id, estoque }) => {
+                const produto = produtos.find(p => p.id === produto_id);
+                if (!produto) return;
+                produto.estoque_atual = estoque;
+                produto.valor_total = produto.preco * estoque;
+                produto.status = estoque <= produto.estoque_minimo ? 'baixo' :
+                                 estoque >= produto.estoque_maximo ? 'alto' : 'normal';
+            });
+            renderProdutos();
+            recarregarMovimentacoes();
+        },
+        alerta: debounce(loadAlertas, 500),
+        produto: debounce(loadRelatorio, 2000)
+    });
+
     // Event listeners
     document.getElementById('btnNovaEntrada').addEventListener('click', () => openModal('modalNovaEntrada'));
     document.getElementById('btnInventario').addEventListener('click', () => openModal('modalInventario'));
-    document.getElementById('buscaProduto').addEventListener('input', debounce(filtrarProdutos, 300));
-    document.getElementById('filtroCategoria').addEventListener('change', filtrarProdutos);
-    document.getElementById('filtroStatus').addEventListener('change', filtrarProdutos);
+    document.getElementById('buscaProduto').addEventListener('input', debounce(() => loadRelatorio(), 300));
+    document.getElementById('filtroCategoria').addEventListener('change', () => loadRelatorio());
+    document.getElementById('filtroStatus').addEventListener('change', () => loadRelatorio());
+    document.getElementById('btnCarregarMais').addEventListener('click', () => loadRelatorio(true));
 
     // Load alerts
     async function loadAlertas() {
@@ -62,9 +82,22 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Load inventory report
-    async function loadRelatorio() {
+    async function loadRelatorio(proximaPagina = false) {
         try {
-            const response = await apiRequest('/api/estoque/relatorio');
+            // Uma página por vez, filtrada no servidor; as seguintes só pelo botão "Carregar mais"
+            const params = new URLSearchParams({ incluir_produtos: 'true', limit: '200' });
+            const busca = document.getElementById('buscaProduto').value.trim();
+            const categoria = document.getElementById('filtroCategoria').value;
+            const status = document.getElementById('filtroStatus').value;
+            if (busca) params.set('busca', busca);
+            if (categoria) params.set('categoria', categoria);
+            if (status) params.set('status', status);
+            if (proximaPagina && proximoCursor) params.set('cursor', proximoCursor);
+            const resp = await fetch(`/api/estoque/relatorio?${params}`);
+            if (!resp.ok) throw new Error('Erro ao carregar relatório');
+            const response = await resp.json();
+            proximoCursor = resp.headers.get('X-Next-Cursor');
+            document.getElementById('btnCarregarMais').style.display = proximoCursor ? '' : 'none';
             
             // Update summary
             document.getElementById('totalProdutos').textContent = response.resumo.total_produtos;
@@ -72,14 +105,14 @@ document.addEventListener('DOMContentLoaded', function() {
             document.getElementById('produtosEstoqueBaixoCount').textContent = response.resumo.produtos_estoque_baixo;
             
             // Store products
-            produtos = response.produtos;
-            produtosFiltrados = [...produtos];
+            produtos = proximaPagina ? produtos.concat(response.produtos) : response.produtos;
             
-            // Populate category filter
-            const categorias = [...new Set(produtos.map(p => p.categoria).filter(Boolean))];
+            // Populate category filter (categorias do resumo, mantendo a escolha atual)
+            const categorias = Object.keys(response.categorias).filter(cat => cat !== 'Sem categoria').sort();
             const filtroCategoria = document.getElementById('filtroCategoria');
             filtroCategoria.innerHTML = '<option value="">Todas as categorias</option>' +
                 categorias.map(cat => `<option value="${cat}">${cat}</option>`).join('');
+            filtroCategoria.value = categoria;
             
             // Load products for entrada modal
             const entradaProduto = document.getElementById('entradaProduto');
@@ -98,12 +131,12 @@ document.addEventListener('DOMContentLoaded', function() {
     function renderProdutos() {
         const tbody = document.querySelector('#tabelaEstoque tbody');
         
-        if (produtosFiltrados.length === 0) {
+        if (produtos.length === 0) {
             tbody.innerHTML = '<tr><td colspan="8" class="empty">Nenhum produto encontrado</td></tr>';
             return;
         }
         
-        tbody.innerHTML = produtosFiltrados.map(produto => {
+        tbody.innerHTML = produtos.map(produto => {
             const statusClass = {
                 'baixo': 'status-low',
                 'alto': 'status-high',
@@ -140,26 +173,6 @@ document.addEventListener('DOMContentLoaded', function() {
         }).join('');
     }
 
-    // Filter products
-    function filtrarProdutos() {
-        const busca = document.getElementById('buscaProduto').value.toLowerCase();
-        const categoria = document.getElementById('filtroCategoria').value;
-        const status = document.getElementById('filtroStatus').value;
-        
-        produtosFiltrados = produtos.filter(produto => {
-            const matchBusca = !busca || 
-                produto.nome.toLowerCase().includes(busca) ||
-                (produto.codigo_barras && produto.codigo_barras.includes(busca));
-            
-            const matchCategoria = !categoria || produto.categoria === categoria;
-            const matchStatus = !status || produto.status === status;
-            
-            return matchBusca && matchCategoria && matchStatus;
-        });
-        
-        renderProdutos();
-    }
-
     // Load movements
     async function loadMovimentacoes() {
         try {
@@ -304,21 +304,22 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         const observacoes = document.getElementById('observacoesFinalizacao').value;
+        const contados = Array.from(contagens.values()).filter(c => c.status !== 'pendente');
         
         try {
-            for (const contagem of ajustesNecessarios) {
-                await apiRequest('/api/estoque/ajuste', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        produto_id: contagem.produto.id,
-                        quantidade_nova: contagem.fisica,
-                        motivo: `Inventário físico - ${observacoes || 'Ajuste de inventário'}`
-                    })
-                });
-            }
+            // Contagem inteira em uma requisição; o servidor ignora os itens sem diferença
+            const resumo = await apiRequest('/api/estoque/inventario', {
+                method: 'POST',
+                body: JSON.stringify({
+                    itens: contados.map(c => ({
+                        produto_id: c.produto.id,
+                        quantidade_contada: c.fisica
+                    })),
+                    motivo: `Inventário físico - ${observacoes || 'Ajuste de inventário'}`
+                })
+            });
             
-            showNotification(`Inventário finalizado! ${ajustesNecessarios.length} ajustes realizados.`, 'success');
+            showNotification(`Inventário finalizado! ${resumo.ajustados} ajustes realizados.`, 'success');
             closeModal('modalFinalizarInventario');
             
             // Reset inventory
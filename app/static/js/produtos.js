@@ -501,7 +501,7 @@ function initProdutos() {
             row.innerHTML = `
                 <td class="foto-cell">
                     ${produto.foto_url ? 
-                        `<img src="${produto.foto_url}" alt="${produto.nome}" class="produto-thumb">` : 
+                        `<img src="${produto.foto_thumb_url || produto.foto_url}" alt="${produto.nome}" class="produto-thumb" loading="lazy">` : 
                         '<div class="no-foto">📷</div>'
                     }
                 </td>
@@ -73,7 +73,9 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const params = new URLSearchParams({
                 data_inicio: inicio,
-                data_fim: fim
+                data_fim: fim,
+                incluir_vendas: 'true',
+                limit: '100'
             });
             
             const response = await apiRequest(`/api/relatorios/vendas-periodo?${params}`);
@@ -215,13 +217,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Generate receipt
     window.gerarCupom = async function(vendaId) {
         try {
-            const response = await apiRequest(`/api/vendas/${vendaId}/cupom`);
-            
-            const printWindow = window.open('', '_blank');
-            printWindow.document.write(response.cupom_html);
-            printWindow.document.close();
-            printWindow.print();
-            
+            await imprimirCupom(vendaId);
         } catch (error) {
             console.error('Erro ao gerar cupom:', error);
         }
@@ -256,11 +252,11 @@ document.addEventListener('DOMContentLoaded', function() {
 
     initializeRelatorios();
 
-    // Auto refresh every 5 minutes
-    setInterval(() => {
-        loadVendasHoje();
-        loadEstoqueBaixo();
-    }, 5 * 60 * 1000);
+    // Atualização ao vivo: vendas novas e produtos cruzando o estoque mínimo
+    assinarEventos({
+        venda: debounce(loadVendasHoje, 1000),
+        alerta: debounce(loadEstoqueBaixo, 500)
+    });
 
     // Add CSS for reports specific styles
     const relatoriosStyles = `
@@ -194,6 +194,15 @@ document.addEventListener('DOMContentLoaded', function() {
         }
 
         try {
+            // Código de barras completo (scanner): busca exata no índice do servidor
+            if (/^\d{8,14}$/.test(term)) {
+                const scan = await fetch(`/api/produtos/codigo/${encodeURIComponent(term)}`);
+                if (scan.ok) {
+                    renderResultadosBusca([await scan.json()]);
+                    return;
+                }
+            }
+
             const response = await apiRequest(`/api/produtos/buscar/${encodeURIComponent(term)}`);
             renderResultadosBusca(response);
         } catch (error) {
@@ -342,9 +351,17 @@ document.addEventListener('DOMContentLoaded', function() {
             })),
             desconto: parseFloat(descontoInput.value) || 0,
             cpf_cliente: cpfCliente.value || null,
-            forma_pagamento: formaPagamento.value
+            forma_pagamento: formaPagamento.value,
+            // Gerada antes da primeira tentativa: se a resposta se perder, o reenvio
+            // (online ou pela fila offline) encontra a venda já gravada em vez de duplicá-la
+            chave_idempotencia: novaChaveIdempotencia()
         };
 
+        if (!navigator.onLine) {
+            guardarVendaOffline(venda);
+            return;
+        }
+
         try {
             setLoading(btnFinalizarVenda, true);
             
@@ -355,13 +372,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             showNotification(`Venda #${response.id} finalizada com sucesso!`);
             
-            // Clear cart
-            carrinho = [];
-            renderCarrinho();
-            calcularTotais();
-            cpfCliente.value = '';
-            formaPagamento.value = '';
-            descontoInput.value = '0';
+            resetarVenda();
             
             // Reload recent sales
             loadVendasRecentes();
@@ -372,23 +383,94 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             
         } catch (error) {
-            console.error('Erro ao finalizar venda:', error);
+            // TypeError = falha de rede (o servidor nem respondeu)
+            if (error instanceof TypeError) {
+                guardarVendaOffline(venda);
+            } else {
+                console.error('Erro ao finalizar venda:', error);
+            }
         } finally {
             setLoading(btnFinalizarVenda, false);
         }
     }
 
-    // Generate receipt
-    window.gerarCupom = async function(vendaId) {
+    function resetarVenda() {
+        carrinho = [];
+        renderCarrinho();
+        calcularTotais();
+        cpfCliente.value = '';
+        formaPagamento.value = '';
+        descontoInput.value = '0';
+    }
+
+    // Vendas sem conexão: guardadas no navegador e enviadas em lote quando a conexão voltar.
+    // A chave de idempotência da venda impede que um reenvio crie a venda duas vezes.
+    const CHAVE_VENDAS_OFFLINE = 'donnatureza_vendas_offline';
+    let sincronizandoOffline = false;
+
+    function lerVendasOffline() {
+        try {
+            return JSON.parse(localStorage.getItem(CHAVE_VENDAS_OFFLINE)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function novaChaveIdempotencia() {
+        return window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    function guardarVendaOffline(venda) {
+        const fila = lerVendasOffline();
+        fila.push({ ...venda, registrada_em: new Date().toISOString() });
+        localStorage.setItem(CHAVE_VENDAS_OFFLINE, JSON.stringify(fila));
+        
+        showNotification(`Sem conexão: venda guardada (${fila.length} aguardando envio)`, 'warning');
+        resetarVenda();
+    }
+
+    async function sincronizarVendasOffline() {
+        const fila = lerVendasOffline().slice(0, 5000);
+        if (fila.length === 0 || !navigator.onLine || sincronizandoOffline) return;
+        
+        sincronizandoOffline = true;
         try {
-            const response = await apiRequest(`/api/vendas/${vendaId}/cupom`);
+            const response = await fetch('/api/vendas/offline', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ vendas: fila })
+            });
+            if (!response.ok) return;
+            const resultado = await response.json();
             
-            // Open print window
-            const printWindow = window.open('', '_blank');
-            printWindow.document.write(response.cupom_html);
-            printWindow.document.close();
-            printWindow.print();
+            // Ficam na fila só as que deram erro e as guardadas durante o envio
+            const comErro = new Set(resultado.resultados.filter(r => r.status === 'erro').map(r => r.chave));
+            const enviadas = new Set(fila.map(v => v.chave_idempotencia));
+            const restantes = lerVendasOffline().filter(v =>
+                !enviadas.has(v.chave_idempotencia) || comErro.has(v.chave_idempotencia));
+            localStorage.setItem(CHAVE_VENDAS_OFFLINE, JSON.stringify(restantes));
             
+            const sincronizadas = resultado.criadas + resultado.duplicadas;
+            if (sincronizadas > 0) {
+                showNotification(`${sincronizadas} venda(s) offline sincronizada(s)`, 'success');
+                loadVendasRecentes();
+            }
+            if (resultado.erros > 0) {
+                showNotification(`${resultado.erros} venda(s) offline com erro (ex.: estoque insuficiente)`, 'error');
+            }
+        } catch (error) {
+            console.warn('Sincronização de vendas offline falhou, nova tentativa depois:', error);
+        } finally {
+            sincronizandoOffline = false;
+        }
+    }
+
+    // Generate receipt
+    window.gerarCupom = async function(vendaId) {
+        try {
+            await imprimirCupom(vendaId);
         } catch (error) {
             console.error('Erro ao gerar cupom:', error);
         }
@@ -465,6 +547,24 @@ document.addEventListener('DOMContentLoaded', function() {
     loadFromCatalog(); // Load products from catalog first
     calcularTotais();
     buscaProduto.focus();
+    sincronizarVendasOffline();
+    window.addEventListener('online', sincronizarVendasOffline);
+
+    // Vendas de outros caixas e saldos atualizados ao vivo
+    assinarEventos({
+        venda: debounce(loadVendasRecentes, 1000),
+        estoque: (dados) => {
+            let alterou = false;
+            dados.saldos.forEach(({ produto_id, estoque }) => {
+                const item = carrinho.find(i => i.id === produto_id);
+                if (item) {
+                    item.estoque = estoque;
+                    alterou = true;
+                }
+            });
+            if (alterou) renderCarrinho();
+        }
+    });
 
     // Add CSS for vendas specific styles
     const vendasStyles = `
@@ -0,0 +1,804 @@
+#!/usr/bin/env python3
+"""
+Comandos de manutenção do Sistema Donnatureza
+
+Uso:
+    python manage.py migrate                 # aplica as migrações pendentes do esquema (deploy)
+    python manage.py resumos --verificar     # compara resumos de vendas com os dados brutos
+    python manage.py resumos --reconstruir   # recalcula os resumos a partir do histórico
+    python manage.py alertas                 # recalcula os alertas de estoque após edição direta no banco
+    python manage.py importar produtos.xlsx  # importa produtos de uma planilha CSV/XLSX
+    python manage.py importacao --linhas 50000  # tempo da importação e query mais lenta por tamanho de lote
+    python manage.py saldos                  # fecha os saldos de estoque de ontem
+    python manage.py saldos --arquivar-antes-de 2024-01-01  # move movimentos antigos para o arquivo
+    python manage.py eventos --assinantes 500  # mede a latência de entrega do hub de eventos (SSE)
+    python manage.py fotos                   # gera miniaturas/WebP das fotos enviadas antes do pipeline
+    python manage.py assets                  # gera os estáticos com hash no nome e pré-comprimidos (deploy)
+    python manage.py json --produtos 10000   # mede bytes e tempo de serialização do catálogo
+    python manage.py inicializacao           # mede o tempo até a primeira resposta contra o orçamento
+    python manage.py banco --segundos 10     # vazão de leitura/escrita: SQLite padrão x perfil configurado
+    python manage.py checkout --vendas 200   # latência p50/p99 da venda por tamanho do carrinho
+    python manage.py busca --produtos 100000 # busca indexada x LIKE em um catálogo grande
+    python manage.py concorrencia            # latência da venda com relatórios pesados rodando ao mesmo tempo
+"""
+
+import argparse
+import sys
+import os
+from contextlib import contextmanager
+
+# Adicionar o diretório do projeto ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine
+from app.migracoes import EsquemaDesatualizado, migrar, verificar_esquema
+
+# Vocabulário dos produtos gerados para os benchmarks (com acentos, como no catálogo real)
+_NOMES_BENCH = ["Óleo Essencial", "Chá", "Sabonete", "Mel", "Castanha", "Granola", "Shampoo", "Creme",
+                "Sal", "Farinha", "Açúcar Mascavo", "Extrato"]
+_SABORES_BENCH = ["Eucalipto", "Lavanda", "Camomila", "Alecrim", "Hortelã", "Gengibre", "Limão",
+                  "Cúrcuma", "Maracujá", "Cacau", "Aveia", "Coco"]
+
+@contextmanager
+def _banco_temporario(produtos: int = 0, estoque: int = 1_000_000, **pragmas):
+    """Banco SQLite descartável para os benchmarks: esquema migrado e `produtos` produtos
+
+    Retorna a fábrica de sessões; PRAGMAs passados substituem os do Settings.
+    """
+    import shutil
+    import tempfile
+    from sqlalchemy import insert
+    from sqlalchemy.orm import sessionmaker
+    from app.database import criar_engine
+    from app.models import Produto
+    
+    pasta = tempfile.mkdtemp(prefix="donnatureza-bench-")
+    engine_bench = criar_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}", **pragmas)
+    try:
+        migrar(engine_bench, saida=lambda _: None)
+        with engine_bench.begin() as conn:
+            for inicio in range(1, produtos + 1, 5000):
+                conn.execute(insert(Produto), [
+                    {"nome": f"{_NOMES_BENCH[i % 12]} {_SABORES_BENCH[(i // 12) % 12]} {i}",
+                     "codigo_barras": f"789{i:010d}", "preco": (i % 90) + 0.99, "estoque": estoque,
+                     "categoria": f"Categoria {i % 25}", "ativo": True}
+                    for i in range(inicio, min(inicio + 5000, produtos + 1))
+                ])
+        yield sessionmaker(autocommit=False, autoflush=False, bind=engine_bench)
+    finally:
+        engine_bench.dispose()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[max(0, int(len(ordenados) * p) - 1)]
+
+def cmd_migrate(args):
+    print("🗄️  Aplicando migrações do esquema...")
+    aplicadas = migrar(engine)
+    if aplicadas:
+        print(f"✅ {len(aplicadas)} migração(ões) aplicada(s), esquema na versão {aplicadas[-1]}")
+    else:
+        print("✅ Esquema já está atualizado")
+    return 0
+
+def cmd_resumos(args):
+    from app.services.resumo_service import ResumoVendasService
+    
+    db = SessionLocal()
+    try:
+        service = ResumoVendasService(db)
+        if args.reconstruir:
+            print("🔄 Reconstruindo resumos de vendas...")
+            service.reconstruir()
+            print("✅ Resumos reconstruídos")
+        
+        divergencias = service.verificar()
+        if divergencias:
+            print(f"❌ {len(divergencias)} divergência(s) entre resumos e vendas:")
+            for d in divergencias[:50]:
+                print(f"   • {d['tabela']} {d['chave']}: esperado {d['esperado']}, atual {d['atual']}")
+            return 1
+        print("✅ Resumos consistentes com as vendas")
+        return 0
+    finally:
+        db.close()
+
+def cmd_alertas(args):
+    from app.services.alerta_service import AlertaEstoqueService
+    
+    db = SessionLocal()
+    try:
+        print("🔄 Recalculando o conjunto de alertas de estoque...")
+        eventos = AlertaEstoqueService(db).reconstruir()
+        print(f"✅ {len(eventos)} produto(s) mudaram de situação")
+        return 0
+    finally:
+        db.close()
+
+def cmd_importar(args):
+    from app.services.importacao_service import ImportacaoProdutosService, ler_planilha
+    
+    db = SessionLocal()
+    try:
+        print(f"📥 Importando {args.arquivo}...")
+        with open(args.arquivo, "rb") as arquivo:
+            try:
+                linhas = ler_planilha(arquivo, args.arquivo)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            relatorio = ImportacaoProdutosService(db, tamanho_lote=args.lote).importar(linhas)
+        
+        print(f"✅ {relatorio['linhas']} linhas lidas")
+        print(f"   • Inseridos: {relatorio['inseridos']}")
+        print(f"   • Atualizados: {relatorio['atualizados']}")
+        if relatorio["total_erros"]:
+            print(f"❌ {relatorio['total_erros']} linha(s) com erro:")
+            for erro in relatorio["erros"]:
+                print(f"   • Linha {erro['linha']}: {erro['erro']}")
+            return 1
+        return 0
+    finally:
+        db.close()
+
+def cmd_importacao(args):
+    import csv
+    import io
+    import time
+    from sqlalchemy import event
+    from app.services.importacao_service import ImportacaoProdutosService, ler_csv
+    
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(["nome", "codigo_barras", "preco", "estoque", "categoria"])
+    for i in range(args.linhas):
+        escritor.writerow([f"{_NOMES_BENCH[i % 12]} {i}", f"78{i:011d}", "12,50", 10, f"Categoria {i % 25}"])
+    planilha = buffer.getvalue().encode()
+    
+    # Antes: lotes de 2000 linhas; depois: o lote pedido (padrão do serviço)
+    print(f"📥 Importação de {args.linhas} linhas novas e, em seguida, das mesmas como atualização")
+    print(f"   {'lote':>6} {'rodada':<11} {'tempo':>8} {'query mais lenta':>17}")
+    for lote in (2000, args.lote):
+        with _banco_temporario(0) as Sessao:
+            mais_lenta = [0.0]
+            
+            @event.listens_for(Sessao.kw["bind"], "before_cursor_execute")
+            def _antes(conn, cursor, statement, parameters, context, executemany):
+                conn.info["inicio_bench"] = time.perf_counter()
+            
+            @event.listens_for(Sessao.kw["bind"], "after_cursor_execute")
+            def _depois(conn, cursor, statement, parameters, context, executemany):
+                mais_lenta[0] = max(mais_lenta[0], time.perf_counter() - conn.info["inicio_bench"])
+            
+            for rodada in ("inserção", "atualização"):
+                mais_lenta[0] = 0.0
+                db = Sessao()
+                inicio = time.perf_counter()
+                try:
+                    ImportacaoProdutosService(db, tamanho_lote=lote).importar(ler_csv(io.BytesIO(planilha)))
+                finally:
+                    db.close()
+                print(f"   {lote:>6} {rodada:<11} {time.perf_counter() - inicio:>7.2f}s "
+                      f"{mais_lenta[0] * 1000:>15.0f}ms")
+    return 0
+
+def cmd_saldos(args):
+    from datetime import date, timedelta
+    from app.services.saldo_service import SaldoEstoqueService
+    
+    db = SessionLocal()
+    try:
+        service = SaldoEstoqueService(db)
+        data = date.fromisoformat(args.data) if args.data else date.today() - timedelta(days=1)
+        print(f"📦 Fechando saldos de estoque de {data.isoformat()}...")
+        try:
+            produtos = service.gerar_saldos(data)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {produtos} produto(s) com saldo fechado")
+        
+        if args.arquivar_antes_de:
+            antes_de = date.fromisoformat(args.arquivar_antes_de)
+            print(f"🗄️  Arquivando movimentações anteriores a {antes_de.isoformat()}...")
+            try:
+                arquivados = service.arquivar(antes_de)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            print(f"✅ {arquivados} movimentação(ões) arquivada(s)")
+        return 0
+    finally:
+        db.close()
+
+def cmd_eventos(args):
+    import asyncio
+    import json
+    import statistics
+    import threading
+    import time
+    from app.services.eventos import HubEventos, TAMANHO_FILA
+    
+    async def simular():
+        hub = HubEventos()
+        hub.iniciar(asyncio.get_running_loop())
+        latencias = []
+        
+        async def consumir(assinante):
+            for _ in range(args.eventos):
+                mensagem = await assinante.fila.get()
+                if mensagem is None:
+                    return
+                enviado = json.loads(mensagem.split("data: ", 1)[1])["t"]
+                latencias.append(time.perf_counter() - enviado)
+        
+        consumidores = [asyncio.create_task(consumir(hub.assinar(["estoque"]))) for _ in range(args.assinantes)]
+        # Cliente que nunca lê: deve ser descartado quando a fila encher
+        lento = hub.assinar(["estoque"])
+        
+        def publicar():
+            # Publicação a partir de outra thread, como nas rotas síncronas
+            for i in range(args.eventos):
+                hub.publicar("estoque", {"t": time.perf_counter(), "saldos": [{"produto_id": i, "estoque": i}]})
+                time.sleep(args.intervalo / 1000)
+        
+        inicio = time.perf_counter()
+        thread = threading.Thread(target=publicar)
+        thread.start()
+        await asyncio.gather(*consumidores)
+        thread.join()
+        return latencias, time.perf_counter() - inicio, lento.descartado, hub.descartados
+    
+    print(f"📡 {args.assinantes} assinantes, {args.eventos} eventos a cada {args.intervalo} ms...")
+    latencias, duracao, lento_descartado, descartados = asyncio.run(simular())
+    latencias.sort()
+    ms = lambda segundos: f"{segundos * 1000:.2f} ms"
+    print(f"✅ {len(latencias)} entregas em {duracao:.2f}s")
+    print(f"   • p50: {ms(statistics.median(latencias))}")
+    print(f"   • p95: {ms(latencias[int(len(latencias) * 0.95) - 1])}")
+    print(f"   • p99: {ms(latencias[int(len(latencias) * 0.99) - 1])}")
+    print(f"   • máx: {ms(latencias[-1])}")
+    print(f"   • Clientes lentos descartados: {descartados}")
+    esperado = args.assinantes * args.eventos
+    if len(latencias) != esperado or (args.eventos > TAMANHO_FILA and not lento_descartado):
+        print(f"❌ Esperado {esperado} entregas e o cliente lento descartado")
+        return 1
+    return 0
+
+def cmd_fotos(args):
+    from app.services.imagem_service import FotoProdutoService
+    
+    db = SessionLocal()
+    try:
+        print("🖼️  Gerando variantes das fotos existentes...")
+        relatorio = FotoProdutoService(db).reprocessar_existentes(lote=args.lote)
+        print(f"✅ {relatorio['processados']} de {relatorio['pendentes']} foto(s) processada(s)")
+        if relatorio["erros"]:
+            print(f"⚠️  {len(relatorio['erros'])} foto(s) com erro:")
+            for erro in relatorio["erros"][:50]:
+                print(f"   • Produto {erro['produto_id']}: {erro['erro']}")
+            return 1
+        return 0
+    finally:
+        db.close()
+
+def cmd_assets(args):
+    from app.assets import construir, STATIC_DIR, DIST
+    
+    print("📦 Gerando arquivos estáticos...")
+    manifesto = construir()
+    destino = os.path.join(STATIC_DIR, DIST)
+    for original, com_hash in sorted(manifesto.items()):
+        tamanhos = [os.path.getsize(os.path.join(destino, com_hash + ext))
+                    for ext in ("", ".gz", ".br") if os.path.exists(os.path.join(destino, com_hash + ext))]
+        print(f"   • {original} → {com_hash} ({' / '.join(f'{t / 1024:.1f} KB' for t in tamanhos)})")
+    print(f"✅ {len(manifesto)} arquivo(s) em {destino}")
+    return 0
+
+def cmd_json(args):
+    import gzip
+    import json
+    import time
+    from datetime import datetime
+    from decimal import Decimal
+    from fastapi.encoders import jsonable_encoder
+    from app.models import Produto
+    from app.respostas import json_bytes, orjson
+    from app.routers.produtos import lista_produtos
+    from app.schemas.produto import ProdutoResponse
+    
+    agora = datetime.now()
+    produtos = [
+        Produto(id=i, nome=f"Produto natural {i}", codigo_barras=f"789{i:010d}",
+                preco=Decimal(f"{(i % 500) + 0.99:.2f}"), estoque=i % 120, estoque_minimo=5,
+                estoque_maximo=100, estoque_inicial=0, categoria=f"Categoria {i % 25}",
+                descricao="Descrição do produto " * 3, foto_url=f"/static/img/produtos/{i}-full.webp",
+                foto_thumb_url=f"/static/img/produtos/{i}-thumb.webp", foto_card_url=f"/static/img/produtos/{i}-card.webp",
+                ncm="21069090", cfop="5102", unidade_medida="UN", origem="0", cst_icms="102",
+                aliquota_icms=Decimal("0.00"), cst_pis="07", aliquota_pis=Decimal("0.0000"),
+                cst_cofins="07", aliquota_cofins=Decimal("0.0000"), cst_ipi=None,
+                aliquota_ipi=Decimal("0.00"), ativo=True, created_at=agora, updated_at=agora)
+        for i in range(1, args.produtos + 1)
+    ]
+    resumidos = [
+        {"id": p.id, "nome": p.nome, "codigo_barras": p.codigo_barras, "preco": p.preco,
+         "estoque": p.estoque, "categoria": p.categoria, "foto_url": p.foto_url,
+         "created_at": p.created_at}
+        for p in produtos
+    ]
+    
+    def por_item():
+        return json.dumps([ProdutoResponse.model_validate(p).model_dump(mode="json") for p in produtos],
+                          ensure_ascii=False, separators=(",", ":")).encode()
+    
+    def response_model():
+        # Caminho padrão do FastAPI: valida cada item e passa o resultado pelo jsonable_encoder
+        return json.dumps(jsonable_encoder([ProdutoResponse.model_validate(p) for p in produtos]),
+                          ensure_ascii=False, separators=(",", ":")).encode()
+    
+    def type_adapter():
+        return lista_produtos.dump_json(lista_produtos.validate_python(produtos, from_attributes=True))
+    
+    def dicts_padrao():
+        return json.dumps(jsonable_encoder(resumidos), ensure_ascii=False, separators=(",", ":")).encode()
+    
+    def dicts_rapido():
+        return json_bytes(resumidos)
+    
+    casos = [
+        ("ProdutoResponse por item + json", por_item),
+        ("response_model + jsonable_encoder", response_model),
+        ("TypeAdapter (validate + dump_json)", type_adapter),
+        ("dicts: jsonable_encoder + json", dicts_padrao),
+        (f"dicts: {'orjson' if orjson else 'json (sem orjson)'}", dicts_rapido),
+    ]
+    print(f"📊 Catálogo com {args.produtos} produtos ({args.repeticoes} repetições, melhor tempo)")
+    print(f"   {'caminho':<38} {'tempo':>9} {'bytes':>11} {'gzip':>10}")
+    for nome, funcao in casos:
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            corpo = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        comprimido = gzip.compress(corpo, compresslevel=6)
+        print(f"   {nome:<38} {min(tempos) * 1000:>7.1f}ms {len(corpo):>11,} {len(comprimido):>10,}")
+    return 0
+
+# Roda em um processo novo: importa a aplicação, executa a inicialização e atende /health
+# direto pela interface ASGI, imprimindo os tempos (ms desde o início do interpretador)
+_SCRIPT_INICIALIZACAO = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import app
+t_importacao = time.perf_counter()
+
+async def primeira_requisicao():
+    async with app.router.lifespan_context(app):
+        t_startup = time.perf_counter()
+        return t_startup, *await atender_health()
+
+async def atender_health():
+    mensagens = []
+    pedidos = iter([{"type": "http.request", "body": b"", "more_body": False}])
+    async def receive():
+        # Corpo vazio na primeira chamada; depois o cliente fica conectado até a resposta sair
+        pedido = next(pedidos, None)
+        if pedido is None:
+            await asyncio.Event().wait()
+        return pedido
+    async def send(mensagem):
+        mensagens.append(mensagem)
+    await app({"type": "http", "method": "GET", "path": "/health", "raw_path": b"/health",
+               "query_string": b"", "headers": [], "scheme": "http", "server": ("local", 80),
+               "client": ("local", 0), "root_path": "", "http_version": "1.1"}, receive, send)
+    t_resposta = time.perf_counter()
+    status = next(m["status"] for m in mensagens if m["type"] == "http.response.start")
+    return t_resposta, status
+
+t_startup, t_resposta, status = asyncio.run(primeira_requisicao())
+print(json.dumps({"importacao": t_importacao - t0, "startup": t_startup - t_importacao,
+                  "requisicao": t_resposta - t_startup, "status": status}), flush=True)
+"""
+
+def cmd_inicializacao(args):
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    print(f"⏱️  Tempo até a primeira resposta ({args.execucoes} processos, {args.produtos} produtos, "
+          f"orçamento {args.orcamento_ms} ms)")
+    with _banco_temporario(args.produtos) as Sessao:
+        # Catálogo do tamanho pedido: a inicialização carrega índices a partir dele
+        ambiente = {**os.environ, "DATABASE_URL": str(Sessao.kw["bind"].url)}
+        return _medir_inicializacao(args, raiz, ambiente)
+
+def _medir_inicializacao(args, raiz: str, ambiente: dict) -> int:
+    import json
+    import statistics
+    import subprocess
+    import time
+    
+    totais = []
+    for _ in range(args.execucoes):
+        inicio = time.perf_counter()
+        processo = subprocess.run([sys.executable, "-c", _SCRIPT_INICIALIZACAO], cwd=raiz,
+                                  capture_output=True, text=True, env=ambiente)
+        total = (time.perf_counter() - inicio) * 1000
+        if processo.returncode != 0:
+            print(f"❌ Falha ao iniciar a aplicação:\n{processo.stderr.strip()[-2000:]}")
+            return 1
+        fases = json.loads(processo.stdout.strip().splitlines()[-1])
+        if fases["status"] != 200:
+            print(f"❌ /health respondeu {fases['status']}")
+            return 1
+        totais.append(total)
+        print(f"   • total {total:7.1f} ms | importação {fases['importacao'] * 1000:6.1f} | "
+              f"startup {fases['startup'] * 1000:6.1f} | 1ª requisição {fases['requisicao'] * 1000:5.1f}")
+    
+    mediana = statistics.median(totais)
+    if mediana > args.orcamento_ms:
+        print(f"❌ Mediana {mediana:.1f} ms acima do orçamento de {args.orcamento_ms} ms")
+        return 1
+    print(f"✅ Mediana {mediana:.1f} ms dentro do orçamento de {args.orcamento_ms} ms")
+    return 0
+
+def cmd_banco(args):
+    import threading
+    import time
+    from sqlalchemy.orm import selectinload
+    from app.models import Venda
+    from app.schemas.venda import VendaCreate
+    from app.services.venda_service import VendaService
+    
+    # Antes: PRAGMAs padrão do SQLite (rollback journal, synchronous FULL, cache de 2 MB, sem mmap)
+    perfis = [
+        ("SQLite padrão (rollback journal)", {"journal_mode": "DELETE", "synchronous": "FULL",
+                                             "mmap_size": 0, "cache_size": -2000}),
+        ("perfil do Settings (WAL)", {})
+    ]
+    print(f"📊 {args.escritores} caixa(s) vendendo e {args.leitores} leitor(es) por {args.segundos}s "
+          f"({args.produtos} produtos)")
+    for nome, pragmas in perfis:
+        with _banco_temporario(args.produtos, **pragmas) as Sessao:
+            fim = time.perf_counter() + args.segundos
+            vendas, leituras, erros = [], [], []
+            
+            def caixa(semente: int):
+                i = semente
+                while time.perf_counter() < fim:
+                    i += 7
+                    itens = [{"produto_id": (i + k * 13) % args.produtos + 1, "quantidade": 1,
+                              "preco_unitario": "9.99"} for k in range(5)]
+                    # Uma sessão por venda, como cada requisição da API
+                    db = Sessao()
+                    inicio = time.perf_counter()
+                    try:
+                        VendaService(db).finalizar_venda(VendaCreate(itens=itens))
+                        vendas.append(time.perf_counter() - inicio)
+                    except Exception as e:
+                        erros.append(e)
+                    finally:
+                        db.close()
+            
+            def leitor():
+                while time.perf_counter() < fim:
+                    db = Sessao()
+                    inicio = time.perf_counter()
+                    try:
+                        (db.query(Venda).options(selectinload(Venda.itens))
+                         .order_by(Venda.id.desc()).limit(50).all())
+                        leituras.append(time.perf_counter() - inicio)
+                    except Exception as e:
+                        erros.append(e)
+                    finally:
+                        db.close()
+            
+            threads = ([threading.Thread(target=caixa, args=(n,)) for n in range(args.escritores)] +
+                       [threading.Thread(target=leitor) for _ in range(args.leitores)])
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        ms = lambda segundos: f"{segundos * 1000:.1f} ms"
+        print(f"   {nome}")
+        print(f"   • vendas: {len(vendas) / args.segundos:7.1f}/s | p50 {ms(_percentil(vendas, 0.5))} | "
+              f"p99 {ms(_percentil(vendas, 0.99))}" if vendas else "   • vendas: nenhuma")
+        print(f"   • leituras: {len(leituras) / args.segundos:7.1f}/s | p50 {ms(_percentil(leituras, 0.5))} | "
+              f"p99 {ms(_percentil(leituras, 0.99))}" if leituras else "   • leituras: nenhuma")
+        if erros:
+            print(f"   ⚠️  {len(erros)} operação(ões) com erro, ex.: {erros[0]}")
+    return 0
+
+def _checkout_por_item(db, venda):
+    """Fluxo anterior da venda, para comparação: consulta e commit por item do carrinho"""
+    from app.models import Produto, MovimentoEstoque, Venda, ItemVenda
+    
+    total = 0
+    for item in venda.itens:
+        produto = db.query(Produto).filter(Produto.id == item.produto_id).first()
+        if produto.estoque < item.quantidade:
+            raise ValueError(f"Estoque insuficiente para {produto.nome}")
+        total += item.quantidade * item.preco_unitario
+    db_venda = Venda(total=total - venda.desconto, desconto=venda.desconto, forma_pagamento=venda.forma_pagamento)
+    db.add(db_venda)
+    db.flush()
+    for item in venda.itens:
+        db.add(ItemVenda(venda_id=db_venda.id, produto_id=item.produto_id,
+                         quantidade=item.quantidade, preco_unitario=item.preco_unitario))
+    db.commit()
+    db.refresh(db_venda)
+    for item in db_venda.itens:
+        produto = db.query(Produto).filter(Produto.id == item.produto_id).first()
+        movimento = MovimentoEstoque(
+            produto_id=item.produto_id, tipo_movimento="venda", quantidade=item.quantidade,
+            quantidade_anterior=produto.estoque, quantidade_nova=produto.estoque - item.quantidade,
+            preco_unitario=item.preco_unitario, valor_total=item.preco_unitario * item.quantidade,
+            motivo=f"Venda #{db_venda.id}", usuario="vendedor", documento=f"VENDA-{db_venda.id}"
+        )
+        produto.estoque -= item.quantidade
+        db.add(movimento)
+        db.commit()
+        db.refresh(movimento)
+    return db_venda
+
+def cmd_checkout(args):
+    import time
+    from sqlalchemy import event
+    from app.schemas.venda import VendaCreate
+    from app.services.venda_service import VendaService
+    
+    caminhos = [
+        ("antes: consulta e commit por item", _checkout_por_item),
+        ("depois: transação única", lambda db, venda: VendaService(db).finalizar_venda(venda))
+    ]
+    tamanhos = [int(t) for t in args.itens.split(",")]
+    print(f"📊 Latência da venda por tamanho do carrinho ({args.vendas} vendas por caso, {args.produtos} produtos)")
+    print(f"   {'caminho':<36} {'itens':>5} {'p50':>9} {'p99':>9} {'queries':>8} {'commits':>8}")
+    for nome, finalizar in caminhos:
+        with _banco_temporario(args.produtos) as Sessao:
+            contadores = {"queries": 0, "commits": 0}
+            engine_bench = Sessao.kw["bind"]
+            
+            @event.listens_for(engine_bench, "before_cursor_execute")
+            def _contar_query(conn, cursor, statement, *_):
+                if not statement.startswith("BEGIN"):
+                    contadores["queries"] += 1
+            
+            @event.listens_for(engine_bench, "commit")
+            def _contar_commit(conn):
+                contadores["commits"] += 1
+            
+            for tamanho in tamanhos:
+                latencias = []
+                contadores.update(queries=0, commits=0)
+                for n in range(args.vendas):
+                    itens = [{"produto_id": (n * 31 + k * 7) % args.produtos + 1, "quantidade": 1,
+                              "preco_unitario": "9.99"} for k in range(tamanho)]
+                    venda = VendaCreate(itens=itens)
+                    db = Sessao()
+                    inicio = time.perf_counter()
+                    try:
+                        finalizar(db, venda)
+                        latencias.append(time.perf_counter() - inicio)
+                    finally:
+                        db.close()
+                print(f"   {nome:<36} {tamanho:>5} {_percentil(latencias, 0.5) * 1000:>7.1f}ms "
+                      f"{_percentil(latencias, 0.99) * 1000:>7.1f}ms {contadores['queries'] / args.vendas:>8.1f} "
+                      f"{contadores['commits'] / args.vendas:>8.1f}")
+    return 0
+
+def cmd_busca(args):
+    import time
+    from app.models import Produto
+    from app.services import busca_service
+    from app.services.busca_service import BuscaService, preparar_busca
+    
+    termos = ["oleo", "óleo essencial", "cha camomila", "sabon", "acucar", "mel cacau 123", "granola cacau", "7890000004"]
+    
+    def like_anterior(db, termo):
+        # Busca anterior: LIKE no nome, sem ordenação nem acentos
+        return db.query(Produto).filter(Produto.nome.contains(termo), Produto.ativo == True).limit(20).all()
+    
+    print(f"🔎 Gerando catálogo com {args.produtos} produtos...")
+    with _banco_temporario(args.produtos) as Sessao:
+        preparar_busca(Sessao.kw["bind"])
+        modo = busca_service._modo_busca
+        caminhos = [
+            ("antes: LIKE no nome", like_anterior),
+            (f"depois: índice ({modo})", lambda db, termo: BuscaService(db).buscar(termo))
+        ]
+        print(f"📊 {len(termos)} termos, {args.repeticoes} repetições cada")
+        print(f"   {'caminho':<26} {'termo':<16} {'p50':>8} {'p99':>8} {'resultados':>10}")
+        for nome, buscar in caminhos:
+            todos = []
+            for termo in termos:
+                latencias = []
+                db = Sessao()
+                try:
+                    for _ in range(args.repeticoes):
+                        inicio = time.perf_counter()
+                        resultados = buscar(db, termo)
+                        latencias.append(time.perf_counter() - inicio)
+                finally:
+                    db.close()
+                todos += latencias
+                print(f"   {nome:<26} {termo:<16} {_percentil(latencias, 0.5) * 1000:>6.1f}ms "
+                      f"{_percentil(latencias, 0.99) * 1000:>6.1f}ms {len(resultados):>10}")
+            print(f"   {nome:<26} {'(todos)':<16} {_percentil(todos, 0.5) * 1000:>6.1f}ms "
+                  f"{_percentil(todos, 0.99) * 1000:>6.1f}ms")
+    return 0
+
+def cmd_concorrencia(args):
+    import asyncio
+    import time
+    import httpx
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import insert
+    from sqlalchemy.orm import selectinload
+    from app.models import ItemVenda, Venda
+    from app.schemas.venda import VendaCreate
+    from app.services.venda_service import VendaService
+    
+    print(f"📊 Latência da venda com {args.relatorios} relatório(s) pesado(s) em paralelo "
+          f"({args.vendas} vendas, {args.historico} vendas no histórico)")
+    with _banco_temporario(args.produtos) as Sessao:
+        with Sessao.kw["bind"].begin() as conn:
+            conn.execute(insert(Venda), [{"id": i, "total": 29.97, "desconto": 0, "forma_pagamento": "pix",
+                                          "status": "pendente"} for i in range(1, args.historico + 1)])
+            conn.execute(insert(ItemVenda), [{"venda_id": i, "produto_id": (i * 3 + k) % args.produtos + 1,
+                                              "quantidade": 1, "preco_unitario": 9.99}
+                                             for i in range(1, args.historico + 1) for k in range(3)])
+        
+        def get_db_bench():
+            db = Sessao()
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        def relatorio_pesado(db):
+            # Como o relatório por período antes da agregação no SQL: todas as vendas com itens
+            vendas = db.query(Venda).options(selectinload(Venda.itens)).all()
+            return {"vendas": len(vendas), "itens": sum(len(v.itens) for v in vendas)}
+        
+        def vender(venda: VendaCreate, db):
+            return {"id": VendaService(db).finalizar_venda(venda).id}
+        
+        # Antes: handlers async def com Session síncrona bloqueiam o event loop
+        antes = FastAPI()
+        @antes.get("/relatorio")
+        async def relatorio_async(db=Depends(get_db_bench)):
+            return relatorio_pesado(db)
+        @antes.post("/vendas")
+        async def vender_async(venda: VendaCreate, db=Depends(get_db_bench)):
+            return vender(venda, db)
+        
+        # Depois: handlers def, executados no threadpool
+        depois = FastAPI()
+        @depois.get("/relatorio")
+        def relatorio_sync(db=Depends(get_db_bench)):
+            return relatorio_pesado(db)
+        @depois.post("/vendas")
+        def vender_sync(venda: VendaCreate, db=Depends(get_db_bench)):
+            return vender(venda, db)
+        
+        async def medir(app, relatorios: int) -> list[float]:
+            transporte = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+                parar = asyncio.Event()
+                
+                async def gerar_relatorios():
+                    while not parar.is_set():
+                        (await cliente.get("/relatorio")).raise_for_status()
+                
+                tarefas = [asyncio.create_task(gerar_relatorios()) for _ in range(relatorios)]
+                await asyncio.sleep(0.2 if relatorios else 0)
+                latencias = []
+                for n in range(args.vendas):
+                    itens = [{"produto_id": (n * 7 + k) % args.produtos + 1, "quantidade": 1,
+                              "preco_unitario": "9.99"} for k in range(5)]
+                    inicio = time.perf_counter()
+                    (await cliente.post("/vendas", json={"itens": itens})).raise_for_status()
+                    latencias.append(time.perf_counter() - inicio)
+                    await asyncio.sleep(0.01)
+                parar.set()
+                await asyncio.gather(*tarefas)
+            return latencias
+        
+        print(f"   {'handlers':<28} {'relatórios':>10} {'p50':>9} {'p99':>9} {'máx':>9}")
+        for nome, app in [("antes: async def", antes), ("depois: def (threadpool)", depois)]:
+            for relatorios in (0, args.relatorios):
+                latencias = asyncio.run(medir(app, relatorios))
+                print(f"   {nome:<28} {relatorios:>10} {_percentil(latencias, 0.5) * 1000:>7.1f}ms "
+                      f"{_percentil(latencias, 0.99) * 1000:>7.1f}ms {max(latencias) * 1000:>7.1f}ms")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do Sistema Donnatureza")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    
+    migrate = subparsers.add_parser("migrate", help="Aplicar as migrações pendentes do esquema do banco")
+    migrate.set_defaults(func=cmd_migrate, usa_banco=False)
+    
+    resumos = subparsers.add_parser("resumos", help="Verificar ou reconstruir os resumos de vendas")
+    resumos.add_argument("--verificar", action="store_true", help="Apenas verificar (padrão)")
+    resumos.add_argument("--reconstruir", action="store_true", help="Recalcular a partir do histórico")
+    resumos.set_defaults(func=cmd_resumos)
+    
+    alertas = subparsers.add_parser("alertas", help="Recalcular os alertas de estoque (após editar o banco direto)")
+    alertas.set_defaults(func=cmd_alertas)
+    
+    importar = subparsers.add_parser("importar", help="Importar produtos de uma planilha CSV ou XLSX")
+    importar.add_argument("arquivo", help="Caminho do arquivo .csv ou .xlsx")
+    importar.add_argument("--lote", type=int, default=500, help="Linhas gravadas por transação")
+    importar.set_defaults(func=cmd_importar)
+    
+    importacao = subparsers.add_parser("importacao", help="Medir a importação de uma planilha grande por tamanho de lote")
+    importacao.add_argument("--linhas", type=int, default=50000, help="Linhas da planilha gerada")
+    importacao.add_argument("--lote", type=int, default=500, help="Lote comparado com o anterior (2000)")
+    importacao.set_defaults(func=cmd_importacao, usa_banco=False)
+    
+    saldos = subparsers.add_parser("saldos", help="Fechar saldos diários de estoque e arquivar movimentações antigas")
+    saldos.add_argument("--data", help="Dia a fechar (AAAA-MM-DD, padrão: ontem)")
+    saldos.add_argument("--arquivar-antes-de", help="Arquivar movimentações anteriores a esta data (AAAA-MM-DD)")
+    saldos.set_defaults(func=cmd_saldos)
+    
+    eventos = subparsers.add_parser("eventos", help="Simular assinantes SSE e medir a latência de entrega")
+    eventos.add_argument("--assinantes", type=int, default=500, help="Clientes simulados")
+    eventos.add_argument("--eventos", type=int, default=300, help="Eventos publicados")
+    eventos.add_argument("--intervalo", type=float, default=5, help="Intervalo entre eventos (ms)")
+    eventos.set_defaults(func=cmd_eventos)
+    
+    fotos = subparsers.add_parser("fotos", help="Gerar miniatura, card e WebP das fotos de produtos já enviadas")
+    fotos.add_argument("--lote", type=int, default=50, help="Fotos gravadas por transação")
+    fotos.set_defaults(func=cmd_fotos)
+    
+    assets = subparsers.add_parser("assets", help="Gerar estáticos com hash no nome e versões gzip/brotli")
+    assets.set_defaults(func=cmd_assets, usa_banco=False)
+    
+    json_cmd = subparsers.add_parser("json", help="Medir bytes e tempo de serialização de um catálogo grande")
+    json_cmd.add_argument("--produtos", type=int, default=10000, help="Produtos no catálogo simulado")
+    json_cmd.add_argument("--repeticoes", type=int, default=5, help="Execuções de cada caminho")
+    json_cmd.set_defaults(func=cmd_json, usa_banco=False)
+    
+    inicializacao = subparsers.add_parser("inicializacao", help="Medir o tempo de inicialização até a primeira resposta")
+    inicializacao.add_argument("--execucoes", type=int, default=5, help="Processos iniciados")
+    inicializacao.add_argument("--produtos", type=int, default=20000, help="Produtos no banco temporário")
+    inicializacao.add_argument("--orcamento-ms", type=float, default=2500, help="Limite para a mediana (ms)")
+    inicializacao.set_defaults(func=cmd_inicializacao, usa_banco=False)
+    
+    banco = subparsers.add_parser("banco", help="Medir a vazão de vendas e leituras simultâneas por perfil do SQLite")
+    banco.add_argument("--segundos", type=float, default=10, help="Duração de cada perfil")
+    banco.add_argument("--escritores", type=int, default=4, help="Caixas registrando vendas")
+    banco.add_argument("--leitores", type=int, default=8, help="Threads lendo a lista de vendas")
+    banco.add_argument("--produtos", type=int, default=2000, help="Produtos no banco de teste")
+    banco.set_defaults(func=cmd_banco, usa_banco=False)
+    
+    checkout = subparsers.add_parser("checkout", help="Medir a latência da venda (p50/p99) por tamanho do carrinho")
+    checkout.add_argument("--vendas", type=int, default=200, help="Vendas por tamanho de carrinho")
+    checkout.add_argument("--itens", default="1,5,15,30", help="Tamanhos de carrinho, separados por vírgula")
+    checkout.add_argument("--produtos", type=int, default=2000, help="Produtos no banco de teste")
+    checkout.set_defaults(func=cmd_checkout, usa_banco=False)
+    
+    busca = subparsers.add_parser("busca", help="Comparar a busca indexada com o LIKE anterior em um catálogo grande")
+    busca.add_argument("--produtos", type=int, default=100000, help="Produtos no catálogo de teste")
+    busca.add_argument("--repeticoes", type=int, default=20, help="Execuções de cada termo")
+    busca.set_defaults(func=cmd_busca, usa_banco=False)
+    
+    concorrencia = subparsers.add_parser("concorrencia", help="Medir a latência da venda com relatórios pesados em paralelo")
+    concorrencia.add_argument("--vendas", type=int, default=40, help="Vendas medidas em cada cenário")
+    concorrencia.add_argument("--relatorios", type=int, default=2, help="Relatórios pesados rodando sem parar")
+    concorrencia.add_argument("--historico", type=int, default=2000, help="Vendas já gravadas (lidas pelo relatório)")
+    concorrencia.add_argument("--produtos", type=int, default=2000, help="Produtos no banco de teste")
+    concorrencia.set_defaults(func=cmd_concorrencia, usa_banco=False)
+    
+    args = parser.parse_args()
+    if getattr(args, "usa_banco", True):
+        try:
+            verificar_esquema(engine)
+        except EsquemaDesatualizado as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    sys.exit(args.func(args))
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ import os
 # Adicionar o diretório do projeto ao path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import insert
+
 from app.database import SessionLocal
 from app.models import Produto
 
@@ -118,10 +120,7 @@ def create_initial_products():
     ]
     
     try:
-        for produto_data in produtos_exemplo:
-            produto = Produto(**produto_data)
-            db.add(produto)
-        
+        db.execute(insert(Produto), produtos_exemplo)
         db.commit()
         
         print(f"✅ {len(produtos_exemplo)} produtos criados com sucesso!")
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+
+# Banco de teste descartável; precisa estar no ambiente antes de importar app.config
+_PASTA = tempfile.mkdtemp(prefix="donnatureza-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_PASTA, 'testes.db')}"
+
+import pytest
+from decimal import Decimal
+from sqlalchemy import insert, select
+from app.database import Base, SessionLocal, engine
+from app.migracoes import migrar
+from app.models import Produto
+from app.services.catalogo_cache import cache_catalogo
+from app.services.indice_produtos import indice_codigos
+
+@pytest.fixture(scope="session", autouse=True)
+def banco():
+    migrar(engine, saida=lambda _: None)
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_PASTA, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def limpar_banco(banco):
+    """Cada teste começa com as tabelas vazias e os caches em memória zerados"""
+    yield
+    with engine.begin() as conn:
+        for tabela in reversed(Base.metadata.sorted_tables):
+            conn.execute(tabela.delete())
+    with SessionLocal() as sessao:
+        indice_codigos.carregar(sessao)
+    cache_catalogo.invalidar()
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+@pytest.fixture
+def criar_produtos():
+    """Inserir produtos de teste; retorna os ids na ordem criada"""
+    def criar(quantidade: int = 1, estoque: int = 100, preco: str = "10.00", **campos) -> list[int]:
+        with engine.begin() as conn:
+            inicio = conn.execute(select(Produto.id).order_by(Produto.id.desc())).scalar() or 0
+            conn.execute(insert(Produto), [
+                {"nome": f"Produto {i}", "codigo_barras": f"789{i:010d}", "preco": Decimal(preco),
+                 "estoque": estoque, "estoque_minimo": 0, "estoque_maximo": 1_000_000, "ativo": True, **campos}
+                for i in range(inicio + 1, inicio + quantidade + 1)
+            ])
+        return list(range(inicio + 1, inicio + quantidade + 1))
+    return criar
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as cliente:
+        yield cliente
@@ -0,0 +1,47 @@
+import csv
+import io
+from datetime import date, datetime, timedelta
+from sqlalchemy import update
+from app.models import MovimentoEstoque, Produto
+from app.services.estoque_service import EstoqueService
+from app.services.saldo_service import SaldoEstoqueService
+
+def _movimentos_com_arquivo(db, criar_produtos):
+    """Três entradas antigas arquivadas e duas recentes; retorna os ids em ordem"""
+    produto_id, = criar_produtos(1, estoque=0)
+    estoque = EstoqueService(db)
+    ids = [estoque.entrada_estoque(produto_id, 1, motivo=f"Entrada {i}").id for i in range(5)]
+
+    antigo = datetime.combine(date.today() - timedelta(days=10), datetime.min.time())
+    db.execute(update(Produto).values(created_at=antigo))
+    db.execute(update(MovimentoEstoque).where(MovimentoEstoque.id.in_(ids[:3])).values(created_at=antigo))
+    db.commit()
+
+    saldos = SaldoEstoqueService(db)
+    saldos.gerar_saldos(antigo.date())
+    assert saldos.arquivar(antigo.date() + timedelta(days=1)) == 3
+    return ids, antigo.date()
+
+def test_exportacao_inclui_movimentos_arquivados(client, db, criar_produtos):
+    ids, dia = _movimentos_com_arquivo(db, criar_produtos)
+
+    resposta = client.get("/api/export/movimentos", params={"data_inicio": dia.isoformat()})
+    linhas = list(csv.DictReader(io.StringIO(resposta.text)))
+    assert [int(l["id"]) for l in linhas] == ids
+    # O arquivo não guarda o motivo; as linhas ativas mantêm
+    assert [l["motivo"] for l in linhas] == ["", "", "", "Entrada 3", "Entrada 4"]
+    assert [int(l["quantidade_nova"]) for l in linhas] == [1, 2, 3, 4, 5]
+
+    # Período depois do arquivamento: só as ativas
+    hoje = client.get("/api/export/movimentos", params={"data_inicio": date.today().isoformat()})
+    assert [int(l["id"]) for l in csv.DictReader(io.StringIO(hoje.text))] == ids[3:]
+
+def test_historico_continua_nas_arquivadas(client, db, criar_produtos):
+    ids, _ = _movimentos_com_arquivo(db, criar_produtos)
+
+    primeira = client.get("/api/estoque/movimentos", params={"limit": 4})
+    assert [m["id"] for m in primeira.json()] == ids[::-1][:4]
+    segunda = client.get("/api/estoque/movimentos",
+                         params={"limit": 4, "cursor": primeira.headers["X-Next-Cursor"]})
+    assert [m["id"] for m in segunda.json()] == ids[:1]
+    assert segunda.json()[0]["produto_nome"]
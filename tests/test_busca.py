@@ -0,0 +1,17 @@
+from app.database import engine
+from app.services import busca_service
+from app.services.busca_service import BuscaService, preparar_busca
+
+def test_busca_ignora_acentos_e_casa_prefixo(db, criar_produtos):
+    [oleo] = criar_produtos(nome="Óleo Essencial Eucalipto")
+    criar_produtos(nome="Sabonete de Lavanda", codigo_barras="111")
+    preparar_busca(engine)
+
+    assert [p.id for p in BuscaService(db).buscar("oleo euc")] == [oleo]
+
+def test_busca_like_trata_sublinhado_como_texto(db, criar_produtos, monkeypatch):
+    monkeypatch.setattr(busca_service, "_modo_busca", "like")
+    [com_sublinhado] = criar_produtos(nome="Kit A_B")
+    criar_produtos(nome="Kit AXB", codigo_barras="222")
+
+    assert [p.id for p in BuscaService(db).buscar("A_B")] == [com_sublinhado]
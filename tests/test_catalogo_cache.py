@@ -0,0 +1,26 @@
+from app.database import limite_de_queries
+from app.services.estoque_service import EstoqueService
+
+def test_etag_repetido_responde_304_sem_consultar_o_banco(client, criar_produtos):
+    criar_produtos(3)
+    primeira = client.get("/api/produtos")
+    assert primeira.status_code == 200
+    etag = primeira.headers["ETag"]
+
+    with limite_de_queries(0):
+        segunda = client.get("/api/produtos", headers={"If-None-Match": etag})
+
+    assert segunda.status_code == 304
+    assert segunda.headers["ETag"] == etag
+    assert segunda.content == b""
+
+def test_mudanca_de_estoque_gera_nova_etag(client, db, criar_produtos):
+    [produto_id] = criar_produtos()
+    etag = client.get("/api/produtos").headers["ETag"]
+
+    EstoqueService(db).entrada_estoque(produto_id, 5)
+
+    resposta = client.get("/api/produtos", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+    assert resposta.json()[0]["estoque"] == 105
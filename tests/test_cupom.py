@@ -0,0 +1,106 @@
+import re
+import pytest
+from app.database import limite_de_queries
+from app.models import Venda
+from app.services import cupom_service
+from app.services.cupom_service import COLUNAS_58MM, CacheCupons, CupomService
+
+@pytest.fixture(autouse=True)
+def cache_vazio(monkeypatch):
+    # Ids de venda se repetem entre testes depois da limpeza do banco
+    monkeypatch.setattr(cupom_service, "cache_cupons", CacheCupons())
+
+def _vender(client, itens: list[tuple[int, int, str]], **campos) -> int:
+    return client.post("/api/vendas", json={
+        "itens": [{"produto_id": p, "quantidade": q, "preco_unitario": preco} for p, q, preco in itens],
+        "forma_pagamento": "cartao_credito", **campos
+    }).json()["id"]
+
+def _html_antigo(venda: Venda) -> str:
+    """Cupom como era montado na rota antes do template"""
+    cupom_html = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: monospace; width: 58mm; margin: 0; padding: 5px; }}
+            .center {{ text-align: center; }}
+            .linha {{ border-bottom: 1px dashed #000; margin: 5px 0; }}
+            .total {{ font-weight: bold; font-size: 14px; }}
+        </style>
+    </head>
+    <body>
+        <div class="center">
+            <h3>DONNATUREZA</h3>
+            <p>Av Senador Dinarte Mariz, 4077 Lj 01</p>
+            <div class="linha"></div>
+        </div>
+        <p>Venda: #{venda.id}</p>
+        <p>Data: {venda.created_at.strftime('%d/%m/%Y %H:%M')}</p>
+        <div class="linha"></div>
+        <table width="100%">
+    """
+    for item in venda.itens:
+        cupom_html += f"""
+            <tr>
+                <td>{item.produto.nome[:20]}</td>
+                <td>{item.quantidade}x</td>
+                <td>R$ {item.preco_unitario:.2f}</td>
+            </tr>
+        """
+    cupom_html += f"""
+        </table>
+        <div class="linha"></div>
+        <p class="total">TOTAL: R$ {venda.total:.2f}</p>
+        <p>Pagamento: {venda.forma_pagamento.replace('_', ' ').title()}</p>
+        <div class="center">
+            <p>Obrigado pela preferência!</p>
+        </div>
+    </body>
+    </html>
+    """
+    return cupom_html
+
+def _tags_e_textos(html: str) -> list[str]:
+    # Indentação e quebras de linha não aparecem na impressão; o charset passou a ser declarado
+    html = re.sub(r"\s+", " ", html.replace('<meta charset="UTF-8">', ""))
+    return [parte for parte in re.split(r" ?(<[^>]+>) ?", html.strip()) if parte]
+
+def test_reimpressao_nao_consulta_o_banco(client, criar_produtos):
+    produto_id, = criar_produtos(1)
+    venda_id = _vender(client, [(produto_id, 2, "10.00")])
+
+    primeira = client.get(f"/api/vendas/{venda_id}/cupom")
+    with limite_de_queries(0):
+        html = client.get(f"/api/vendas/{venda_id}/cupom")
+        escpos = client.get(f"/api/vendas/{venda_id}/cupom.escpos")
+
+    assert html.status_code == escpos.status_code == 200
+    assert html.json() == primeira.json()
+    assert escpos.content.startswith(cupom_service.INICIAR)
+
+def test_html_igual_ao_cupom_antigo(client, db, criar_produtos):
+    curto, = criar_produtos(1, nome="Chá")
+    longo, = criar_produtos(1, nome="Óleo essencial de lavanda 10ml")
+    venda_id = _vender(client, [(curto, 1, "3.90"), (longo, 3, "12.35")])
+
+    cupom = CupomService(db).obter_cupom(venda_id)
+    venda = db.get(Venda, venda_id)
+
+    assert _tags_e_textos(cupom.html) == _tags_e_textos(_html_antigo(venda))
+
+def test_escpos_em_cp860_dentro_de_32_colunas(db, client, criar_produtos):
+    produto_id, = criar_produtos(1, nome="Sabonete de argila verde com óleo de copaíba e açaí")
+    venda_id = _vender(client, [(produto_id, 12, "1234.56")], desconto="100.00")
+
+    escpos = CupomService(db).obter_cupom(venda_id).escpos
+
+    # Texto entre os comandos: linhas terminadas em \n, sem os bytes de controle ESC/GS
+    texto = re.sub(rb"(\x1b[@]|\x1b[taEd].|\x1d!.|\x1dVB.)", b"", escpos, flags=re.S)
+    linhas = texto.decode("cp860").split("\n")
+    assert all(len(linha) <= COLUNAS_58MM for linha in linhas)
+    assert "Sabonete de argila verde com óle" in linhas
+    assert "Obrigado pela preferência!" in linhas
+    assert "preferência".encode("cp860") in escpos
+    assert "preferência".encode("utf-8") not in escpos
+    total = next(linha for linha in linhas if linha.startswith("TOTAL"))
+    assert total == "TOTAL" + " " * (COLUNAS_58MM - len("TOTAL") - len("R$ 14.714,72")) + "R$ 14.714,72"
@@ -0,0 +1,103 @@
+import random
+import threading
+from collections import Counter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, criar_engine, engine
+from app.models import ItemVenda, MovimentoEstoque, Produto
+from app.schemas.venda import VendaCreate
+from app.services.estoque_service import BancoOcupadoError, EstoqueInsuficienteError, EstoqueService
+from app.services.venda_service import VendaService
+
+CAIXAS = 16
+VENDAS_POR_CAIXA = 150
+ESTOQUE_INICIAL = 1500
+
+def test_vendas_simultaneas_mantem_estoque_e_movimentos_consistentes(criar_produtos):
+    """Milhares de vendas em paralelo nos mesmos produtos: saldo final bate com o histórico"""
+    quentes = criar_produtos(3, estoque=ESTOQUE_INICIAL)
+    resultados = Counter()
+    erros_inesperados = []
+
+    def caixa(semente: int):
+        aleatorio = random.Random(semente)
+        for _ in range(VENDAS_POR_CAIXA):
+            itens = [{"produto_id": pid, "quantidade": aleatorio.randint(1, 3), "preco_unitario": "10.00"}
+                     for pid in aleatorio.sample(quentes, aleatorio.randint(1, 3))]
+            db = SessionLocal()
+            try:
+                VendaService(db).finalizar_venda(VendaCreate(itens=itens))
+                resultados["criadas"] += 1
+            except EstoqueInsuficienteError as e:
+                assert {f["produto_id"] for f in e.falhas} <= set(quentes)
+                resultados["sem_estoque"] += 1
+            except BancoOcupadoError:
+                resultados["ocupado"] += 1
+            except Exception as e:  # pragma: no cover - falha do teste
+                erros_inesperados.append(e)
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=caixa, args=(n,)) for n in range(CAIXAS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not erros_inesperados
+    assert sum(resultados.values()) == CAIXAS * VENDAS_POR_CAIXA
+    # O estoque acaba no meio do teste: parte das vendas precisa ser recusada
+    assert resultados["criadas"] and resultados["sem_estoque"]
+
+    with SessionLocal() as db:
+        for produto_id in quentes:
+            estoque = db.query(Produto.estoque).filter(Produto.id == produto_id).scalar()
+            vendido = (db.query(func.coalesce(func.sum(ItemVenda.quantidade), 0))
+                       .filter(ItemVenda.produto_id == produto_id).scalar())
+            assert estoque >= 0
+            assert estoque == ESTOQUE_INICIAL - vendido
+
+            # Cada movimento parte do saldo deixado pelo anterior
+            saldo = ESTOQUE_INICIAL
+            for movimento in (db.query(MovimentoEstoque)
+                              .filter(MovimentoEstoque.produto_id == produto_id)
+                              .order_by(MovimentoEstoque.id)):
+                assert movimento.quantidade_anterior == saldo
+                assert movimento.quantidade_nova == saldo - movimento.quantidade
+                saldo = movimento.quantidade_nova
+            assert saldo == estoque
+
+def test_lock_de_escrita_esgotado_vira_banco_ocupado(criar_produtos, monkeypatch):
+    [produto_id] = criar_produtos()
+    monkeypatch.setattr("app.services.estoque_service.TENTATIVAS_LOCK_ESCRITA", 2)
+    engine_curto = criar_engine(str(engine.url), busy_timeout=50)
+    db = Session(bind=engine_curto)
+    try:
+        # Outro caixa segurando o lock de escrita
+        with engine.connect() as outro:
+            with outro.execution_options(sqlite_immediate=True).begin():
+                try:
+                    EstoqueService(db).entrada_estoque(produto_id, 5)
+                    raise AssertionError("BancoOcupadoError esperado")
+                except BancoOcupadoError as e:
+                    assert "database is locked" not in str(e)
+
+        # Com o lock liberado a mesma sessão continua utilizável
+        assert EstoqueService(db).entrada_estoque(produto_id, 5).quantidade_nova == 105
+    finally:
+        db.close()
+        engine_curto.dispose()
+
+def test_api_responde_503_quando_banco_ocupado(client, criar_produtos, monkeypatch):
+    [produto_id] = criar_produtos()
+    def ocupado(self):
+        raise BancoOcupadoError()
+    monkeypatch.setattr(EstoqueService, "iniciar_transacao_escrita", ocupado)
+
+    resposta = client.post("/api/vendas", json={
+        "itens": [{"produto_id": produto_id, "quantidade": 1, "preco_unitario": "10.00"}]
+    })
+
+    assert resposta.status_code == 503
+    assert resposta.headers["Retry-After"] == "1"
+    assert "SQL" not in resposta.json()["detail"]
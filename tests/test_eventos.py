@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from app.services.eventos import TAMANHO_FILA, HubEventos
+
+def _pendentes(assinante) -> list:
+    mensagens = []
+    while not assinante.fila.empty():
+        mensagens.append(assinante.fila.get_nowait())
+    return mensagens
+
+def _ids(mensagens: list) -> list[int]:
+    return [int(m.split("\n", 1)[0].removeprefix("id: ")) for m in mensagens]
+
+async def _publicar_de_outra_thread(hub: HubEventos, eventos: list[tuple[str, dict]]):
+    """Publicar como as rotas síncronas fazem (threadpool) e esperar a distribuição no loop"""
+    thread = threading.Thread(target=lambda: [hub.publicar(canal, dados) for canal, dados in eventos])
+    thread.start()
+    await asyncio.to_thread(thread.join)
+    # call_soon_threadsafe agenda na ordem; uma volta do loop depois de todas basta
+    await asyncio.sleep(0)
+
+def test_todos_os_assinantes_recebem_eventos_publicados_de_outra_thread():
+    async def cenario():
+        hub = HubEventos()
+        hub.iniciar(asyncio.get_running_loop())
+        todos = [hub.assinar() for _ in range(300)]
+        so_alertas = [hub.assinar(["alerta"]) for _ in range(50)]
+
+        await _publicar_de_outra_thread(hub, [
+            ("estoque", {"saldos": [{"produto_id": i, "estoque": i}]}) for i in range(20)
+        ] + [("alerta", {"eventos": []})])
+
+        for assinante in todos:
+            mensagens = _pendentes(assinante)
+            assert _ids(mensagens) == list(range(1, 22))
+            assert mensagens[0] == 'id: 1\nevent: estoque\ndata: {"saldos": [{"produto_id": 0, "estoque": 0}]}\n\n'
+        for assinante in so_alertas:
+            assert _ids(_pendentes(assinante)) == [21]
+        assert hub.total_assinantes == 350 and hub.descartados == 0
+
+    asyncio.run(cenario())
+
+def test_assinante_que_nao_le_e_descartado_ao_encher_a_fila():
+    async def cenario():
+        hub = HubEventos()
+        hub.iniciar(asyncio.get_running_loop())
+        lento = hub.assinar()
+        ativo = hub.assinar()
+
+        for lote in range(4):
+            await _publicar_de_outra_thread(hub, [("venda", {"n": lote * 100 + i}) for i in range(100)])
+            assert len(_pendentes(ativo)) == 100
+
+        assert lento.descartado and hub.descartados == 1
+        # A fila foi esvaziada e só sobrou o aviso de encerramento
+        assert _pendentes(lento) == [None]
+        assert hub.total_assinantes == 1 and not ativo.descartado
+
+    asyncio.run(cenario())
+
+def test_limite_da_fila_e_de_256_eventos():
+    async def cenario():
+        hub = HubEventos()
+        hub.iniciar(asyncio.get_running_loop())
+        assinante = hub.assinar()
+        await _publicar_de_outra_thread(hub, [("venda", {"n": i}) for i in range(TAMANHO_FILA)])
+        assert not assinante.descartado and assinante.fila.qsize() == 256
+
+        await _publicar_de_outra_thread(hub, [("venda", {"n": TAMANHO_FILA})])
+        assert assinante.descartado
+
+    asyncio.run(cenario())
+
+def test_reconexao_com_last_event_id_reenvia_o_historico():
+    async def cenario():
+        hub = HubEventos()
+        hub.iniciar(asyncio.get_running_loop())
+        primeiro = hub.assinar(["estoque"])
+        await _publicar_de_outra_thread(hub, [("estoque", {"n": 1}), ("venda", {"n": 2}), ("estoque", {"n": 3})])
+        ultimo_recebido = _ids(_pendentes(primeiro))[0]
+        hub.cancelar(primeiro)  # conexão caiu depois do primeiro evento
+
+        await _publicar_de_outra_thread(hub, [("estoque", {"n": 4}), ("venda", {"n": 5})])
+
+        reconectado = hub.assinar(["estoque"], ultimo_id=ultimo_recebido)
+        assert _ids(_pendentes(reconectado)) == [3, 4]
+        todos_os_canais = hub.assinar(ultimo_id=ultimo_recebido)
+        assert _ids(_pendentes(todos_os_canais)) == [2, 3, 4, 5]
+
+        # Depois do reenvio o assinante segue recebendo os novos
+        await _publicar_de_outra_thread(hub, [("estoque", {"n": 6})])
+        assert _ids(_pendentes(reconectado)) == [6]
+
+    asyncio.run(cenario())
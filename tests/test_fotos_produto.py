@@ -0,0 +1,86 @@
+import io
+import os
+import pytest
+from PIL import Image
+from app.config import settings
+from app.services import imagem_service
+
+@pytest.fixture(autouse=True)
+def pasta_fotos(tmp_path, monkeypatch):
+    monkeypatch.setattr(imagem_service, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+def _jpeg_deitado_com_exif(largura: int = 2000, altura: int = 1000) -> bytes:
+    """Foto de celular: gravada deitada, com Orientation=6 (girar 90° no sentido horário) e dados de GPS"""
+    imagem = Image.linear_gradient("L").resize((largura, altura)).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = "Fabricante"
+    saida = io.BytesIO()
+    imagem.save(saida, "JPEG", exif=exif, quality=90)
+    return saida.getvalue()
+
+def _enviar(client, produto_id: int, conteudo: bytes):
+    return client.post(f"/api/produtos/upload-foto/{produto_id}",
+                       files={"file": ("foto.jpg", conteudo, "image/jpeg")})
+
+def _salvar_temporario(pasta, conteudo: bytes) -> str:
+    caminho = pasta / "origem.jpg"
+    caminho.write_bytes(conteudo)
+    return str(caminho)
+
+def _abrir_url(pasta, url: str) -> Image.Image:
+    return Image.open(pasta / os.path.basename(url))
+
+def test_upload_gera_as_tres_variantes_giradas_e_sem_metadados(client, criar_produtos, pasta_fotos):
+    produto_id, = criar_produtos(1)
+
+    resposta = _enviar(client, produto_id, _jpeg_deitado_com_exif())
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+
+    tamanhos = {}
+    for coluna in ("foto_thumb_url", "foto_card_url", "foto_url"):
+        with _abrir_url(pasta_fotos, corpo[coluna]) as foto:
+            tamanhos[coluna] = foto.size
+            assert "exif" not in foto.info
+            assert not foto.getexif()
+    # Orientação aplicada: a foto sai em pé, com o maior lado limitado por variante
+    assert tamanhos == {"foto_thumb_url": (80, 160), "foto_card_url": (240, 480), "foto_url": (800, 1600)}
+
+    # Nova foto apaga as variantes anteriores
+    assert _enviar(client, produto_id, _jpeg_deitado_com_exif(300, 200)).status_code == 200
+    assert len(os.listdir(pasta_fotos)) == 3
+
+def test_upload_acima_do_limite_e_recusado(client, criar_produtos, pasta_fotos, monkeypatch):
+    produto_id, = criar_produtos(1)
+    monkeypatch.setattr(settings, "foto_max_mb", 1)
+
+    resposta = _enviar(client, produto_id, b"\xff\xd8" + b"0" * (1024 * 1024))
+    assert resposta.status_code == 400
+    assert "maior que 1 MB" in resposta.json()["detail"]
+    assert os.listdir(pasta_fotos) == []
+
+def test_arquivo_que_nao_e_imagem_e_erro_do_cliente(client, criar_produtos):
+    produto_id, = criar_produtos(1)
+
+    resposta = _enviar(client, produto_id, b"isto nao e uma imagem")
+    assert resposta.status_code == 400
+    assert "Não foi possível ler a imagem" in resposta.json()["detail"]
+
+def test_falha_ao_gravar_variante_nao_vira_imagem_invalida(client, criar_produtos, pasta_fotos, monkeypatch):
+    produto_id, = criar_produtos(1)
+    gravar = Image.Image.save
+    def disco_cheio(self, caminho, *args, **kwargs):
+        if str(caminho).endswith("-card." + imagem_service._formato()[1]):
+            raise OSError(28, "No space left on device")
+        return gravar(self, caminho, *args, **kwargs)
+    monkeypatch.setattr(Image.Image, "save", disco_cheio)
+
+    with pytest.raises(OSError):
+        imagem_service.gerar_variantes(_salvar_temporario(pasta_fotos, _jpeg_deitado_com_exif()))
+    assert os.listdir(pasta_fotos) == ["origem.jpg"]
+
+    resposta = _enviar(client, produto_id, _jpeg_deitado_com_exif())
+    assert resposta.status_code == 500
+    assert os.listdir(pasta_fotos) == ["origem.jpg"]
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.models import AlertaEstoque, Produto
+from app.services.alerta_service import AlertaEstoqueService
+from app.services.importacao_service import ImportacaoProdutosService
+from app.services.indice_produtos import IndiceCodigoBarras, indice_codigos
+
+def _linha(codigo: str, estoque: int, **campos) -> dict:
+    return {"nome": f"Produto {codigo}", "codigo_barras": codigo, "preco": "5,90",
+            "estoque": estoque, "estoque_minimo": 5, "estoque_maximo": 100, **campos}
+
+@pytest.fixture
+def sem_recarga_completa(monkeypatch):
+    def recarga_completa(*args, **kwargs):
+        raise AssertionError("importação não deve recarregar tudo")
+    monkeypatch.setattr(IndiceCodigoBarras, "carregar", recarga_completa)
+    monkeypatch.setattr(AlertaEstoqueService, "reconstruir", recarga_completa)
+
+def test_importacao_atualiza_indice_e_alertas_so_dos_produtos_do_lote(db, criar_produtos, sem_recarga_completa):
+    existente, = criar_produtos(1, estoque=50)
+    codigo_existente = f"789{existente:010d}"
+
+    relatorio = ImportacaoProdutosService(db, tamanho_lote=2).importar([
+        _linha("7890000000901", 2),
+        _linha("7890000000902", 40),
+        {"codigo_barras": codigo_existente, "nome": "Renomeado", "preco": "10", "estoque_minimo": 60},
+    ])
+
+    assert (relatorio["inseridos"], relatorio["atualizados"], relatorio["total_erros"]) == (2, 1, 0)
+    assert indice_codigos.buscar("7890000000901")["estoque"] == 2
+    assert indice_codigos.buscar("7890000000902")["nome"] == "Produto 7890000000902"
+    assert indice_codigos.buscar(codigo_existente)["nome"] == "Renomeado"
+
+    em_alerta = {p for p, in db.query(Produto.codigo_barras).join(
+        AlertaEstoque, AlertaEstoque.produto_id == Produto.id).filter(AlertaEstoque.situacao == "baixo")}
+    assert em_alerta == {"7890000000901", codigo_existente}
+
+def test_erro_do_banco_vira_mensagem_generica_por_linha(db, monkeypatch, caplog):
+    original = ImportacaoProdutosService._gravar_lote
+    chamadas = []
+    def segundo_lote_falha(self, validos, relatorio):
+        chamadas.append(1)
+        if len(chamadas) == 2:
+            raise OperationalError("INSERT INTO produtos ...", {}, Exception("disk I/O error"))
+        return original(self, validos, relatorio)
+    monkeypatch.setattr(ImportacaoProdutosService, "_gravar_lote", segundo_lote_falha)
+
+    relatorio = ImportacaoProdutosService(db, tamanho_lote=2).importar(
+        [_linha(f"78900000009{i:02d}", 50) for i in range(5)]
+    )
+
+    assert relatorio["inseridos"] == 3
+    assert [e["linha"] for e in relatorio["erros"]] == [4, 5]
+    assert all("INSERT" not in e["erro"] and "disk" not in e["erro"] for e in relatorio["erros"])
+    assert "disk I/O error" in caplog.text
+    assert indice_codigos.buscar("7890000000904") is not None
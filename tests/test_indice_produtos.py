@@ -0,0 +1,26 @@
+from app.schemas.venda import VendaCreate
+from app.services.indice_produtos import IndiceCodigoBarras, indice_codigos
+from app.services.venda_service import VendaService
+
+def test_saldo_de_movimento_mais_antigo_nao_sobrescreve(db, criar_produtos):
+    [produto_id] = criar_produtos(estoque=10)
+    indice = IndiceCodigoBarras()
+    indice.carregar(db)
+    codigo = f"789{produto_id:010d}"
+
+    # Duas vendas simultâneas: a mais nova (movimento 2) termina antes da mais antiga (movimento 1)
+    indice.atualizar_estoque({produto_id: 3}, {produto_id: 2})
+    indice.atualizar_estoque({produto_id: 5}, {produto_id: 1})
+
+    assert indice.buscar(codigo)["estoque"] == 3
+    assert indice.estatisticas()["hits"] == 1
+
+def test_venda_atualiza_estoque_do_indice(db, criar_produtos):
+    [produto_id] = criar_produtos(estoque=10)
+    indice_codigos.carregar(db)
+
+    VendaService(db).finalizar_venda(VendaCreate(itens=[
+        {"produto_id": produto_id, "quantidade": 4, "preco_unitario": "10.00"}
+    ]))
+
+    assert indice_codigos.buscar(f"789{produto_id:010d}")["estoque"] == 6
@@ -0,0 +1,54 @@
+import threading
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.database import engine, limite_de_queries
+from app.schemas.venda import VendaCreate
+from app.services.venda_service import VendaService
+
+def test_listagem_de_vendas_nao_faz_consulta_por_venda(client, db, criar_produtos):
+    produtos = criar_produtos(3)
+    for produto_id in produtos * 5:
+        VendaService(db).finalizar_venda(VendaCreate(itens=[
+            {"produto_id": produto_id, "quantidade": 1, "preco_unitario": "10.00"}
+        ]))
+
+    # Vendas e itens (selectinload): duas consultas, com 15 vendas ou com 1
+    with limite_de_queries(2) as estatisticas:
+        resposta = client.get("/api/vendas")
+
+    assert resposta.status_code == 200
+    assert len(resposta.json()) == 15
+    assert estatisticas.queries == 2
+    assert resposta.headers["Server-Timing"].startswith('db;dur=')
+    assert '"2 queries"' in resposta.headers["Server-Timing"]
+
+def test_limite_de_queries_falha_quando_excedido(client, criar_produtos):
+    criar_produtos()
+    with pytest.raises(AssertionError, match="limite era 0"):
+        with limite_de_queries(0):
+            client.get("/api/vendas")
+
+def test_query_com_erro_nao_deixa_estado_na_conexao():
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql("SELECT * FROM tabela_que_nao_existe")
+            conn.rollback()
+        assert "inicio_query" not in conn.info
+        with limite_de_queries(1) as estatisticas:
+            conn.exec_driver_sql("SELECT 1")
+    assert estatisticas.queries == 1
+
+def test_contagem_exata_com_consultas_em_varias_threads():
+    def consultar():
+        with engine.connect() as conn:
+            for _ in range(50):
+                conn.exec_driver_sql("SELECT 1")
+
+    with limite_de_queries(400) as estatisticas:
+        threads = [threading.Thread(target=consultar) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert estatisticas.queries == 400
@@ -0,0 +1,50 @@
+from app.models import MovimentoEstoque, Produto
+from app.services.estoque_service import EstoqueService
+
+def _movimentos(db, produto_id: int) -> list:
+    return (db.query(MovimentoEstoque)
+            .filter(MovimentoEstoque.produto_id == produto_id)
+            .order_by(MovimentoEstoque.id)
+            .all())
+
+def test_inventario_soma_duplicados_e_resume_as_diferencas(client, db, criar_produtos):
+    sobra, falta, igual = criar_produtos(3, estoque=10, preco="2.50")
+
+    resposta = client.post("/api/estoque/inventario", json={"itens": [
+        {"produto_id": sobra, "quantidade_contada": 8},
+        {"produto_id": falta, "quantidade_contada": 6},
+        {"produto_id": sobra, "quantidade_contada": 5},  # contado em outra prateleira
+        {"produto_id": igual, "quantidade_contada": 10},
+        {"produto_id": 999999, "quantidade_contada": 3},
+    ]})
+
+    assert resposta.status_code == 200
+    resumo = resposta.json()
+    assert resumo["itens_contados"] == 4
+    assert resumo["sem_alteracao"] == 1
+    assert resumo["ajustados"] == 2
+    assert resumo["nao_encontrados"] == [999999]
+    assert resumo["sobras"] == {"produtos": 1, "unidades": 3, "valor": 7.5}
+    assert resumo["faltas"] == {"produtos": 1, "unidades": 4, "valor": 10.0}
+    assert {a["produto_id"]: a["diferenca"] for a in resumo["ajustes"]} == {sobra: 3, falta: -4}
+
+    db.expire_all()
+    estoques = dict(db.query(Produto.id, Produto.estoque).filter(Produto.id.in_([sobra, falta, igual])))
+    assert estoques == {sobra: 13, falta: 6, igual: 10}
+    assert _movimentos(db, igual) == []
+
+def test_ajustes_do_inventario_continuam_a_cadeia_de_saldos(db, criar_produtos):
+    produto_id, = criar_produtos(1, estoque=0)
+    estoque = EstoqueService(db)
+    estoque.entrada_estoque(produto_id, 20, motivo="Compra")
+    estoque.ajuste_estoque(produto_id, 15, motivo="Perda")
+
+    estoque.reconciliar_inventario({produto_id: 18})
+    estoque.reconciliar_inventario({produto_id: 11})
+
+    movimentos = _movimentos(db, produto_id)
+    assert [m.tipo_movimento for m in movimentos[-2:]] == ["ajuste_positivo", "ajuste_negativo"]
+    assert [m.quantidade for m in movimentos[-2:]] == [3, 7]
+    for anterior, atual in zip(movimentos, movimentos[1:]):
+        assert atual.quantidade_anterior == anterior.quantidade_nova
+    assert movimentos[-1].quantidade_nova == 11
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine, delete, insert, inspect, select
+from app.database import Base
+from app.migracoes import (VERSAO_ESQUEMA, EsquemaDesatualizado, migrar, versao_atual,
+                           verificar_esquema, versao_esquema)
+from app.models import AlertaEstoque, Produto
+
+@pytest.fixture
+def banco_antigo(tmp_path):
+    """Banco de antes das migrações: sem variantes da foto nem tabela versao_esquema"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        for coluna in ("foto_thumb_url", "foto_card_url"):
+            conn.exec_driver_sql(f"ALTER TABLE produtos DROP COLUMN {coluna}")
+        conn.execute(insert(Produto.__table__).values(
+            nome="Chá verde", codigo_barras="7890000000001", preco="12.50",
+            estoque=2, estoque_minimo=5, estoque_maximo=100, foto_url="/static/img/produtos/cha.jpg"
+        ))
+    yield engine
+    engine.dispose()
+
+def test_migrar_banco_antigo_ate_a_versao_atual(banco_antigo):
+    assert "versao_esquema" not in inspect(banco_antigo).get_table_names()
+    with pytest.raises(EsquemaDesatualizado):
+        verificar_esquema(banco_antigo)
+
+    aplicadas = migrar(banco_antigo, saida=lambda _: None)
+
+    assert aplicadas == list(range(1, VERSAO_ESQUEMA + 1))
+    verificar_esquema(banco_antigo)
+    colunas = {c["name"] for c in inspect(banco_antigo).get_columns("produtos")}
+    assert {"foto_thumb_url", "foto_card_url"} <= colunas
+    with banco_antigo.connect() as conn:
+        # Dados anteriores preservados e alerta preenchido pela migração
+        assert conn.execute(select(Produto.foto_url, Produto.foto_thumb_url)).one() == (
+            "/static/img/produtos/cha.jpg", None
+        )
+        assert conn.execute(select(AlertaEstoque.situacao)).scalar_one() == "baixo"
+
+    # Rodar de novo não reaplica nada
+    assert migrar(banco_antigo, saida=lambda _: None) == []
+
+def test_banco_em_versao_anterior_nao_inicia(banco_antigo):
+    migrar(banco_antigo, saida=lambda _: None)
+    with banco_antigo.begin() as conn:
+        conn.execute(delete(versao_esquema).where(versao_esquema.c.versao == VERSAO_ESQUEMA))
+        assert versao_atual(conn) == VERSAO_ESQUEMA - 1
+
+    with pytest.raises(EsquemaDesatualizado, match=f"versão {VERSAO_ESQUEMA - 1}"):
+        verificar_esquema(banco_antigo)
+
+    assert migrar(banco_antigo, saida=lambda _: None) == [VERSAO_ESQUEMA]
+    verificar_esquema(banco_antigo)
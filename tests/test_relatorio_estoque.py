@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+def test_valor_do_estoque_somado_em_centavos(client, criar_produtos):
+    criar_produtos(1000, estoque=3, preco="0.10", categoria="Chás")
+    criar_produtos(1, estoque=7, preco="19.99", categoria="Óleos")
+
+    relatorio = client.get("/api/estoque/relatorio").json()
+    assert Decimal(str(relatorio["categorias"]["Chás"]["valor"])) == Decimal("300.00")
+    assert Decimal(str(relatorio["categorias"]["Óleos"]["valor"])) == Decimal("139.93")
+    assert Decimal(str(relatorio["resumo"]["total_valor_estoque"])) == Decimal("439.93")
+
+def test_lista_de_produtos_filtrada_e_paginada(client, criar_produtos):
+    baixos = criar_produtos(3, estoque=0, categoria="Chás")
+    normais = criar_produtos(5, estoque=50, categoria="Chás")
+
+    pagina = client.get("/api/estoque/relatorio",
+                        params={"incluir_produtos": True, "status": "normal", "limit": 3})
+    assert [p["id"] for p in pagina.json()["produtos"]] == normais[:3]
+    seguinte = client.get("/api/estoque/relatorio", params={
+        "incluir_produtos": True, "status": "normal", "limit": 3,
+        "cursor": pagina.headers["X-Next-Cursor"]
+    })
+    assert [p["id"] for p in seguinte.json()["produtos"]] == normais[3:]
+    assert "X-Next-Cursor" not in seguinte.headers
+
+    baixo = client.get("/api/estoque/relatorio", params={"incluir_produtos": True, "status": "baixo"})
+    assert [p["id"] for p in baixo.json()["produtos"]] == baixos
+
+    busca = client.get("/api/estoque/relatorio",
+                       params={"incluir_produtos": True, "busca": f"{normais[0]:010d}"})
+    assert [p["id"] for p in busca.json()["produtos"]] == normais[:1]
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.database import engine
+from app.schemas.venda import VendaCreate, VendaOffline
+from app.services.resumo_service import ResumoVendasService
+from app.services.venda_service import VendaService
+
+def _itens(produtos: list[int]) -> list[dict]:
+    return [{"produto_id": pid, "quantidade": 2, "preco_unitario": "7.50"} for pid in produtos]
+
+def test_venda_online_nao_consulta_a_venda_antes_do_commit(db, criar_produtos):
+    produtos = criar_produtos(2)
+    comandos = []
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(" ".join(statement.split()))
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        VendaService(db).finalizar_venda(VendaCreate(itens=_itens(produtos)))
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+    insert_venda = next(c for c in comandos if c.startswith("INSERT INTO vendas "))
+    assert "RETURNING" in insert_venda and "created_at" in insert_venda
+    # Única leitura da venda: o refresh depois do commit
+    assert sum(1 for c in comandos if c.startswith("SELECT") and "FROM vendas" in c) == 1
+
+def test_resumos_batem_com_vendas_online_e_offline_retroativas(db, criar_produtos):
+    produtos = criar_produtos(3)
+    service = VendaService(db)
+    service.finalizar_venda(VendaCreate(itens=_itens(produtos[:2]), forma_pagamento="pix"))
+    ontem = datetime.utcnow() - timedelta(days=1, hours=3)
+    resultado = service.importar_offline([
+        VendaOffline(itens=_itens(produtos[1:]), chave_idempotencia="caixa9-00000001", registrada_em=ontem),
+        VendaOffline(itens=_itens(produtos[:1]), chave_idempotencia="caixa9-00000002",
+                     registrada_em=ontem - timedelta(days=10), forma_pagamento="cartao_credito")
+    ])
+    assert resultado["criadas"] == 2
+
+    assert ResumoVendasService(db).verificar() == []
@@ -0,0 +1,21 @@
+from app.schemas.venda import VendaCreate
+from app.services.venda_service import VendaService
+
+def test_delta_traz_produto_vendido_depois_do_token(client, db, criar_produtos):
+    vendido, parado = criar_produtos(2, estoque=10)
+    completo = client.get("/api/produtos/changes").json()
+    assert completo["completo"] is True
+    assert {p["id"] for p in completo["alterados"]} == {vendido, parado}
+
+    VendaService(db).finalizar_venda(VendaCreate(itens=[
+        {"produto_id": vendido, "quantidade": 2, "preco_unitario": "10.00"}
+    ]))
+    delta = client.get("/api/produtos/changes", params={"since": completo["token"]}).json()
+
+    assert delta["completo"] is False
+    estoque = {p["id"]: p["estoque"] for p in delta["alterados"]}
+    # A folga pode repetir produtos já enviados, mas o vendido vem com o saldo novo
+    assert estoque[vendido] == 8
+
+def test_token_invalido_responde_400(client):
+    assert client.get("/api/produtos/changes", params={"since": "lixo"}).status_code == 400
@@ -0,0 +1,65 @@
+from sqlalchemy import func
+from app.models import Produto, Venda
+from app.schemas.venda import VendaOffline
+from app.services.estoque_service import BancoOcupadoError, EstoqueService
+from app.services.venda_service import VendaService
+
+def _venda(produto_id: int, chave: str) -> dict:
+    return {"itens": [{"produto_id": produto_id, "quantidade": 1, "preco_unitario": "10.00"}],
+            "forma_pagamento": "pix", "chave_idempotencia": chave}
+
+def _estoque(db, produto_id: int) -> int:
+    db.expire_all()
+    return db.query(Produto.estoque).filter(Produto.id == produto_id).scalar()
+
+def test_reenvio_online_devolve_a_mesma_venda(client, db, criar_produtos):
+    produto_id, = criar_produtos(1, estoque=10)
+
+    primeira = client.post("/api/vendas", json=_venda(produto_id, "caixa1-00000001"))
+    segunda = client.post("/api/vendas", json=_venda(produto_id, "caixa1-00000001"))
+
+    assert primeira.status_code == segunda.status_code == 200
+    assert primeira.json()["id"] == segunda.json()["id"]
+    assert db.query(func.count(Venda.id)).scalar() == 1
+    assert _estoque(db, produto_id) == 9
+
+def test_venda_online_reenviada_pela_fila_offline_nao_duplica(client, db, criar_produtos):
+    produto_id, = criar_produtos(1, estoque=10)
+    # A resposta da venda online se perdeu e o caixa a guardou na fila com a mesma chave
+    venda_id = client.post("/api/vendas", json=_venda(produto_id, "caixa1-00000002")).json()["id"]
+
+    resultado = client.post("/api/vendas/offline", json={"vendas": [
+        _venda(produto_id, "caixa1-00000002"), _venda(produto_id, "caixa1-00000003")
+    ]}).json()
+
+    assert [r["status"] for r in resultado["resultados"]] == ["duplicada", "criada"]
+    assert resultado["resultados"][0]["venda_id"] == venda_id
+    assert _estoque(db, produto_id) == 8
+
+    reenvio = client.post("/api/vendas/offline", json={"vendas": [_venda(produto_id, "caixa1-00000003")]}).json()
+    assert reenvio["duplicadas"] == 1 and reenvio["criadas"] == 0
+    assert _estoque(db, produto_id) == 8
+
+def test_lote_que_falha_volta_como_erro_e_nao_interrompe_os_demais(db, criar_produtos, monkeypatch):
+    produto_id, = criar_produtos(1, estoque=10)
+    vendas = [VendaOffline(**_venda(produto_id, f"caixa2-{i:08d}")) for i in range(6)]
+
+    original = EstoqueService.iniciar_transacao_escrita
+    chamadas = []
+    def segundo_lote_ocupado(self):
+        chamadas.append(1)
+        if len(chamadas) == 2:
+            raise BancoOcupadoError()
+        return original(self)
+    monkeypatch.setattr(EstoqueService, "iniciar_transacao_escrita", segundo_lote_ocupado)
+
+    resultado = VendaService(db).importar_offline(vendas, tamanho_lote=2)
+    assert [r["status"] for r in resultado["resultados"]] == ["criada", "criada", "erro", "erro", "criada", "criada"]
+    assert "ocupado" in resultado["resultados"][2]["erro"]
+    assert _estoque(db, produto_id) == 6
+
+    # O caixa reenvia a fila inteira: só as do lote que falhou são criadas
+    monkeypatch.setattr(EstoqueService, "iniciar_transacao_escrita", original)
+    reenvio = VendaService(db).importar_offline(vendas, tamanho_lote=2)
+    assert (reenvio["criadas"], reenvio["duplicadas"], reenvio["erros"]) == (2, 4, 0)
+    assert _estoque(db, produto_id) == 4